@@ -0,0 +1,123 @@
+import random
+import threading
+import time
+import uuid
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from django.db.models import Sum
+
+from apps.core.benchmark import format_table
+from apps.cart.models import StockReservation
+from apps.cart.services import StockReservationService
+from apps.products.models import Category, Brand, Product
+
+
+def naive_reserve(owner, product_id, quantity):
+    """Прежняя схема CartService.add_item: проверка по прочитанному в память товару, затем запись."""
+    product = Product.objects.get(pk=product_id)
+    if quantity > product.stock_quantity - product.reserved_quantity:
+        raise ValidationError('Недостаточно товара')
+    # Окно гонки между чтением и записью, как у запроса веб-сервера
+    time.sleep(0.001)
+    product.reserved_quantity += quantity
+    product.save(update_fields=['reserved_quantity'])
+    StockReservation.objects.create(
+        owner=owner, product_id=product_id, quantity=quantity,
+        expires_at=StockReservationService.get_expires_at()
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочная проверка резервов: много потоков резервируют один товар. '
+        'Создает временный товар и удаляет его после проверки'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=50, help='Попыток на поток')
+        parser.add_argument('--stock', type=int, default=100)
+        parser.add_argument('--max-quantity', type=int, default=3)
+        parser.add_argument(
+            '--retries', type=int, default=50,
+            help='Повторы попытки при блокировке БД (SQLite: database is locked)'
+        )
+        parser.add_argument(
+            '--mode', choices=['atomic', 'naive'], default='atomic',
+            help='atomic — условный UPDATE, naive — чтение и запись без условия'
+        )
+    
+    def handle(self, *args, **options):
+        reserve = StockReservationService.reserve if options['mode'] == 'atomic' else naive_reserve
+        # Потоки работают в своих соединениях, откатить прогон транзакцией нельзя:
+        # уникальные имена, чтобы строки упавшего прогона не мешали следующему
+        run = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f'Stress reservations {run}')
+        brand = Brand.objects.create(name=f'Stress reservations {run}')
+        product = Product.objects.create(
+            category=category, brand=brand, name=f'Stress reservations item {run}',
+            description='', price=100, sku=f'STRESS-RESERVATIONS-{run.upper()}',
+            stock_quantity=options['stock']
+        )
+        
+        stats = {'reserved': 0, 'rejected': 0, 'retries': 0, 'errors': 0}
+        lock = threading.Lock()
+        
+        def worker(number):
+            local = {'reserved': 0, 'rejected': 0, 'retries': 0, 'errors': 0}
+            try:
+                for attempt in range(options['attempts']):
+                    quantity = random.randint(1, options['max_quantity'])
+                    for retry in range(options['retries'] + 1):
+                        try:
+                            reserve(f'stress:{run}:{number}:{attempt}', product.pk, quantity)
+                            local['reserved'] += quantity
+                        except ValidationError:
+                            local['rejected'] += 1
+                        except OperationalError:
+                            # SQLite блокирует базу целиком: ждем и повторяем
+                            local['retries'] += 1
+                            time.sleep(random.uniform(0, 0.01))
+                            continue
+                        break
+                    else:
+                        local['errors'] += 1
+            finally:
+                connection.close()
+            with lock:
+                for key, value in local.items():
+                    stats[key] += value
+        
+        try:
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['threads'])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            
+            product.refresh_from_db()
+            in_rows = StockReservation.objects.filter(product=product).aggregate(
+                total=Sum('quantity')
+            )['total'] or 0
+        finally:
+            product.delete()
+            category.delete()
+            brand.delete()
+        
+        oversold = max(in_rows - options['stock'], 0)
+        drift = product.reserved_quantity - in_rows
+        self.stdout.write(format_table(
+            ['mode', 'threads', 'stock', 'reserved', 'rejected', 'retries', 'failed',
+             'counter', 'oversold', 'drift', 'seconds'],
+            [[options['mode'], options['threads'], options['stock'], in_rows, stats['rejected'],
+              stats['retries'], stats['errors'], product.reserved_quantity, oversold, drift,
+              f'{elapsed:.2f}']]
+        ))
+        if oversold or drift:
+            raise CommandError(
+                f'Перепродано {oversold} ед., расхождение счетчика резерва {drift} ед.'
+            )
+        self.stdout.write(self.style.SUCCESS('Перепродаж нет'))
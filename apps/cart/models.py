@@ -33,6 +33,9 @@ class Cart(models.Model):
     
     def get_total_items(self):
         """Количество позиций (не единиц товара)"""
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            # Позиции уже загружены (CartService.prefetch_items) — без запроса
+            return sum(item.quantity for item in self.items.all())
         return self.items.aggregate(total=Sum('quantity'))['total'] or 0
     
     def clear(self):
@@ -71,3 +74,23 @@ class CartItem(models.Model):
             )
         if not self.product.is_available:
             raise ValidationError('Товар недоступен для заказа')
+
+
+class StockReservation(models.Model):
+    """Резерв единиц товара под корзину до expires_at"""
+    # 'user:<id>' или 'session:<key>' (StockReservationService.owner_key)
+    owner = models.CharField(max_length=64)
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='reservations'
+    )
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'stock_reservations'
+        verbose_name = 'Резерв товара'
+        verbose_name_plural = 'Резервы товаров'
+        unique_together = [('owner', 'product')]
@@ -1,23 +1,28 @@
 import logging
-from django.db import transaction
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction, IntegrityError
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from typing import Dict, Any, Optional
-from django.db.models import F, Avg
+from django.db.models import (
+    F, Avg, Case, Exists, IntegerField, OuterRef, Prefetch, Value, When, prefetch_related_objects
+)
 
 from apps.users.models import User
 from apps.products.models import Product
-from apps.orders.models import Order, OrderItem
+from apps.products.read_models import schedule_card_refresh
 from .models import (
-    Cart, CartItem
+    Cart, CartItem, StockReservation
 )
 
 logger = logging.getLogger(__name__)
 
 
 class CartService:
-    
+
     @staticmethod
     def get_or_create_cart(user=None, session_key=None):
         """Получить или создать корзину."""
@@ -27,9 +32,33 @@ class CartService:
             cart, created = Cart.objects.get_or_create(session_key=session_key)
         else:
             raise ValueError('Необходимо указать user или session_key')
-
+        
         return cart
     
+    @staticmethod
+    def prefetch_items(cart: Cart) -> Cart:
+        """
+        Загрузить позиции с товарами и главными изображениями.
+        
+        Два запроса при любом числе позиций: items + products (JOIN)
+        и главные изображения. Итоги корзины после этого считаются в памяти.
+        """
+        prefetch_related_objects(
+            [cart],
+            Prefetch(
+                'items',
+                queryset=CartItem.objects.select_related('product').order_by('added_at', 'pk')
+            ),
+            Product.prefetch_main_image('items__product__product_images')
+        )
+        return cart
+    
+    @staticmethod
+    def get_cart_with_items(user=None, session_key=None) -> Cart:
+        """Корзина для чтения: фиксированное число запросов (см. prefetch_items)."""
+        cart = CartService.get_or_create_cart(user=user, session_key=session_key)
+        return CartService.prefetch_items(cart)
+    
     @staticmethod
     def add_item(cart: Cart, product: Product, quantity=1):
         """
@@ -37,93 +66,152 @@ class CartService:
         
         проверки
         - товар существует и доступен
-        - достаточно товара на складе
+        - достаточно свободного товара на складе (резерв под корзину)
         """
         if not product.is_available:
             raise ValidationError('Товар недоступен')
         
-        cart_item = cart.items.filter(product=product).first()
-        
-        if cart_item:
-            new_quantity = cart_item.quantity + quantity
-        else:
-            new_quantity = quantity
+        with transaction.atomic():
+            cart_item = cart.items.select_for_update().filter(product=product).first()
             
-        if new_quantity > product.stock_quantity:
-            raise ValidationError(f'Недостаточно товара. Доступно: ({product.stock_quantity})')
-        
-        if cart_item:
-            cart_item.quantity = new_quantity
-            cart_item.save()
-        else:
-            cart_item = CartItem.objects.create(
-                cart=cart,
-                product=product,
-                quantity=quantity
+            if cart_item:
+                new_quantity = cart_item.quantity + quantity
+            else:
+                new_quantity = quantity
+            
+            StockReservationService.reserve(
+                StockReservationService.cart_owner(cart), product.pk, new_quantity
             )
             
-        return cart_item
+            if cart_item:
+                cart_item.quantity = new_quantity
+                cart_item.save()
+            else:
+                cart_item = CartItem.objects.create(
+                    cart=cart,
+                    product=product,
+                    quantity=quantity
+                )
         
+        return cart_item
+    
     
     @staticmethod
     def update_quantity(cart_item: CartItem, quantity):
         """Изменить количество товара"""
-        if quantity == 0:
-            cart_item.delete()
-            return None
-        
-        if quantity > cart_item.product.stock_quantity:
-            raise ValidationError(
-                f'Недостаточно товара. Доступно: ({cart_item.product.stock_quantity})'
+        with transaction.atomic():
+            StockReservationService.reserve(
+                StockReservationService.cart_owner(cart_item.cart), cart_item.product_id, quantity
             )
-
-        cart_item.quantity = quantity
-        cart_item.save()
+            if quantity == 0:
+                cart_item.delete()
+                return None
+            
+            cart_item.quantity = quantity
+            cart_item.save()
         return cart_item
-
-
+    
+    
     @staticmethod
     def remove_item(cart_item: CartItem):
         """Удалить товар с корзины"""
-        cart_item.delete()
+        with transaction.atomic():
+            StockReservationService.release(
+                StockReservationService.cart_owner(cart_item.cart), [cart_item.product_id]
+            )
+            cart_item.delete()
     
     @staticmethod
     def clear_cart(cart: Cart):
         """Очистить корзину"""
-        cart.items.all().delete()
+        with transaction.atomic():
+            StockReservationService.release(StockReservationService.cart_owner(cart))
+            cart.items.all().delete()
     
     @staticmethod
     def merge_carts(anonymous_cart, user_cart):
         """
         Объединить анон корзину с корзиной пользователя
         
-        Вызывается при авторизации пользователя
+        Вызывается при авторизации пользователя. Обе корзины блокируются
+        (SELECT ... FOR UPDATE в порядке id), позиции читаются одним запросом,
+        сводятся в памяти и пишутся одним upsert: параллельный вход
+        с двух устройств ждет блокировку и не теряет количества.
+        Резервы гостя переходят пользователю в пределах объединенного количества.
         """
-        for anon_item in anonymous_cart.items.all():
-            user_item = user_cart.items.filter(product=anon_item.product).first()
+        with transaction.atomic():
+            locked = set(
+                Cart.objects.select_for_update()
+                .filter(pk__in=[anonymous_cart.pk, user_cart.pk])
+                .order_by('pk')
+                .values_list('pk', flat=True)
+            )
+            if anonymous_cart.pk not in locked:
+                # Корзину уже объединили в параллельном запросе
+                return user_cart
             
-            if user_item:
-                # Сложить количество (с проверкой лимита)
-                new_quantity = min(
-                    user_item.quantity + anon_item.quantity,
-                    anon_item.product.stock_quantity
-                )
-                user_item.quantity = new_quantity
-                user_item.save()
-            else:
-                anon_item.cart = user_cart
-                anon_item.save()
-
-        # Удалить анонимную корзину
-        anonymous_cart.delete()
+            user_quantities, anon_items = {}, []
+            for item in CartItem.objects.filter(
+                cart__in=[anonymous_cart.pk, user_cart.pk]
+            ).select_related('product').only('cart_id', 'product_id', 'quantity', 'product__stock_quantity'):
+                if item.cart_id == user_cart.pk:
+                    user_quantities[item.product_id] = item.quantity
+                else:
+                    anon_items.append(item)
+            
+            merged = []
+            for anon_item in anon_items:
+                quantity = anon_item.quantity
+                if anon_item.product_id in user_quantities:
+                    # Сложить количество (с проверкой лимита)
+                    quantity = min(
+                        user_quantities[anon_item.product_id] + quantity,
+                        anon_item.product.stock_quantity
+                    )
+                merged.append(CartItem(cart=user_cart, product_id=anon_item.product_id, quantity=quantity))
+            
+            CartItem.objects.bulk_create(
+                merged,
+                update_conflicts=True,
+                unique_fields=['cart', 'product'],
+                update_fields=['quantity']
+            )
+            
+            StockReservationService.transfer(
+                StockReservationService.cart_owner(anonymous_cart),
+                StockReservationService.cart_owner(user_cart),
+                {item.product_id: item.quantity for item in merged}
+            )
+            
+            # Удалить анонимную корзину
+            anonymous_cart.delete()
+        return user_cart
+    
+    @staticmethod
+    def delete_abandoned_carts(ttl=None) -> int:
+        """
+        Удалить анонимные корзины без изменений дольше ttl секунд.
+        
+        По умолчанию CART_ANONYMOUS_TTL. Возвращает число удаленных корзин.
+        """
+        if ttl is None:
+            ttl = getattr(settings, 'CART_ANONYMOUS_TTL', 60 * 60 * 24 * 7)
+        cutoff = timezone.now() - timedelta(seconds=ttl)
+        abandoned = Cart.objects.filter(user__isnull=True, updated_at__lt=cutoff).exclude(
+            Exists(CartItem.objects.filter(cart=OuterRef('pk'), added_at__gte=cutoff))
+        )
+        deleted, per_model = abandoned.delete()
+        return per_model.get(Cart._meta.label, 0)
     
     @staticmethod
     def get_cart_summary(cart):
         """Получить сводку по корзине."""
-        items = cart.items.select_related('product').all()
+        if isinstance(cart, Cart):
+            CartService.prefetch_items(cart)
+        items = cart.items.all()
         
         return {
-            'items_count': items.count(),
+            'items_count': len(items),
             'total_items': sum(item.quantity for item in items),
             'total_price': sum(item.get_total_price() for item in items),
             'items': [
@@ -139,3 +227,216 @@ class CartService:
                 for item in items
             ]
         }
+
+
+class StockReservationService:
+    """
+    Резервы товаров под корзины.
+    
+    Products.reserved_quantity — сумма активных резервов. Резерв
+    увеличивается условным UPDATE ... WHERE stock_quantity - reserved_quantity >= n:
+    проверка и запись выполняются одним оператором, поэтому параллельные
+    покупатели не могут зарезервировать одни и те же единицы. Резервы
+    владельца живут STOCK_RESERVATION_TTL секунд с последнего изменения
+    корзины, просроченные снимает release_expired.
+    """
+    
+    @staticmethod
+    def owner_key(user=None, session_key=None) -> str:
+        if user and user.is_authenticated:
+            return f'user:{user.pk}'
+        if session_key:
+            return f'session:{session_key}'
+        raise ValueError('Необходимо указать user или session_key')
+    
+    @staticmethod
+    def cart_owner(cart: Cart) -> str:
+        if cart.user_id:
+            return f'user:{cart.user_id}'
+        return f'session:{cart.session_key}'
+    
+    @staticmethod
+    def get_expires_at():
+        ttl = getattr(settings, 'STOCK_RESERVATION_TTL', 30 * 60)
+        return timezone.now() + timedelta(seconds=ttl)
+    
+    @staticmethod
+    def reserve(owner: str, product_id: int, quantity: int, _retry=True):
+        """
+        Установить резерв владельца на товар равным quantity (0 — снять).
+        
+        Списывается только разница с текущим резервом. Срок жизни продлевается
+        всем резервам владельца: корзина активна. ValidationError, если
+        свободного остатка не хватает.
+        """
+        expires_at = StockReservationService.get_expires_at()
+        try:
+            with transaction.atomic():
+                reservation = StockReservation.objects.select_for_update().filter(
+                    owner=owner, product_id=product_id
+                ).first()
+                current = reservation.quantity if reservation else 0
+                delta = quantity - current
+                
+                if delta > 0:
+                    reserved = Product.objects.filter(
+                        pk=product_id,
+                        is_available=True,
+                        stock_quantity__gte=F('reserved_quantity') + delta
+                    ).update(reserved_quantity=F('reserved_quantity') + delta)
+                    if not reserved:
+                        free = Product.objects.filter(pk=product_id).values_list(
+                            F('stock_quantity') - F('reserved_quantity'), flat=True
+                        ).first() or 0
+                        raise ValidationError(
+                            f'Недостаточно товара. Доступно: ({current + max(free, 0)})'
+                        )
+                elif delta < 0:
+                    Product.objects.filter(pk=product_id).update(
+                        reserved_quantity=F('reserved_quantity') + delta
+                    )
+                
+                if quantity == 0:
+                    if reservation:
+                        reservation.delete()
+                elif reservation:
+                    reservation.quantity = quantity
+                    reservation.save(update_fields=['quantity'])
+                else:
+                    StockReservation.objects.create(
+                        owner=owner, product_id=product_id, quantity=quantity, expires_at=expires_at
+                    )
+                StockReservation.objects.filter(owner=owner).update(expires_at=expires_at)
+        except IntegrityError:
+            # Параллельный запрос того же владельца успел создать резерв
+            if not _retry:
+                raise
+            StockReservationService.reserve(owner, product_id, quantity, _retry=False)
+    
+    @staticmethod
+    def release(owner: str, product_ids=None) -> int:
+        """Снять резервы владельца (все или по товарам). Возвращает число снятых единиц."""
+        with transaction.atomic():
+            reservations = StockReservation.objects.select_for_update().filter(owner=owner)
+            if product_ids is not None:
+                reservations = reservations.filter(product_id__in=product_ids)
+            return StockReservationService._release_rows(
+                list(reservations.values_list('pk', 'product_id', 'quantity'))
+            )
+    
+    @staticmethod
+    def transfer(from_owner: str, to_owner: str, quantities=None):
+        """
+        Передать резервы другому владельцу (гостевая корзина при входе).
+        
+        Совпадающие товары складываются: единицы уже зарезервированы,
+        остаток товаров не меняется. quantities — {product_id: количество
+        в объединенной корзине}: если сумма в корзине урезана по остатку,
+        резерв сверх нее возвращается на склад.
+        """
+        with transaction.atomic():
+            reservations = list(
+                StockReservation.objects.select_for_update()
+                .filter(owner__in=[from_owner, to_owner])
+                .order_by('pk')
+            )
+            target = {r.product_id: r for r in reservations if r.owner == to_owner}
+            expires_at = StockReservationService.get_expires_at()
+            
+            changed, removed = [], []
+            for reservation in reservations:
+                if reservation.owner != from_owner:
+                    continue
+                existing = target.get(reservation.product_id)
+                if existing:
+                    existing.quantity += reservation.quantity
+                    changed.append(existing)
+                    removed.append(reservation.pk)
+                else:
+                    reservation.owner = to_owner
+                    changed.append(reservation)
+            
+            excess = defaultdict(int)
+            for reservation in changed:
+                reservation.expires_at = expires_at
+                limit = (quantities or {}).get(reservation.product_id, reservation.quantity)
+                if reservation.quantity > limit:
+                    excess[reservation.product_id] += reservation.quantity - limit
+                    reservation.quantity = limit
+                    if not limit:
+                        removed.append(reservation.pk)
+            changed = [reservation for reservation in changed if reservation.quantity]
+            
+            StockReservation.objects.filter(pk__in=removed).delete()
+            StockReservation.objects.bulk_update(changed, ['owner', 'quantity', 'expires_at'])
+            StockReservationService._return_units(excess)
+    
+    @staticmethod
+    def commit(owner: str) -> int:
+        """
+        Списать зарезервированное со склада (оформление заказа).
+        
+        stock_quantity и reserved_quantity уменьшаются одним UPDATE.
+        Возвращает число списанных единиц.
+        """
+        with transaction.atomic():
+            rows = list(
+                StockReservation.objects.select_for_update()
+                .filter(owner=owner)
+                .values_list('pk', 'product_id', 'quantity')
+            )
+            return StockReservationService._release_rows(rows, consume=True)
+    
+    @staticmethod
+    def release_expired(batch_size=1000) -> int:
+        """
+        Снять просроченные резервы пачками.
+        
+        Строки, заблокированные идущими изменениями корзин, пропускаются
+        (SKIP LOCKED) и будут сняты следующим запуском. Возвращает число
+        освобожденных единиц.
+        """
+        released = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    StockReservation.objects.select_for_update(skip_locked=True)
+                    .filter(expires_at__lte=timezone.now())
+                    .order_by('pk')
+                    .values_list('pk', 'product_id', 'quantity')[:batch_size]
+                )
+                released += StockReservationService._release_rows(rows)
+            if len(rows) < batch_size:
+                return released
+    
+    @staticmethod
+    def _release_rows(rows, consume=False) -> int:
+        """Удалить резервы (pk, product_id, quantity) и вернуть единицы одним UPDATE."""
+        if not rows:
+            return 0
+        
+        per_product = defaultdict(int)
+        for _, product_id, quantity in rows:
+            per_product[product_id] += quantity
+        StockReservationService._return_units(per_product, consume=consume)
+        
+        StockReservation.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+        return sum(per_product.values())
+    
+    @staticmethod
+    def _return_units(per_product, consume=False):
+        """Уменьшить reserved_quantity (и stock_quantity при consume) по {product_id: единицы}."""
+        if not per_product:
+            return
+        
+        delta = Case(
+            *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in per_product.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        )
+        updates = {'reserved_quantity': F('reserved_quantity') - delta}
+        if consume:
+            updates['stock_quantity'] = F('stock_quantity') - delta
+            # Остаток мог закончиться: флаг наличия в карточке списка
+            schedule_card_refresh(list(per_product))
+        Product.objects.filter(pk__in=per_product).update(**updates)
@@ -0,0 +1,369 @@
+import logging
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django_redis import get_redis_connection
+
+from apps.products.models import Product
+from .models import Cart, CartItem
+from .services import CartService, StockReservationService
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseCartStore:
+    """
+    Корзина в таблицах carts/cart_items (хранилище по умолчанию).
+    
+    Позиции адресуются по CartItem.id.
+    """
+    
+    def get_cart(self, user=None, session_key=None):
+        return CartService.get_cart_with_items(user=user, session_key=session_key)
+    
+    def add_item(self, product, quantity, user=None, session_key=None):
+        """Возвращает (id позиции, новое количество)."""
+        cart = CartService.get_or_create_cart(user=user, session_key=session_key)
+        cart_item = CartService.add_item(cart, product, quantity)
+        return cart_item.id, cart_item.quantity
+    
+    def update_quantity(self, item_id, quantity, user=None, session_key=None):
+        """Новое количество или None, если позиция удалена (quantity=0)."""
+        cart_item = self._get_item(item_id, user, session_key)
+        updated_item = CartService.update_quantity(cart_item, quantity)
+        return updated_item.quantity if updated_item else None
+    
+    def remove_item(self, item_id, user=None, session_key=None):
+        CartService.remove_item(self._get_item(item_id, user, session_key))
+    
+    def clear(self, user=None, session_key=None):
+        cart = CartService.get_or_create_cart(user=user, session_key=session_key)
+        CartService.clear_cart(cart)
+    
+    def merge(self, session_key, user):
+        """Перенести анонимную корзину сессии в корзину пользователя (при входе)."""
+        anonymous_cart = Cart.objects.filter(session_key=session_key, user__isnull=True).first()
+        if anonymous_cart is not None:
+            CartService.merge_carts(anonymous_cart, CartService.get_or_create_cart(user=user))
+    
+    def persist(self, user=None, session_key=None):
+        """Данные уже в БД."""
+    
+    def persist_dirty(self) -> int:
+        return 0
+    
+    @staticmethod
+    def _get_item(item_id, user, session_key):
+        """CartItem.DoesNotExist, если позиции нет в корзине владельца."""
+        owner = {'cart__user': user} if user and user.is_authenticated else {'cart__session_key': session_key}
+        return CartItem.objects.select_related('product', 'cart').get(id=item_id, **owner)
+
+
+class RedisCartItems(list):
+    """Список позиций с интерфейсом менеджера: cart.items.all()."""
+    
+    def all(self):
+        return self
+
+
+class RedisCart:
+    """Корзина из Redis в том виде, который ожидают CartSerializer и get_cart_summary."""
+    
+    def __init__(self, pk, items):
+        self.pk = self.id = pk
+        self.items = RedisCartItems(items)
+    
+    def get_total_price(self):
+        return sum(item.get_total_price() for item in self.items)
+    
+    def get_total_items(self):
+        return sum(item.quantity for item in self.items)
+
+
+class RedisCartStore:
+    """
+    Горячие корзины в Redis-хешах {product_id: количество}.
+    
+    Изменения атомарны (Lua-скрипт с HINCRBY и проверкой остатка), позиции
+    адресуются по id товара. Корзины пользователей помечаются грязными
+    и переносятся в Cart/CartItem задачей persist_carts (write-behind)
+    или явно через persist() при оформлении заказа. Анонимные корзины
+    живут только в Redis и удаляются по TTL.
+    """
+    
+    KEY_PREFIX = 'cart'
+    DIRTY_KEY = 'cart:dirty'
+    # Служебное поле хеша: id строки Cart (есть только у корзин пользователей)
+    CART_FIELD = '_cart'
+    
+    # KEYS: корзина, набор грязных. ARGV: товар, приращение, лимит, TTL, член набора грязных
+    ADD_SCRIPT = """
+    local quantity = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0') + tonumber(ARGV[2])
+    if quantity > tonumber(ARGV[3]) then
+        return -1
+    end
+    redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+    if ARGV[5] ~= '' then
+        redis.call('SADD', KEYS[2], ARGV[5])
+    end
+    return quantity
+    """
+    # Те же KEYS/ARGV; количество 0 удаляет позицию. Возвращает прежнее
+    # количество, -1 — позиции нет
+    SET_SCRIPT = """
+    local previous = redis.call('HGET', KEYS[1], ARGV[1])
+    if not previous then
+        return -1
+    end
+    if tonumber(ARGV[2]) == 0 then
+        redis.call('HDEL', KEYS[1], ARGV[1])
+    else
+        redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+    if ARGV[5] ~= '' then
+        redis.call('SADD', KEYS[2], ARGV[5])
+    end
+    return tonumber(previous)
+    """
+    
+    # KEYS: анонимная корзина, корзина пользователя, набор грязных. ARGV: TTL,
+    # член набора грязных, затем тройки (товар, количество, остаток)
+    MERGE_SCRIPT = """
+    for i = 3, #ARGV, 3 do
+        local quantity = tonumber(ARGV[i + 1])
+        local current = redis.call('HGET', KEYS[2], ARGV[i])
+        if current then
+            quantity = math.min(tonumber(current) + quantity, tonumber(ARGV[i + 2]))
+        end
+        redis.call('HSET', KEYS[2], ARGV[i], quantity)
+    end
+    redis.call('DEL', KEYS[1])
+    redis.call('EXPIRE', KEYS[2], ARGV[1])
+    redis.call('SADD', KEYS[3], ARGV[2])
+    return (#ARGV - 2) / 3
+    """
+    
+    def __init__(self):
+        self.redis = get_redis_connection('default')
+        self.add_script = self.redis.register_script(self.ADD_SCRIPT)
+        self.set_script = self.redis.register_script(self.SET_SCRIPT)
+        self.merge_script = self.redis.register_script(self.MERGE_SCRIPT)
+    
+    @property
+    def anonymous_ttl(self):
+        return getattr(settings, 'CART_ANONYMOUS_TTL', 60 * 60 * 24 * 7)
+    
+    @property
+    def user_ttl(self):
+        return getattr(settings, 'CART_USER_TTL', 60 * 60 * 24 * 30)
+    
+    def _owner(self, user, session_key):
+        """(ключ хеша, TTL, член набора грязных)."""
+        if user and user.is_authenticated:
+            key = f'{self.KEY_PREFIX}:user:{user.pk}'
+            return key, self.user_ttl, key
+        if session_key:
+            return f'{self.KEY_PREFIX}:session:{session_key}', self.anonymous_ttl, ''
+        raise ValueError('Необходимо указать user или session_key')
+    
+    def _load(self, user, session_key):
+        """
+        Ключ корзины; корзина пользователя при первом обращении заполняется из БД.
+        
+        HSETNX служебного поля выбирает одного загрузчика, позиции пишутся
+        через HSETNX и не затирают изменения, сделанные параллельно.
+        """
+        key, ttl, dirty = self._owner(user, session_key)
+        if not dirty or self.redis.hexists(key, self.CART_FIELD):
+            return key, ttl, dirty
+        
+        cart = CartService.get_or_create_cart(user=user)
+        if self.redis.hsetnx(key, self.CART_FIELD, cart.pk):
+            pipe = self.redis.pipeline()
+            for product_id, quantity in cart.items.values_list('product_id', 'quantity'):
+                pipe.hsetnx(key, product_id, quantity)
+            pipe.expire(key, ttl)
+            pipe.execute()
+        return key, ttl, dirty
+    
+    def _read(self, key):
+        """(id строки Cart, {product_id: количество})."""
+        data = self.redis.hgetall(key)
+        cart_id = int(data.pop(self.CART_FIELD.encode(), 0)) or None
+        return cart_id, {int(product_id): int(quantity) for product_id, quantity in data.items()}
+    
+    def get_cart(self, user=None, session_key=None):
+        """Корзина с товарами и главными изображениями: HGETALL и два запроса."""
+        key, _, dirty = self._load(user, session_key)
+        cart_id, quantities = self._read(key)
+        
+        products = Product.objects.filter(pk__in=quantities).prefetch_related(
+            Product.prefetch_main_image()
+        ).in_bulk()
+        missing = [product_id for product_id in quantities if product_id not in products]
+        if missing:
+            # Товар удален из каталога — убираем его и из корзины
+            self.redis.hdel(key, *missing)
+            if dirty:
+                self.redis.sadd(self.DIRTY_KEY, dirty)
+        
+        items = [
+            CartItem(pk=product_id, cart_id=cart_id, product=products[product_id], quantity=quantity)
+            for product_id, quantity in sorted(quantities.items())
+            if product_id in products
+        ]
+        return RedisCart(cart_id, items)
+    
+    def add_item(self, product, quantity, user=None, session_key=None):
+        if not product.is_available:
+            raise ValidationError('Товар недоступен')
+        
+        key, ttl, dirty = self._load(user, session_key)
+        new_quantity = self.add_script(
+            keys=[key, self.DIRTY_KEY],
+            args=[product.pk, quantity, product.stock_quantity, ttl, dirty]
+        )
+        if new_quantity < 0:
+            raise ValidationError(f'Недостаточно товара. Доступно: ({product.stock_quantity})')
+        
+        try:
+            StockReservationService.reserve(
+                StockReservationService.owner_key(user, session_key), product.pk, new_quantity
+            )
+        except ValidationError:
+            # Резерв не получен — откатываем приращение
+            if self.redis.hincrby(key, product.pk, -quantity) <= 0:
+                self.redis.hdel(key, product.pk)
+            raise
+        return product.pk, new_quantity
+    
+    def update_quantity(self, item_id, quantity, user=None, session_key=None):
+        key, ttl, dirty = self._load(user, session_key)
+        previous = self.set_script(keys=[key, self.DIRTY_KEY], args=[item_id, quantity, 0, ttl, dirty])
+        if previous < 0:
+            raise CartItem.DoesNotExist
+        
+        try:
+            StockReservationService.reserve(
+                StockReservationService.owner_key(user, session_key), item_id, quantity
+            )
+        except ValidationError:
+            self.set_script(keys=[key, self.DIRTY_KEY], args=[item_id, previous, 0, ttl, dirty])
+            raise
+        return quantity or None
+    
+    def remove_item(self, item_id, user=None, session_key=None):
+        self.update_quantity(item_id, 0, user=user, session_key=session_key)
+    
+    def clear(self, user=None, session_key=None):
+        key, ttl, dirty = self._load(user, session_key)
+        # Служебное поле остается: пустая корзина не загрузится из БД заново
+        fields = [
+            field for field in self.redis.hkeys(key)
+            if field != self.CART_FIELD.encode()
+        ]
+        if fields:
+            self.redis.hdel(key, *fields)
+        if dirty:
+            self.redis.sadd(self.DIRTY_KEY, dirty)
+        StockReservationService.release(StockReservationService.owner_key(user, session_key))
+    
+    def merge(self, session_key, user):
+        """
+        Перенести анонимную корзину в корзину пользователя одним Lua-скриптом.
+        
+        Остатки для ограничения суммы читаются одним запросом, слияние и
+        удаление анонимного хеша атомарны относительно других изменений корзины.
+        """
+        anonymous_key, _, _ = self._owner(None, session_key)
+        _, quantities = self._read(anonymous_key)
+        if not quantities:
+            return
+        
+        key, ttl, dirty = self._load(user, None)
+        stocks = dict(Product.objects.filter(pk__in=quantities).values_list('pk', 'stock_quantity'))
+        args = [ttl, dirty]
+        for product_id, quantity in quantities.items():
+            if product_id in stocks:
+                args.extend([product_id, quantity, stocks[product_id]])
+        self.merge_script(keys=[anonymous_key, key, self.DIRTY_KEY], args=args)
+        
+        # Сумма урезана по остатку: резерв пользователя — не больше итогового количества
+        product_ids = list(stocks)
+        merged = self.redis.hmget(key, product_ids) if product_ids else []
+        StockReservationService.transfer(
+            StockReservationService.owner_key(session_key=session_key),
+            StockReservationService.owner_key(user),
+            {
+                product_id: int(quantity or 0)
+                for product_id, quantity in zip(product_ids, merged)
+            }
+        )
+    
+    def persist(self, user=None, session_key=None):
+        """Записать корзину пользователя в БД сейчас (например, перед оформлением заказа)."""
+        key, _, dirty = self._load(user, session_key)
+        if dirty:
+            self._persist_key(key)
+            self.redis.srem(self.DIRTY_KEY, dirty)
+    
+    def persist_dirty(self, batch_size=500) -> int:
+        """
+        Перенести измененные корзины в Cart/CartItem.
+        
+        Если запись не удалась, упавший ключ и все еще не записанные ключи
+        пачки возвращаются в набор грязных до следующего запуска.
+        Возвращает число записанных корзин.
+        """
+        persisted = 0
+        while True:
+            keys = [key.decode() for key in self.redis.spop(self.DIRTY_KEY, batch_size)]
+            if not keys:
+                return persisted
+            for index, key in enumerate(keys):
+                try:
+                    self._persist_key(key)
+                except Exception:
+                    logger.exception(f'Cart persist failed for {key}')
+                    self.redis.sadd(self.DIRTY_KEY, *keys[index:])
+                    return persisted
+                persisted += 1
+    
+    def _persist_key(self, key):
+        """Синхронизировать cart_items с хешем: удалить лишние строки, upsert остальных."""
+        cart_id, quantities = self._read(key)
+        if cart_id is None:
+            # Хеш истек по TTL — в БД последняя записанная версия
+            return
+        
+        product_ids = set(Product.objects.filter(pk__in=quantities).values_list('pk', flat=True))
+        with transaction.atomic():
+            CartItem.objects.filter(cart_id=cart_id).exclude(product_id__in=product_ids).delete()
+            CartItem.objects.bulk_create(
+                [
+                    CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity)
+                    for product_id, quantity in quantities.items()
+                    if product_id in product_ids
+                ],
+                update_conflicts=True,
+                unique_fields=['cart', 'product'],
+                update_fields=['quantity']
+            )
+            Cart.objects.filter(pk=cart_id).update(updated_at=timezone.now())
+
+
+CART_STORES = {
+    'database': DatabaseCartStore,
+    'redis': RedisCartStore,
+}
+
+
+def get_cart_store():
+    """Хранилище корзин из настройки CART_STORE: 'database' (по умолчанию), 'redis' или путь к классу."""
+    name = getattr(settings, 'CART_STORE', 'database')
+    store_class = CART_STORES.get(name) or import_string(name)
+    return store_class()
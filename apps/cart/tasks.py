@@ -0,0 +1,22 @@
+from celery import shared_task
+
+from .services import CartService, StockReservationService
+from .stores import get_cart_store
+
+
+@shared_task(acks_late=True)
+def persist_carts():
+    """Перенести измененные корзины из Redis в БД (при CART_STORE='redis')"""
+    return get_cart_store().persist_dirty()
+
+
+@shared_task(acks_late=True)
+def delete_abandoned_carts():
+    """Удалить анонимные корзины в БД, которые давно не менялись"""
+    return CartService.delete_abandoned_carts()
+
+
+@shared_task(acks_late=True)
+def release_expired_reservations():
+    """Снять просроченные резервы товаров"""
+    return StockReservationService.release_expired()
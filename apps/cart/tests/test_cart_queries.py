@@ -0,0 +1,57 @@
+from decimal import Decimal
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.products.models import Category, Brand, Product, ProductImage
+from apps.cart.models import CartItem
+from apps.cart.services import CartService
+
+
+class CartQueryCountTest(TestCase):
+    """GET /api/cart/ стоит одинаковое число запросов при N и 10N позициях."""
+    
+    N = 3
+    # Корзина, позиции с товарами, главные изображения
+    QUERIES = 3
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Cart query category')
+        cls.brand = Brand.objects.create(name='Cart query brand')
+        cls.user = User.objects.create_user('cart-query@example.com', 'password')
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.cart = CartService.get_or_create_cart(user=self.user)
+    
+    def add_items(self, start, count):
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                category=self.category, brand=self.brand, name=f'Cart query product {i}',
+                description='', price=100 + i, discount_price=90 + i if i % 2 else None,
+                stock_quantity=10, sku=f'CART-QUERY-{i}'
+            )
+            ProductImage.objects.create(product=product, image=f'products/cart-{i}.jpg', is_main=True)
+            CartItem.objects.create(cart=self.cart, product=product, quantity=i % 3 + 1)
+    
+    def test_constant_queries(self):
+        self.add_items(0, self.N)
+        for size in (self.N, 10 * self.N):
+            if size > self.N:
+                self.add_items(self.N, size - self.N)
+            with self.subTest(size=size), self.assertNumQueries(self.QUERIES):
+                response = self.client.get('/api/cart/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['items']), size)
+    
+    def test_totals_computed_from_items(self):
+        self.add_items(0, self.N)
+        data = self.client.get('/api/cart/').data
+        items = CartItem.objects.filter(cart=self.cart).select_related('product')
+        self.assertEqual(data['items_count'], sum(item.quantity for item in items))
+        self.assertEqual(
+            Decimal(data['total_price']),
+            sum(item.product.get_final_price() * item.quantity for item in items)
+        )
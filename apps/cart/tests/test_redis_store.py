@@ -0,0 +1,71 @@
+from unittest import mock
+
+import fakeredis
+from django.test import TestCase
+
+from apps.users.models import User
+from apps.products.models import Category, Brand, Product
+from apps.cart.models import CartItem
+from apps.cart.stores import RedisCartStore
+
+
+class RedisCartStoreTest(TestCase):
+    """Redis подменяется fakeredis (Lua-скрипты исполняет lupa)."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Redis cart category')
+        brand = Brand.objects.create(name='Redis cart brand')
+        cls.product = Product.objects.create(
+            category=category, brand=brand, name='Redis cart product',
+            description='', price=100, stock_quantity=10, sku='REDIS-CART-1'
+        )
+        cls.users = [
+            User.objects.create_user(f'redis-cart-{i}@example.com', 'password')
+            for i in range(3)
+        ]
+    
+    def setUp(self):
+        patcher = mock.patch('apps.cart.stores.get_redis_connection', return_value=fakeredis.FakeRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = RedisCartStore()
+    
+    def add_to_carts(self):
+        for quantity, user in enumerate(self.users, start=1):
+            self.store.add_item(self.product, quantity, user=user)
+    
+    def persisted_quantities(self):
+        return dict(CartItem.objects.values_list('cart__user_id', 'quantity'))
+    
+    def test_persist_dirty_writes_user_carts(self):
+        self.add_to_carts()
+        self.assertEqual(self.store.persist_dirty(), 3)
+        self.assertEqual(
+            self.persisted_quantities(),
+            {user.pk: quantity for quantity, user in enumerate(self.users, start=1)}
+        )
+        self.assertEqual(self.store.redis.scard(RedisCartStore.DIRTY_KEY), 0)
+    
+    def test_persist_dirty_keeps_unprocessed_keys_on_failure(self):
+        self.add_to_carts()
+        persist_key = self.store._persist_key
+        calls = []
+        
+        def fail_second(key):
+            calls.append(key)
+            if len(calls) == 2:
+                raise RuntimeError('database is unavailable')
+            persist_key(key)
+        
+        with mock.patch.object(self.store, '_persist_key', side_effect=fail_second):
+            self.assertEqual(self.store.persist_dirty(batch_size=10), 1)
+        
+        # Записана только первая корзина; упавшая и непройденная остались грязными
+        remaining = {key.decode() for key in self.store.redis.smembers(RedisCartStore.DIRTY_KEY)}
+        self.assertEqual(len(remaining), 2)
+        self.assertNotIn(calls[0], remaining)
+        self.assertIn(calls[1], remaining)
+        
+        self.assertEqual(self.store.persist_dirty(), 2)
+        self.assertEqual(len(self.persisted_quantities()), 3)
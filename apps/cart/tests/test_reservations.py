@@ -0,0 +1,95 @@
+from datetime import timedelta
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.users.models import User
+from apps.products.models import Category, Brand, Product
+from apps.cart.models import StockReservation
+from apps.cart.services import CartService, StockReservationService
+
+
+class StockReservationTest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Reservation category')
+        brand = Brand.objects.create(name='Reservation brand')
+        cls.product = Product.objects.create(
+            category=category, brand=brand, name='Reservation product',
+            description='', price=100, stock_quantity=5, sku='RESERVATION-1'
+        )
+        cls.user = User.objects.create_user('reservation@example.com', 'password')
+    
+    def setUp(self):
+        self.guest_cart = CartService.get_or_create_cart(session_key='guest-session')
+        self.user_cart = CartService.get_or_create_cart(user=self.user)
+    
+    def assert_reserved(self, expected):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved_quantity, expected)
+        rows = sum(StockReservation.objects.filter(product=self.product).values_list('quantity', flat=True))
+        self.assertEqual(rows, expected)
+    
+    def test_add_item_reserves_stock(self):
+        CartService.add_item(self.guest_cart, self.product, 3)
+        CartService.add_item(self.guest_cart, self.product, 1)
+        self.assert_reserved(4)
+        self.assertEqual(self.product.get_available_quantity(), 1)
+    
+    def test_reserved_units_are_not_available_to_others(self):
+        CartService.add_item(self.user_cart, self.product, 4)
+        with self.assertRaises(ValidationError):
+            CartService.add_item(self.guest_cart, self.product, 2)
+        self.assert_reserved(4)
+        self.assertFalse(self.guest_cart.items.exists())
+    
+    def test_update_and_remove_release_units(self):
+        item = CartService.add_item(self.guest_cart, self.product, 4)
+        CartService.update_quantity(item, 1)
+        self.assert_reserved(1)
+        CartService.remove_item(item)
+        self.assert_reserved(0)
+    
+    def test_clear_cart_releases_all(self):
+        CartService.add_item(self.guest_cart, self.product, 2)
+        CartService.clear_cart(self.guest_cart)
+        self.assert_reserved(0)
+    
+    def test_merge_moves_guest_reservation_to_user(self):
+        CartService.add_item(self.guest_cart, self.product, 2)
+        CartService.add_item(self.user_cart, self.product, 1)
+        CartService.merge_carts(self.guest_cart, self.user_cart)
+        
+        self.assertEqual(self.user_cart.items.get().quantity, 3)
+        self.assertEqual(
+            list(StockReservation.objects.values_list('owner', 'quantity')),
+            [(f'user:{self.user.pk}', 3)]
+        )
+        self.assert_reserved(3)
+    
+    def test_merge_releases_reservation_above_merged_quantity(self):
+        CartService.add_item(self.guest_cart, self.product, 3)
+        CartService.add_item(self.user_cart, self.product, 2)
+        # Остаток уменьшили после резерва: объединенная позиция урезается до 4
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=4)
+        CartService.merge_carts(self.guest_cart, self.user_cart)
+        
+        self.assertEqual(self.user_cart.items.get().quantity, 4)
+        self.assert_reserved(4)
+    
+    def test_release_expired(self):
+        CartService.add_item(self.guest_cart, self.product, 2)
+        CartService.add_item(self.user_cart, self.product, 1)
+        StockReservation.objects.filter(owner='session:guest-session').update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        
+        self.assertEqual(StockReservationService.release_expired(), 2)
+        self.assert_reserved(1)
+    
+    def test_commit_consumes_stock(self):
+        CartService.add_item(self.user_cart, self.product, 2)
+        self.assertEqual(StockReservationService.commit(f'user:{self.user.pk}'), 2)
+        self.assert_reserved(0)
+        self.assertEqual(self.product.stock_quantity, 3)
@@ -1,9 +1,10 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
-from .services import CartService
+from .stores import get_cart_store
 from apps.products.models import Product
 from .models import CartItem
 from .serializers import (
@@ -19,7 +20,7 @@ class CartViewSet(viewsets.ViewSet):
 
     def list(self, request):
         """GET /cart/ — получить корзину"""
-        cart = CartService.get_or_create_cart(user=request.user)
+        cart = get_cart_store().get_cart(user=request.user)
         serializer = CartSerializer(cart)
         return Response(serializer.data)
 
@@ -29,32 +30,34 @@ class CartViewSet(viewsets.ViewSet):
         serializer = AddToCartSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        cart = CartService.get_or_create_cart(user=request.user)
         product = get_object_or_404(Product, id=serializer.validated_data['product_id'])
 
-        cart_item = CartService.add_item(
-            cart,
+        item_id, quantity = get_cart_store().add_item(
             product,
-            serializer.validated_data['quantity']
+            serializer.validated_data['quantity'],
+            user=request.user
         )
 
         return Response({
             'status': 'added',
-            'item_id': cart_item.id,
-            'quantity': cart_item.quantity
+            'item_id': item_id,
+            'quantity': quantity
         }, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['post'])
     def clear(self, request):
         """POST /cart/clear/ — очистить корзину"""
-        cart = CartService.get_or_create_cart(user=request.user)
-        CartService.clear_cart(cart)
+        get_cart_store().clear(user=request.user)
 
         return Response({'status': 'cleared'})
 
 
 class CartItemViewSet(viewsets.ViewSet):
-    """Операции с товарами в корзине"""
+    """
+    Операции с товарами в корзине
+    
+    pk — id позиции (CART_STORE='database') или id товара (CART_STORE='redis').
+    """
     permission_classes = [IsAuthenticated]
 
     def partial_update(self, request, pk=None):
@@ -62,24 +65,28 @@ class CartItemViewSet(viewsets.ViewSet):
         serializer = UpdateCartItemSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        cart_item = get_object_or_404(CartItem, id=pk, cart__user=request.user)
+        try:
+            quantity = get_cart_store().update_quantity(
+                int(pk),
+                serializer.validated_data['quantity'],
+                user=request.user
+            )
+        except (ValueError, CartItem.DoesNotExist):
+            raise NotFound('Товар не найден в корзине')
 
-        updated_item = CartService.update_quantity(
-            cart_item,
-            serializer.validated_data['quantity']
-        )
-
-        if updated_item is None:
+        if quantity is None:
             return Response({'status': 'removed'})
 
         return Response({
             'status': 'updated',
-            'quantity': updated_item.quantity
+            'quantity': quantity
         })
 
     def destroy(self, request, pk=None):
         """DELETE /cart/items/{pk}/ — удалить товар"""
-        cart_item = get_object_or_404(CartItem, id=pk, cart__user=request.user)
-        CartService.remove_item(cart_item)
+        try:
+            get_cart_store().remove_item(int(pk), user=request.user)
+        except (ValueError, CartItem.DoesNotExist):
+            raise NotFound('Товар не найден в корзине')
 
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,70 @@
+import time
+from django.core.cache import cache
+from django.db import transaction
+
+
+VERSION_KEY = 'cache-version:{}'
+STATS_KEY = 'cache-stats:{}:{}'
+
+
+def get_versions(*namespaces):
+    """Текущие версии пространств имен (одно обращение к кешу)."""
+    keys = {VERSION_KEY.format(namespace): namespace for namespace in namespaces}
+    stored = cache.get_many(list(keys))
+    
+    versions = {}
+    for key, namespace in keys.items():
+        version = stored.get(key)
+        if version is None:
+            # Ключ еще не создан или вытеснен: стартуем с метки времени,
+            # чтобы не совпасть ни с одной из прошлых версий
+            cache.add(key, time.time_ns(), timeout=None)
+            version = cache.get(key)
+        versions[namespace] = version
+    return versions
+
+
+def bump_version(*namespaces):
+    """Сменить версии: старые записи перестают адресоваться, инвалидация O(1)."""
+    for namespace in namespaces:
+        key = VERSION_KEY.format(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate(*namespaces):
+    """Сменить версии после коммита текущей транзакции."""
+    transaction.on_commit(lambda: bump_version(*namespaces))
+
+
+def record_hit(namespace, hit):
+    """Счетчики попаданий/промахов (общие для всех воркеров)."""
+    key = STATS_KEY.format(namespace, 'hits' if hit else 'misses')
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_stats(*namespaces):
+    """Попадания, промахи и hit ratio по пространствам имен."""
+    keys = [
+        STATS_KEY.format(namespace, kind)
+        for namespace in namespaces
+        for kind in ('hits', 'misses')
+    ]
+    stored = cache.get_many(keys)
+    
+    stats = {}
+    for namespace in namespaces:
+        hits = stored.get(STATS_KEY.format(namespace, 'hits'), 0)
+        misses = stored.get(STATS_KEY.format(namespace, 'misses'), 0)
+        total = hits + misses
+        stats[namespace] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None
+        }
+    return stats
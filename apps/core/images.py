@@ -0,0 +1,183 @@
+import logging
+import posixpath
+from io import BytesIO
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_RENDITION_SIZES = {
+    'thumb': (150, 150),
+    'small': (300, 300),
+    'medium': (600, 600),
+    'large': (1200, 1200),
+}
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+# (модель, поле изображения, JSON-поле с копиями), заполняется register_renditions
+RENDITION_REGISTRY = []
+
+# Копии записаны UPDATE'ом без post_save: sender — модель, аргументы pk и renditions
+renditions_ready = Signal()
+
+
+def get_rendition_sizes():
+    return getattr(settings, 'IMAGE_RENDITION_SIZES', DEFAULT_RENDITION_SIZES)
+
+
+def rendition_path(name, size, extension):
+    """
+    products/photo.jpg -> renditions/products/photo_jpg_small.webp
+    
+    Расширение оригинала входит в имя: у photo.jpg и photo.png разные копии.
+    """
+    directory, filename = posixpath.split(name)
+    stem, source_extension = posixpath.splitext(filename)
+    if source_extension:
+        stem = f'{stem}_{source_extension[1:].lower()}'
+    return posixpath.join('renditions', directory, f'{stem}_{size}.{extension}')
+
+
+def generate_renditions(field_file) -> dict:
+    """
+    Уменьшенные копии изображения во всех размерах в WebP и JPEG.
+    
+    Копии пишутся в то же хранилище рядом с оригиналом (каталог renditions/).
+    Возвращает {'source': имя оригинала, 'sizes': {размер: {формат: имя файла}}}.
+    """
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as source:
+        original = Image.open(source)
+        original.load()
+    original = ImageOps.exif_transpose(original)
+    
+    sizes = {}
+    for size, box in get_rendition_sizes().items():
+        image = original.copy()
+        image.thumbnail(box, Image.LANCZOS)
+        
+        sizes[size] = {}
+        for extension, (pil_format, options) in RENDITION_FORMATS.items():
+            converted = image
+            if pil_format == 'JPEG' and image.mode != 'RGB':
+                # JPEG без прозрачности: подкладываем белый фон
+                converted = Image.new('RGB', image.size, 'white')
+                rgba = image.convert('RGBA')
+                converted.paste(rgba, mask=rgba.getchannel('A'))
+            elif image.mode not in ('RGB', 'RGBA'):
+                converted = image.convert('RGBA')
+            
+            buffer = BytesIO()
+            converted.save(buffer, pil_format, **options)
+            path = rendition_path(field_file.name, size, extension)
+            if storage.exists(path):
+                storage.delete(path)
+            sizes[size][extension] = storage.save(path, ContentFile(buffer.getvalue()))
+    
+    return {'source': field_file.name, 'sizes': sizes}
+
+
+def process_image_field(model_label, pk, field_name, renditions_field):
+    """
+    Построить копии для изображения объекта и сохранить их имена.
+    
+    UPDATE выполняется только если изображение не сменилось за время
+    обработки, и без save(), чтобы не запускать сигналы повторно.
+    """
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return None
+    
+    try:
+        renditions = generate_renditions(field_file)
+    except (OSError, UnidentifiedImageError) as e:
+        logger.warning(f'Renditions failed for {model_label}#{pk}: {e}')
+        return None
+    
+    updated = model.objects.filter(pk=pk, **{field_name: field_file.name}).update(
+        **{renditions_field: renditions}
+    )
+    if updated:
+        invalidate(model._meta.label_lower)
+        renditions_ready.send(sender=model, pk=pk, renditions=renditions)
+    return renditions
+
+
+def rendition_name(field_file, renditions, size, extension='webp'):
+    """Имя файла копии нужного размера; пока копий нет — имя оригинала."""
+    if not field_file:
+        return None
+    renditions = renditions or {}
+    if renditions.get('source') == field_file.name:
+        name = renditions.get('sizes', {}).get(size, {}).get(extension)
+        if name:
+            return name
+    return field_file.name
+
+
+def rendition_url(field_file, renditions, size, extension='webp'):
+    """URL копии нужного размера; пока копий нет — URL оригинала."""
+    name = rendition_name(field_file, renditions, size, extension)
+    return field_file.storage.url(name) if name else None
+
+
+def rendition_urls(field_file, renditions):
+    """{размер: {формат: URL}} для сериализаторов."""
+    if not field_file or not renditions or renditions.get('source') != field_file.name:
+        return {}
+    storage = field_file.storage
+    return {
+        size: {extension: storage.url(name) for extension, name in formats.items()}
+        for size, formats in renditions.get('sizes', {}).items()
+    }
+
+
+def register_renditions(model, field_name, renditions_field):
+    """
+    Ставить генерацию копий в Celery после сохранения нового изображения.
+    
+    Смена изображения определяется по renditions['source'], задача
+    отправляется после коммита транзакции.
+    """
+    def schedule_renditions(sender, instance, **kwargs):
+        field_file = getattr(instance, field_name)
+        renditions = getattr(instance, renditions_field) or {}
+        if not field_file or renditions.get('source') == field_file.name:
+            return
+        
+        from .tasks import generate_image_renditions
+        args = (model._meta.label, instance.pk, field_name, renditions_field)
+        transaction.on_commit(lambda: generate_image_renditions.delay(*args))
+    
+    RENDITION_REGISTRY.append((model, field_name, renditions_field))
+    post_save.connect(
+        schedule_renditions,
+        sender=model,
+        weak=False,
+        dispatch_uid=f'renditions_{model._meta.label_lower}_{field_name}'
+    )
+
+
+def iter_rendition_jobs(force=False):
+    """(модель, pk, поле, поле копий) для изображений без актуальных копий."""
+    for model, field_name, renditions_field in RENDITION_REGISTRY:
+        rows = model.objects.exclude(**{field_name: ''}).exclude(
+            **{f'{field_name}__isnull': True}
+        ).values_list('pk', field_name, renditions_field)
+        for pk, name, renditions in rows.iterator(chunk_size=2000):
+            if force or (renditions or {}).get('source') != name:
+                yield model._meta.label, pk, field_name, renditions_field
@@ -0,0 +1,42 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.core.images import iter_rendition_jobs, process_image_field
+
+
+def run_job(job):
+    return process_image_field(*job) is not None
+
+
+class Command(BaseCommand):
+    help = 'Сгенерировать копии изображений, у которых их еще нет, в нескольких процессах'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--force', action='store_true', help='Пересоздать и существующие копии')
+    
+    def handle(self, *args, **options):
+        jobs = list(iter_rendition_jobs(force=options['force']))
+        if not jobs:
+            self.stdout.write(self.style.SUCCESS('Все изображения уже обработаны'))
+            return
+        
+        # Дочерние процессы не должны делить соединения с БД родителя
+        connections.close_all()
+        processed = failed = 0
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=get_context('fork'),
+            initializer=connections.close_all
+        ) as executor:
+            for ok in executor.map(run_job, jobs, chunksize=16):
+                if ok:
+                    processed += 1
+                else:
+                    failed += 1
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {processed}, с ошибками: {failed}'
+        ))
@@ -0,0 +1,192 @@
+from collections import namedtuple
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import URLResolver, get_resolver, reverse
+from rest_framework.test import APIClient
+
+from apps.core.benchmark import rollback_atomic, format_table
+from apps.core.utils import QueryTimer
+from apps.users.models import User
+from apps.products.models import (
+    Category, Brand, Product,
+    ProductImage, ProductSpecification, Review
+)
+from apps.products.read_models import rebuild_product_cards
+from apps.products.search import get_search_index
+from apps.cart.models import Cart, CartItem
+
+
+Endpoint = namedtuple('Endpoint', ['name', 'viewset', 'action', 'url_kwargs'])
+
+# Обязательные query-параметры эндпоинтов
+QUERY_PARAMS = {
+    'products:product-search': {'q': 'budget product'},
+}
+
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+def iter_router_endpoints(patterns=None, namespace=None):
+    """GET-маршруты ViewSet'ов из корневого urls.py (без format-суффиксов)."""
+    for pattern in patterns if patterns is not None else get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            nested = ':'.join(filter(None, [namespace, pattern.namespace])) or None
+            yield from iter_router_endpoints(pattern.url_patterns, nested)
+            continue
+        
+        groups = pattern.pattern.regex.groupindex
+        actions = getattr(pattern.callback, 'actions', None)
+        if not actions or 'get' not in actions or 'format' in groups or not pattern.name:
+            continue
+        
+        name = f'{namespace}:{pattern.name}' if namespace else pattern.name
+        yield Endpoint(name, pattern.callback.cls, actions['get'], list(groups))
+
+
+def build_dataset(size):
+    """
+    Синтетический каталог: size корневых категорий с подкатегориями,
+    5*size товаров с изображениями, характеристиками и отзывами,
+    корзина staff-пользователя с товарами.
+    """
+    staff = User.objects.create_user('budget-staff@example.com', 'password', is_staff=True)
+    
+    brands = [Brand.objects.create(name=f'Budget brand {i}') for i in range(size)]
+    categories = []
+    for i in range(size):
+        root = Category.objects.create(name=f'Budget root {i}')
+        categories.append(Category.objects.create(name=f'Budget child {i}', parent=root))
+    
+    products = []
+    for i in range(size * 5):
+        product = Product.objects.create(
+            category=categories[i % len(categories)],
+            brand=brands[i % len(brands)],
+            name=f'Budget product {i}',
+            description='Synthetic product',
+            price=1000 + i,
+            discount_price=900 + i if i % 2 else None,
+            stock_quantity=100,
+            sku=f'BUDGET-{i}'
+        )
+        ProductImage.objects.create(product=product, image=f'products/budget-{i}.jpg', is_main=True)
+        ProductImage.objects.create(product=product, image=f'products/budget-{i}-2.jpg', order=1)
+        ProductSpecification.objects.create(product=product, spec_name='Цвет', spec_value='Черный')
+        ProductSpecification.objects.create(product=product, spec_name='Вес', spec_value='100 г')
+        
+        if i == 0:
+            # Отзыв staff-пользователя первым: detail-эндпоинт отзывов доступен только автору
+            Review.objects.create(
+                product=product, user=staff, rating=5, is_verified_purchase=True
+            )
+        reviewer = User.objects.create_user(f'budget-{i}@example.com', 'password')
+        Review.objects.create(
+            product=product, user=reviewer, rating=i % 5 + 1,
+            comment='Synthetic review', is_verified_purchase=True
+        )
+        products.append(product)
+    
+    # Индекс и карточки обновляются on_commit, а данные живут внутри откатываемой транзакции
+    get_search_index().rebuild()
+    rebuild_product_cards()
+    
+    cart = Cart.objects.create(user=staff)
+    for product in products[:30]:
+        CartItem.objects.create(cart=cart, product=product, quantity=1)
+    
+    return staff
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогнать все GET-эндпоинты роутеров на синтетических данных 1x и Nx '
+        'и упасть, если число SQL-запросов растет вместе с данными'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=3, help='Базовый размер данных (1x)')
+        parser.add_argument('--scale', type=int, default=10, help='Во сколько раз больше второй прогон')
+        parser.add_argument('--tolerance', type=int, default=0, help='Допустимый прирост запросов')
+        parser.add_argument('--exclude', nargs='*', default=[], help='Имена маршрутов, которые не проверяются')
+    
+    def handle(self, *args, **options):
+        endpoints = [
+            endpoint for endpoint in iter_router_endpoints()
+            if endpoint.name not in options['exclude']
+        ]
+        multipliers = (1, options['scale'])
+        results = {}
+        
+        # Кеш ответов выключен, иначе второй прогон измерял бы кеш, а не БД.
+        # Остальной кеш (версии, сессии) — в памяти процесса: проверке не нужен Redis
+        with override_settings(
+            RESPONSE_CACHE_ENABLED=False,
+            ALLOWED_HOSTS=['*'],
+            CACHES=LOCAL_CACHES
+        ):
+            for multiplier in multipliers:
+                with rollback_atomic():
+                    user = build_dataset(options['size'] * multiplier)
+                    # Упавший эндпоинт получает вердикт HTTP 500, а не обрывает проверку
+                    client = APIClient(raise_request_exception=False)
+                    client.force_authenticate(user=user)
+                    for endpoint in endpoints:
+                        results[endpoint.name, multiplier] = self._run(client, endpoint)
+        
+        rows, failures = [], []
+        for endpoint in endpoints:
+            small = results[endpoint.name, multipliers[0]]
+            large = results[endpoint.name, multipliers[1]]
+            
+            status = max(small['status'], large['status'])
+            if status >= 400:
+                verdict = f'HTTP {status}'
+            elif large['queries'] > small['queries'] + options['tolerance']:
+                verdict = 'GROWS'
+            else:
+                verdict = 'ok'
+            if verdict != 'ok':
+                failures.append(endpoint.name)
+            
+            rows.append([
+                endpoint.name, endpoint.action,
+                small['queries'], large['queries'],
+                f'{small["db_ms"]:.1f}', f'{large["db_ms"]:.1f}',
+                verdict
+            ])
+        
+        self.stdout.write(format_table(
+            ['endpoint', 'action', 'queries 1x', f'queries {multipliers[1]}x',
+             'db ms 1x', f'db ms {multipliers[1]}x', 'verdict'],
+            rows
+        ))
+        
+        if failures:
+            raise CommandError(f'Бюджет запросов нарушен: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Бюджет запросов соблюден'))
+    
+    def _run(self, client, endpoint):
+        url_kwargs = {}
+        if endpoint.url_kwargs:
+            model = endpoint.viewset.queryset.model
+            pk = model.objects.order_by('pk').values_list('pk', flat=True).first()
+            url_kwargs = {name: pk for name in endpoint.url_kwargs}
+        
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            response = client.get(
+                reverse(endpoint.name, kwargs=url_kwargs),
+                QUERY_PARAMS.get(endpoint.name)
+            )
+            if response.streaming:
+                # Потоковый ответ выполняет запросы при чтении тела
+                b''.join(response.streaming_content)
+        
+        return {
+            'status': response.status_code,
+            'queries': timer.count,
+            'db_ms': timer.elapsed * 1000,
+        }
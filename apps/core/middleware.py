@@ -0,0 +1,159 @@
+import bisect
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .utils import QueryTimer
+
+
+class MetricsRegistry:
+    """
+    Агрегаты запросов по имени URL в памяти процесса.
+    
+    Гистограмма времени ответа плюс суммы по SQL, сериализации, рендерингу,
+    размеру ответа и собственным накладным расходам middleware.
+    Каждый воркер gunicorn хранит свои значения.
+    """
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+    COUNTERS = ('total', 'db', 'queries', 'serialize', 'render', 'size', 'overhead')
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+    
+    def observe(self, view, **values):
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = {
+                    'count': 0,
+                    'buckets': [0] * (len(self.BUCKETS) + 1),
+                    **{name: 0 for name in self.COUNTERS}
+                }
+            stats['count'] += 1
+            stats['buckets'][bisect.bisect_left(self.BUCKETS, values['total'])] += 1
+            for name in self.COUNTERS:
+                stats[name] += values.get(name, 0)
+    
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: {**stats, 'buckets': list(stats['buckets'])}
+                for view, stats in self._views.items()
+            }
+    
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+    
+    def render_prometheus(self):
+        """Текстовый формат Prometheus."""
+        lines = [
+            '# HELP http_request_duration_seconds Request wall time.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        totals = []
+        for view, stats in sorted(self.snapshot().items()):
+            label = 'view="{}"'.format(view.replace('\\', '\\\\').replace('"', '\\"'))
+            cumulative = 0
+            for bound, count in zip((*self.BUCKETS, '+Inf'), stats['buckets']):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_sum{{{label}}} {stats["total"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{label}}} {stats["count"]}')
+            totals.append((label, stats))
+        
+        for metric, key, help_text in (
+            ('http_request_db_seconds_total', 'db', 'SQL time.'),
+            ('http_request_db_queries_total', 'queries', 'SQL queries.'),
+            ('http_request_serialize_seconds_total', 'serialize', 'View time excluding SQL (serialization).'),
+            ('http_request_render_seconds_total', 'render', 'Response rendering time.'),
+            ('http_response_size_bytes_total', 'size', 'Response body size.'),
+            ('perf_middleware_overhead_seconds_total', 'overhead', 'Time spent in PerformanceMiddleware itself.'),
+        ):
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for label, stats in totals:
+                lines.append(f'{metric}{{{label}}} {stats[key]:g}')
+        
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class PerformanceMiddleware:
+    """
+    Метрики каждого запроса: общее время, число и время SQL, сериализация
+    (время view за вычетом SQL), рендеринг и размер ответа.
+    
+    Значения отдаются заголовком Server-Timing и копятся в registry
+    по имени URL. Собственное время middleware тоже учитывается
+    (perf_middleware_overhead_seconds_total).
+    """
+    
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFORMANCE_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'PERFORMANCE_SERVER_TIMING', True)
+    
+    def __call__(self, request):
+        start = time.perf_counter()
+        timer = QueryTimer()
+        request._perf = {'timer': timer}
+        
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        
+        finished = time.perf_counter()
+        marks = request._perf
+        view_end = marks.get('view_end', finished)
+        serialize = 0.0
+        if 'view_start' in marks:
+            view_db = timer.elapsed - marks['db_before_view']
+            serialize = max(view_end - marks['view_start'] - view_db, 0.0)
+        
+        metrics = {
+            'total': finished - start,
+            'db': timer.elapsed,
+            'queries': timer.count,
+            'serialize': serialize,
+            'render': marks.get('render_end', view_end) - view_end,
+            'size': 0 if response.streaming else len(response.content),
+        }
+        
+        if self.server_timing:
+            timings = [
+                f'total;dur={metrics["total"] * 1000:.2f}',
+                f'db;dur={metrics["db"] * 1000:.2f};desc="{timer.count} queries"',
+                f'serialize;dur={metrics["serialize"] * 1000:.2f}',
+                f'render;dur={metrics["render"] * 1000:.2f}',
+            ]
+            if response.has_header('Server-Timing'):
+                timings.append(response['Server-Timing'])
+            response['Server-Timing'] = ', '.join(timings)
+        
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        metrics['overhead'] = time.perf_counter() - finished
+        registry.observe(view, **metrics)
+        return response
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        marks = getattr(request, '_perf', None)
+        if marks is not None:
+            marks['view_start'] = time.perf_counter()
+            marks['db_before_view'] = marks['timer'].elapsed
+    
+    def process_template_response(self, request, response):
+        # Вызывается сразу после view и перед рендерингом (ответы DRF)
+        marks = getattr(request, '_perf', None)
+        if marks is not None:
+            marks['view_end'] = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: marks.__setitem__('render_end', time.perf_counter())
+            )
+        return response
@@ -0,0 +1,95 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .cache import get_versions, record_hit
+from .serializers import ValuesSerializerMixin
+
+
+class CachedListMixin:
+    """
+    Read-through кеш ответов для ViewSet, только list.
+    
+    Ключ = действие + параметры запроса + версии всех моделей из
+    cache_dependencies. Сигналы меняют версию при записи, поэтому
+    устаревшая страница никогда не будет прочитана.
+    """
+    cache_namespace = None
+    cache_dependencies = ()
+    cache_actions = ('list',)
+    
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+    
+    def get_response_cache_key(self, request, versions):
+        raw = '{}:{}:{}:{}'.format(
+            request.get_host(),
+            self.action,
+            sorted(self.kwargs.items()),
+            sorted(request.query_params.lists())
+        )
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        version = '.'.join(str(versions[namespace]) for namespace in self.cache_dependencies)
+        return f'response:{self.cache_namespace}:{version}:{digest}'
+    
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        enabled = getattr(settings, 'RESPONSE_CACHE_ENABLED', True)
+        if not enabled or self.action not in self.cache_actions:
+            return handler(request, *args, **kwargs)
+        
+        versions = get_versions(*self.cache_dependencies)
+        key = self.get_response_cache_key(request, versions)
+        
+        data = cache.get(key)
+        record_hit(self.cache_namespace, data is not None)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+            cache.set(key, response.data, timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedResponseMixin(CachedListMixin):
+    """
+    CachedListMixin для ViewSet с retrieve: кешируется и detail.
+    
+    retrieve объявлен здесь, поэтому роутер регистрирует detail-маршрут;
+    для ViewSet без retrieve используется CachedListMixin.
+    """
+    cache_actions = ('list', 'retrieve')
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+
+class ValuesListMixin:
+    """
+    Быстрый list для сериализаторов с ValuesSerializerMixin.
+    
+    Фильтры, сортировка и пагинация работают как обычно, но queryset
+    читается через values() и сериализуется serialize_values без создания
+    моделей. Ставится после CachedResponseMixin; выключается настройкой
+    FAST_SERIALIZATION_ENABLED.
+    """
+    
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        if not getattr(settings, 'FAST_SERIALIZATION_ENABLED', True) or not isinstance(
+            serializer, ValuesSerializerMixin
+        ):
+            return super().list(request, *args, **kwargs)
+        
+        # prefetch_related к строкам values() неприменим
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        rows = queryset.values(*serializer.get_values_fields())
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize_values(page))
+        return Response(serializer.serialize_values(rows))
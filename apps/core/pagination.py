@@ -1,4 +1,12 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import b64decode, b64encode
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class StandardPagination(PageNumberPagination):
@@ -24,3 +32,146 @@ class LargePagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 500
 
+
+def estimate_count(queryset, limit=10000):
+    """
+    Приблизительное количество строк без полного COUNT(*).
+    
+    PostgreSQL: оценка планировщика из EXPLAIN. Остальные СУБД:
+    COUNT по подзапросу с LIMIT, то есть не больше limit строк.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    return queryset[:limit].count()
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset-пагинация: WHERE (поле, id) > (значение, id) вместо OFFSET.
+    
+    Поле сортировки берется из OrderingFilter (или ordering view),
+    id добавляется для однозначного порядка. Стоимость страницы не зависит
+    от ее номера, COUNT(*) выполняется только по запросу:
+    ?count=exact — точное число, ?count=estimate — оценка.
+    """
+    
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
+    count_query_param = 'count'
+    estimate_limit = 10000
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        
+        self.model = queryset.model
+        ordering = self.get_ordering(request, queryset, view)[0]
+        self.descending = ordering.startswith('-')
+        self.field = ordering.lstrip('-')
+        
+        self.count = None
+        self.count_is_estimate = False
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == 'exact':
+            self.count = queryset.count()
+        elif count_mode == 'estimate':
+            self.count = estimate_count(queryset, self.estimate_limit)
+            self.count_is_estimate = True
+        
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+        # Направление прохода: назад по списку = обратный порядок
+        scan_descending = self.descending != reverse
+        if cursor is not None:
+            queryset = queryset.filter(self._after(cursor[0], cursor[1], scan_descending))
+        
+        prefix = '-' if scan_descending else ''
+        rows = list(queryset.order_by(f'{prefix}{self.field}', f'{prefix}pk')[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+        
+        self.has_next = has_more if not reverse else True
+        self.has_previous = cursor is not None if not reverse else has_more
+        return self.page
+    
+    def _after(self, value, pk, descending):
+        """Строки строго после (value, pk) в порядке прохода."""
+        op = 'lt' if descending else 'gt'
+        bound = 'lte' if descending else 'gte'
+        # Избыточное условие по одному полю помогает планировщику взять индекс
+        return Q(**{f'{self.field}__{bound}': value}) & (
+            Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'pk__{op}': pk})
+        )
+    
+    def encode_cursor(self, value, pk, reverse=False):
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        elif not isinstance(value, int):
+            value = str(value)
+        payload = json.dumps([value, pk, int(reverse)])
+        encoded = b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+    
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk, reverse = json.loads(b64decode(encoded.encode()).decode())
+            model_field = self.model._meta.get_field(self.field)
+            value = model_field.to_python(value)
+            if value is None:
+                raise ValueError('Пустое значение курсора')
+            return value, int(pk), bool(reverse)
+        except (TypeError, ValueError, json.JSONDecodeError, DjangoValidationError) as e:
+            raise NotFound(self.invalid_cursor_message) from e
+    
+    def _position(self, row):
+        """(значение поля, id) строки страницы: модель или dict из values()."""
+        if isinstance(row, dict):
+            return row[self.field], row['id']
+        return getattr(row, self.field), row.pk
+    
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(*self._position(self.page[-1]))
+    
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(*self._position(self.page[0]), reverse=True)
+    
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload['count'] = self.count
+            payload['count_is_estimate'] = self.count_is_estimate
+        return Response(payload)
+    
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'].update({
+            'count': {'type': 'integer', 'example': 123},
+            'count_is_estimate': {'type': 'boolean'},
+        })
+        return response_schema
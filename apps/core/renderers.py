@@ -0,0 +1,31 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson: компактный UTF-8 без промежуточной строки.
+    
+    Даты, Decimal и прочие типы, которые сериализаторы не привели к строке,
+    кодируются тем же encoder_class, что и у DRF, поэтому ответ совпадает
+    с JSONRenderer. Без orjson или при запросе с отступами (indent в
+    Accept) работает обычный JSONRenderer.
+    """
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        )
+        # Как JSONRenderer: U+2028/U+2029 экранируются для встраивания в JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,85 @@
+from rest_framework import serializers
+
+
+# Поля, у которых to_representation меняет значение из БД
+CONVERTED_FIELDS = (
+    serializers.DecimalField, serializers.DateTimeField,
+    serializers.DateField, serializers.TimeField, serializers.FloatField,
+)
+
+
+def file_from_values(model, field_name, name):
+    """FieldFile по имени файла из строки values(), как атрибут загруженной модели."""
+    model_field = model._meta.get_field(field_name)
+    return model_field.attr_class(None, model_field, name)
+
+
+class ValuesSerializerMixin:
+    """
+    Быстрый режим для ModelSerializer: строки QuerySet.values() → dict.
+    
+    Вместо модели и обхода полей сериализатора на каждый объект план
+    строится один раз: lookup для values() и функция преобразования
+    (только для десятичных, дат и файлов, остальное отдается как есть).
+    Результат совпадает с обычным to_representation.
+    
+    SerializerMethodField <name> заполняется методом values_<name>(row);
+    дополнительные столбцы для них — в values_extra_lookups. Пакетные
+    запросы (например, главные изображения страницы) — в prepare_values(rows).
+    """
+    values_extra_lookups = ()
+    
+    def get_values_plan(self):
+        """[(поле ответа, lookup, преобразование или None)] в порядке полей."""
+        if hasattr(self, '_values_plan'):
+            return self._values_plan
+        
+        model = self.Meta.model
+        plan = []
+        for name, field in self.fields.items():
+            if isinstance(field, serializers.SerializerMethodField):
+                plan.append((name, None, getattr(self, f'values_{name}')))
+                continue
+            
+            lookup = field.source.replace('.', '__')
+            convert = None
+            if isinstance(field, serializers.FileField):
+                convert = self._file_converter(field, model, lookup)
+            elif isinstance(field, CONVERTED_FIELDS):
+                convert = field.to_representation
+            plan.append((name, lookup, convert))
+        
+        self._values_plan = plan
+        return plan
+    
+    @staticmethod
+    def _file_converter(field, model, field_name):
+        def convert(name):
+            return field.to_representation(file_from_values(model, field_name, name))
+        return convert
+    
+    def get_values_fields(self):
+        """Аргументы для QuerySet.values()."""
+        lookups = [lookup for _, lookup, _ in self.get_values_plan() if lookup]
+        lookups.extend(lookup for lookup in self.values_extra_lookups if lookup not in lookups)
+        return lookups
+    
+    def prepare_values(self, rows):
+        """Пакетная подготовка перед values_<name> (по умолчанию ничего)."""
+    
+    def serialize_values(self, rows) -> list:
+        rows = list(rows)
+        self.prepare_values(rows)
+        
+        plan = self.get_values_plan()
+        data = []
+        for row in rows:
+            item = {}
+            for name, lookup, convert in plan:
+                if lookup is None:
+                    item[name] = convert(row)
+                    continue
+                value = row[lookup]
+                item[name] = convert(value) if convert is not None and value is not None else value
+            data.append(item)
+        return data
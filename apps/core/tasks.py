@@ -0,0 +1,10 @@
+from celery import shared_task
+
+from .images import process_image_field
+
+
+@shared_task(acks_late=True)
+def generate_image_renditions(model_label, pk, field_name, renditions_field):
+    """Сгенерировать уменьшенные копии и WebP для изображения объекта"""
+    renditions = process_image_field(model_label, pk, field_name, renditions_field)
+    return bool(renditions)
@@ -0,0 +1,75 @@
+import shutil
+import tempfile
+from io import BytesIO
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from apps.core.images import process_image_field, rendition_path, rendition_url
+from apps.products.models import Category, Brand, Product, ProductImage
+
+
+def image_file(name, pil_format, color):
+    buffer = BytesIO()
+    Image.new('RGB', (400, 300), color).save(buffer, pil_format)
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+class RenditionTest(TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+    
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Rendition category')
+        brand = Brand.objects.create(name='Rendition brand')
+        cls.product = Product.objects.create(
+            category=category, brand=brand, name='Rendition product',
+            description='', price=100, stock_quantity=5, sku='RENDITION-1'
+        )
+    
+    def create_image(self, name, pil_format, color):
+        image = ProductImage.objects.create(
+            product=self.product, image=image_file(name, pil_format, color)
+        )
+        process_image_field('products.ProductImage', image.pk, 'image', 'renditions')
+        image.refresh_from_db()
+        return image
+    
+    def test_path_keeps_source_extension(self):
+        self.assertEqual(
+            rendition_path('products/photo.jpg', 'small', 'webp'),
+            'renditions/products/photo_jpg_small.webp'
+        )
+        self.assertNotEqual(
+            rendition_path('products/photo.jpg', 'small', 'webp'),
+            rendition_path('products/photo.png', 'small', 'webp')
+        )
+    
+    def test_same_stem_sources_get_own_renditions(self):
+        red = self.create_image('photo.jpg', 'JPEG', (255, 0, 0))
+        blue = self.create_image('photo.png', 'PNG', (0, 0, 255))
+        
+        red_name = red.renditions['sizes']['small']['jpeg']
+        blue_name = blue.renditions['sizes']['small']['jpeg']
+        self.assertNotEqual(red_name, blue_name)
+        self.assertEqual(rendition_url(red.image, red.renditions, 'small', 'jpeg'), f'/media/{red_name}')
+        
+        # Копия первого изображения не перезаписана вторым
+        storage = red.image.storage
+        for name, channel in ((red_name, 0), (blue_name, 2)):
+            with storage.open(name, 'rb') as rendition:
+                pixel = Image.open(rendition).convert('RGB').getpixel((0, 0))
+            self.assertGreater(pixel[channel], 200)
+            self.assertEqual(Image.open(storage.path(name)).size, (300, 225))
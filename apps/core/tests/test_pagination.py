@@ -0,0 +1,62 @@
+import json
+from base64 import b64encode
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.products.models import Category, Brand, Product
+
+
+def cursor(*payload):
+    return b64encode(json.dumps(payload).encode()).decode()
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class KeysetPaginationTest(TestCase):
+    
+    url = '/api/products/product/'
+    
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Keyset category')
+        brand = Brand.objects.create(name='Keyset brand')
+        created_at = timezone.now()
+        for i in range(7):
+            product = Product.objects.create(
+                category=category, brand=brand, name=f'Keyset product {i}',
+                description='', price=100, stock_quantity=5, sku=f'KEYSET-{i}'
+            )
+            # Две пары с одинаковым created_at: порядок внутри пары задает id
+            Product.objects.filter(pk=product.pk).update(created_at=created_at - timedelta(minutes=i // 2))
+    
+    def setUp(self):
+        self.client = APIClient()
+    
+    def test_pages_cover_list_once(self):
+        expected = list(Product.objects.order_by('-created_at', '-pk').values_list('sku', flat=True))
+        skus, url, params = [], self.url, {'page_size': 3}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            skus.extend(item['sku'] for item in response.data['results'])
+            url, params = response.data['next'], None
+        self.assertEqual(skus, expected)
+        
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual(
+            [item['sku'] for item in previous.data['results']],
+            expected[-4:-1]
+        )
+    
+    def test_malformed_cursor_is_not_found(self):
+        malformed = [
+            'not-base64!',
+            cursor('yesterday', 1, 0),
+            cursor(None, 1, 0),
+            cursor('2025-01-01T00:00:00', 'x', 0),
+        ]
+        for value in malformed:
+            with self.subTest(cursor=value):
+                response = self.client.get(self.url, {'cursor': value})
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,19 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class CheckQueryBudgetTest(TestCase):
+    
+    def test_all_endpoints_within_budget(self):
+        out = StringIO()
+        call_command('check_query_budget', size=1, scale=3, stdout=out)
+        rows = {
+            line.split()[0]: line.split()
+            for line in out.getvalue().splitlines()
+            if line.startswith(('products:', 'cart:'))
+        }
+        self.assertIn('Бюджет запросов соблюден', out.getvalue())
+        self.assertTrue(all(row[-1] == 'ok' for row in rows.values()))
+        # Запросы потокового экспорта выполняются при чтении тела и тоже учитываются
+        self.assertGreater(int(rows['products:product-export-catalog'][2]), 1)
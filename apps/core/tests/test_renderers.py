@@ -0,0 +1,34 @@
+import datetime
+from decimal import Decimal
+from unittest import skipIf
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from apps.core.renderers import FastJSONRenderer, orjson
+
+
+@skipIf(orjson is None, 'orjson не установлен')
+class FastJSONRendererTest(SimpleTestCase):
+    
+    data = {
+        'id': 1,
+        'name': 'Ноутбук "Pro"\u2028\u2029',
+        'price': Decimal('1999.90'),
+        'created_at': datetime.datetime(2025, 1, 2, 3, 4, 5, 600000, tzinfo=datetime.timezone.utc),
+        'date': datetime.date(2025, 1, 2),
+        'results': [{'rating': 5, 'image': None}],
+    }
+    
+    def test_same_bytes_as_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, 'application/json'),
+            JSONRenderer().render(self.data, 'application/json')
+        )
+    
+    def test_indent_falls_back_to_json_renderer(self):
+        rendered = FastJSONRenderer().render(self.data, 'application/json; indent=2')
+        self.assertEqual(rendered, JSONRenderer().render(self.data, 'application/json; indent=2'))
+        self.assertIn(b'\n  ', rendered)
+    
+    def test_empty_body(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
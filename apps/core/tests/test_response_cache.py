@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.products.models import Category, Brand, Product
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTest(TestCase):
+    """Read-through кеш ответов каталога с версиями пространств имен."""
+    
+    url = '/api/products/product/'
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Cache category')
+        cls.brand = Brand.objects.create(name='Cache brand')
+        cls.product = Product.objects.create(
+            category=cls.category, brand=cls.brand, name='Cache product',
+            description='', price=100, stock_quantity=5, sku='CACHE-1'
+        )
+    
+    def setUp(self):
+        # locmem-кеш общий для процесса: версии и ответы прошлых тестов не нужны
+        cache.clear()
+        self.client = APIClient()
+    
+    def get(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        return response, response.get('X-Cache')
+    
+    def test_second_request_is_served_from_cache(self):
+        response, state = self.get()
+        self.assertEqual(state, 'MISS')
+        with self.assertNumQueries(0):
+            cached, state = self.get()
+        self.assertEqual(state, 'HIT')
+        self.assertEqual(cached.json(), response.json())
+        
+        # Другие параметры — другой ключ
+        self.assertEqual(self.get(min_price=50)[1], 'MISS')
+    
+    def test_write_changes_version(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Renamed cache product'
+            self.product.save()
+        response, state = self.get()
+        self.assertEqual(state, 'MISS')
+        self.assertEqual(response.json()['results'][0]['name'], 'Renamed cache product')
+    
+    def test_dependency_write_changes_version(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.name = 'Renamed cache brand'
+            self.brand.save()
+        self.assertEqual(self.get()[1], 'MISS')
+    
+    def test_rolled_back_write_keeps_cache(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=False):
+            self.product.name = 'Not committed'
+            self.product.save()
+        self.assertEqual(self.get()[1], 'HIT')
+    
+    def test_retrieve_is_cached_and_counts_views(self):
+        url = f'{self.url}{self.product.pk}/'
+        self.assertEqual(self.get(url)[1], 'MISS')
+        self.assertEqual(self.get(url)[1], 'HIT')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views_count, 2)
+        
+        # Ошибки не кешируются
+        for _ in range(2):
+            response, state = self.get(f'{self.url}0/')
+            self.assertEqual(response.status_code, 404)
+            self.assertNotEqual(state, 'HIT')
+    
+    def test_stats(self):
+        self.get()
+        self.get()
+        self.get('/api/products/category/')
+        admin = User.objects.create_user('cache-admin@example.com', 'password', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        stats = self.client.get(f'{self.url}cache_stats/').json()
+        self.assertEqual(stats['products'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+        self.assertEqual(stats['categories']['misses'], 1)
+    
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_disabled(self):
+        self.assertIsNone(self.get()[1])
+        self.assertIsNone(self.get()[1])
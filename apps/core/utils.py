@@ -1,20 +1,73 @@
+import time
 import uuid
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+from django.db.models import Q
 from django.utils.text import slugify
 from django.utils import timezone
 
 
+def _slug_base(model_class, value, slug_field):
+    """slug из значения, укороченный так, чтобы осталось место под '-N'."""
+    max_length = model_class._meta.get_field(slug_field).max_length or 50
+    base = slugify(value) or model_class._meta.model_name
+    return base[:max_length - 8].rstrip('-')
+
+
+class _SlugAllocator:
+    """
+    Выдача slug по множеству занятых: base, base-1, base-2, ...
+    
+    Перебор идет в памяти, для каждого base — с места последней выдачи.
+    """
+    
+    def __init__(self, taken):
+        self.taken = set(taken)
+        self.last_suffix = {}
+    
+    def allocate(self, base):
+        slug = base
+        while slug in self.taken:
+            suffix = self.last_suffix.get(base, 0) + 1
+            self.last_suffix[base] = suffix
+            slug = f'{base}-{suffix}'
+        self.taken.add(slug)
+        return slug
+
+
 def generate_unique_slug(model_class, value, slug_field='slug'):
-    """Генерация уникального slug из модели."""
-    slug = slugify(value)
-    counter = 1
-    unique_slug = slug
+    """
+    Генерация уникального slug из модели.
     
-    while model_class.objects.filter(**{slug_field: unique_slug}).exists():
-        unique_slug = f'{slug}-{counter}'
-        counter += 1
-        
-    return unique_slug
+    Занятые варианты base и base-N читаются одним запросом по префиксу
+    (индекс slug), свободный номер ищется в памяти, без exists() на каждый N.
+    """
+    base = _slug_base(model_class, value, slug_field)
+    taken = set(
+        model_class.objects.filter(
+            Q(**{slug_field: base}) | Q(**{f'{slug_field}__startswith': f'{base}-'})
+        ).values_list(slug_field, flat=True)
+    )
+    return _SlugAllocator(taken).allocate(base)
+
+def allocate_unique_slugs(model_class, values, slug_field='slug', batch_size=200):
+    """
+    Уникальные slug для пачки значений (в том же порядке).
+    
+    Один префиксный запрос на batch_size разных базовых slug; коллизии
+    внутри пачки разрешаются в памяти.
+    """
+    bases = [_slug_base(model_class, value, slug_field) for value in values]
+    unique_bases = list(dict.fromkeys(bases))
+    
+    taken = set()
+    for start in range(0, len(unique_bases), batch_size):
+        condition = Q()
+        for base in unique_bases[start:start + batch_size]:
+            condition |= Q(**{slug_field: base}) | Q(**{f'{slug_field}__startswith': f'{base}-'})
+        taken.update(model_class.objects.filter(condition).values_list(slug_field, flat=True))
+    
+    allocator = _SlugAllocator(taken)
+    return [allocator.allocate(base) for base in bases]
 
 def generate_order_number():
     """Генерация уникального номера заказа."""
@@ -29,6 +82,26 @@ def calculate_percentage(part, whole):
         return 0
     return round((part / whole) * 100, 2)
 
+def parse_decimal(value, field, messages, required=False):
+    """
+    Денежное значение из строки или числа (DecimalField(10, 2)).
+    
+    Ошибки добавляются в messages с именем поля, тогда возвращается None.
+    """
+    if value in (None, ''):
+        if required:
+            messages.append(f'{field}: обязательное поле')
+        return None
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        messages.append(f'{field}: некорректное число')
+        return None
+    if not number.is_finite() or number.as_tuple().exponent < -2 or abs(number) >= 10 ** 8:
+        messages.append(f'{field}: не больше 8 цифр до запятой и 2 после')
+        return None
+    return number
+
 def format_price(amount):
     """Форматирование цены для отображения."""
     return f'{Decimal(amount):,.2f} руб.'
@@ -38,4 +111,24 @@ def truncate_string(text, length=100):
     if len(text) <= length:
         return text
     return text[:length-3] + '...'
+
+
+class QueryTimer:
+    """
+    Счетчик SQL-запросов и их времени для connection.execute_wrapper.
+    
+    Работает без DEBUG и без накопления текста запросов.
+    Пример: with connection.execute_wrapper(timer): ...
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
     
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.elapsed += time.perf_counter() - start
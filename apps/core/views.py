@@ -0,0 +1,15 @@
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+
+from .middleware import registry
+from .permissions import IsAdminUser
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """Метрики запросов в текстовом формате Prometheus (только staff)"""
+    return HttpResponse(
+        registry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
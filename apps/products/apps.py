@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.products'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from apps.products.signals import create_search_index
+        
+        post_migrate.connect(create_search_index, sender=self)
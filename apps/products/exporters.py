@@ -0,0 +1,101 @@
+import csv
+import json
+from django.db.models import Prefetch
+
+from .models import Category, Product, ProductSpecification
+
+
+EXPORT_FIELDS = [
+    'sku', 'name', 'description', 'price', 'discount_price', 'stock_quantity',
+    'is_available', 'category', 'category_path', 'brand', 'brand_name',
+    'main_image', 'specifications'
+]
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: write возвращает строку, а не пишет ее."""
+    
+    def write(self, value):
+        return value
+
+
+def export_queryset(queryset):
+    """Товары для выгрузки: категория, бренд, главное изображение и характеристики без N+1."""
+    return queryset.select_related('category', 'brand').prefetch_related(
+        Product.prefetch_main_image(),
+        Prefetch(
+            'product_specifications',
+            queryset=ProductSpecification.objects.order_by('order', 'pk')
+        )
+    ).order_by('pk')
+
+
+def iter_product_rows(queryset, chunk_size=2000, image_url=None):
+    """
+    Строки выгрузки (dict) с постоянным расходом памяти.
+    
+    iterator(chunk_size) читает БД пачками (server-side cursor на PostgreSQL),
+    prefetch выполняется на каждую пачку. Пути категорий строятся по
+    заранее загруженному словарю, без запросов на строку.
+    """
+    category_names = dict(Category.objects.values_list('pk', 'name'))
+    image_url = image_url or (lambda url: url)
+    
+    for product in export_queryset(queryset).iterator(chunk_size=chunk_size):
+        category = product.category
+        path_names = [category_names.get(pk, '') for pk in category.get_ancestor_ids()]
+        main_image = product.get_main_image()
+        
+        yield {
+            'sku': product.sku,
+            'name': product.name,
+            'description': product.description,
+            'price': str(product.price),
+            'discount_price': str(product.discount_price) if product.discount_price is not None else None,
+            'stock_quantity': product.stock_quantity,
+            'is_available': product.is_available,
+            'category': category.slug,
+            'category_path': ' -> '.join(path_names + [category.name]),
+            'brand': product.brand.slug,
+            'brand_name': product.brand.name,
+            'main_image': image_url(main_image.image.url) if main_image else None,
+            'specifications': {
+                spec.spec_name: spec.spec_value
+                for spec in product.product_specifications.all()
+            },
+        }
+
+
+def render_csv(rows):
+    """CSV построчно; характеристики — 'Имя:Значение;...' (формат импорта)."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        row['specifications'] = ';'.join(
+            f'{name}:{value}' for name, value in row['specifications'].items()
+        )
+        row['is_available'] = 'true' if row['is_available'] else 'false'
+        yield writer.writerow([
+            '' if row[field] is None else row[field] for field in EXPORT_FIELDS
+        ])
+
+
+def render_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+RENDERERS = {
+    'csv': render_csv,
+    'jsonl': render_jsonl,
+}
+
+
+def stream_catalog(queryset, file_format, chunk_size=2000, image_url=None):
+    """Генератор текстовых кусков выгрузки в формате csv или jsonl."""
+    rows = iter_product_rows(queryset, chunk_size=chunk_size, image_url=image_url)
+    return RENDERERS[file_format](rows)
@@ -1,10 +1,30 @@
 import django_filters
-from .models import Category, Product
+from django.db.models import Q
+from rest_framework import filters
+from .models import Category, Brand, Product, ProductCard
+from .search import filter_by_query
+
+
+def lookup_by_id_or_slug(model, value, field):
+    """
+    Значение field объекта по id или slug одним запросом (None — не найден).
+    
+    Числовое значение может быть и slug'ом ("2024"): точное совпадение slug
+    важнее совпадения id.
+    """
+    value = value.strip()
+    if not value.isdigit():
+        return model.objects.filter(slug=value).values_list(field, flat=True).first()
+    rows = dict(model.objects.filter(Q(slug=value) | Q(pk=int(value))).values_list('slug', field))
+    if value in rows:
+        return rows[value]
+    return next(iter(rows.values()), None)
 
 
 class ProductFilter(django_filters.FilterSet):
-    category = django_filters.CharFilter(field_name='category__slug')
-    brand = django_filters.CharFilter(field_name='brand__slug')
+    """category и brand принимают id или slug"""
+    category = django_filters.CharFilter(method='filter_category')
+    brand = django_filters.CharFilter(method='filter_brand')
     min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
     max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
     in_stock = django_filters.BooleanFilter(method='filter_in_stock')
@@ -18,18 +38,73 @@ class ProductFilter(django_filters.FilterSet):
     
     def filter_has_discount(self, queryset, name, value):
         if value:
-            return queryset.filter(discount_price__isnull=True)
+            return queryset.filter(discount_price__isnull=False)
         return queryset
     
     def filter_category(self, queryset, name, value):
-        category = Category.objects.filter(slug=value).first()
-        if category:
-            descendants = category.get_descendants()
-            categories = [category] + list(descendants)
-            return queryset.filter(category__in=categories)
-        return queryset
+        """
+        Категория со всем поддеревом.
+        
+        Путь берется по id или уникальному slug, дальше — LIKE 'path%' по индексу
+        category.path с константным префиксом (без обхода дерева в Python).
+        """
+        path = lookup_by_id_or_slug(Category, value, 'path')
+        if not path:
+            return queryset.none()
+        return queryset.filter(category__path__startswith=path)
+    
+    def filter_brand(self, queryset, name, value):
+        if not value.strip().isdigit():
+            return queryset.filter(brand__slug=value.strip())
+        brand_id = lookup_by_id_or_slug(Brand, value, 'pk')
+        if brand_id is None:
+            return queryset.none()
+        return queryset.filter(brand_id=brand_id)
     
     class Meta:
         model = Product
-        fields = ['category', 'brand']
+        fields = ['category', 'brand', 'is_available']
+
+
+class ProductCardFilter(django_filters.FilterSet):
+    """Фильтры списка карточек: только столбцы таблицы карточек; category и brand — id или slug"""
+    category = django_filters.CharFilter(method='filter_category')
+    brand = django_filters.CharFilter(method='filter_brand')
+    min_price = django_filters.NumberFilter(field_name='final_price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='final_price', lookup_expr='lte')
+    in_stock = django_filters.BooleanFilter(field_name='in_stock')
+    min_rating = django_filters.NumberFilter(field_name='average_rating', lookup_expr='gte')
+    
+    def filter_category(self, queryset, name, value):
+        """Поддерево категории: LIKE 'path%' по индексу category_path карточек."""
+        path = lookup_by_id_or_slug(Category, value, 'path')
+        if not path:
+            return queryset.none()
+        return queryset.filter(category_path__startswith=path)
+    
+    def filter_brand(self, queryset, name, value):
+        if not value.strip().isdigit():
+            return queryset.filter(brand_slug=value.strip())
+        brand_id = lookup_by_id_or_slug(Brand, value, 'pk')
+        if brand_id is None:
+            return queryset.none()
+        return queryset.filter(brand_id=brand_id)
+    
+    class Meta:
+        model = ProductCard
+        fields = ['category', 'brand', 'in_stock']
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    ?search= через полнотекстовый индекс вместо icontains по всем полям.
+    
+    Совпадения отбираются подзапросом к индексу без ограничения числа,
+    дальше работают остальные фильтры, сортировка и пагинация.
+    """
     
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return filter_by_query(queryset, query)
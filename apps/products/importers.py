@@ -0,0 +1,370 @@
+import csv
+import io
+import json
+import logging
+import re
+import time
+from django.conf import settings
+from django.db import connections, transaction, DatabaseError
+
+from apps.core.cache import invalidate
+from apps.core.utils import allocate_unique_slugs, parse_decimal
+from .models import Category, Brand, Product, ProductImage, ProductSpecification
+from .read_models import refresh_product_cards
+from .search import get_search_index
+
+logger = logging.getLogger(__name__)
+
+
+SKU_PATTERN = re.compile(r'^[A-Z0-9\-]+$')
+PRODUCT_FIELDS = [
+    'category_id', 'brand_id', 'name', 'description', 'price',
+    'discount_price', 'stock_quantity', 'is_available'
+]
+# Значение images/specifications, удаляющее все изображения/характеристики товара.
+# Пустая ячейка (или пустой список в JSONL) оставляет их без изменений
+CLEAR_MARKER = '-'
+TRUE_VALUES = {'1', 'true', 'yes', 'да'}
+FALSE_VALUES = {'0', 'false', 'no', 'нет'}
+
+
+def read_rows(stream, file_format):
+    """
+    Построчно читать фид: (номер строки, dict или текст ошибки).
+    
+    CSV: images через ';', specifications как 'Имя:Значение;Имя:Значение'.
+    JSONL: images — список, specifications — объект или список {spec_name, spec_value}.
+    Пустое значение не меняет изображения/характеристики товара,
+    CLEAR_MARKER ('-') удаляет их.
+    """
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(stream, 'mode', ''):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, f'Некорректный JSON: {e.msg}'
+            continue
+        if not isinstance(row, dict):
+            yield line_number, 'Строка должна быть JSON-объектом'
+            continue
+        yield line_number, row
+
+
+class CatalogImporter:
+    """
+    Потоковый импорт каталога пачками.
+    
+    Категории и бренды резолвятся по заранее загруженным словарям slug → id,
+    существующие SKU — одним запросом на пачку, запись идет через
+    upsert (bulk_create с update_conflicts). Ошибочная строка попадает в отчет и не
+    останавливает импорт остальных.
+    """
+    
+    def __init__(self, chunk_size=1000, update_existing=True, max_errors=1000):
+        self.chunk_size = chunk_size
+        self.update_existing = update_existing
+        self.max_errors = max_errors
+        
+        self.categories = dict(Category.objects.values_list('slug', 'pk'))
+        self.brands = dict(Brand.objects.values_list('slug', 'pk'))
+        self.seen_skus = set()
+        
+        self.stats = {'processed': 0, 'created': 0, 'updated': 0, 'failed': 0}
+        self.errors = []
+    
+    def run(self, rows) -> dict:
+        started = time.perf_counter()
+        chunk = []
+        for line_number, row in rows:
+            chunk.append((line_number, row))
+            if len(chunk) >= self.chunk_size:
+                self._process_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._process_chunk(chunk)
+        
+        if self.stats['created'] or self.stats['updated']:
+            invalidate(Product._meta.label_lower)
+        
+        elapsed = time.perf_counter() - started
+        report = dict(self.stats)
+        report['seconds'] = round(elapsed, 2)
+        report['rows_per_second'] = round(self.stats['processed'] / elapsed) if elapsed else 0
+        report['errors'] = self.errors
+        logger.info(
+            f'Catalog import: {report["processed"]} rows, {report["created"]} created, '
+            f'{report["updated"]} updated, {report["failed"]} failed, '
+            f'{report["rows_per_second"]} rows/s'
+        )
+        return report
+    
+    def _error(self, line_number, sku, messages):
+        self.stats['failed'] += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line_number, 'sku': sku, 'errors': messages})
+    
+    def _process_chunk(self, chunk):
+        self.stats['processed'] += len(chunk)
+        
+        valid, chunk_skus = [], set()
+        for line_number, row in chunk:
+            if isinstance(row, str):
+                self._error(line_number, None, [row])
+                continue
+            data, messages = self._clean_row(row)
+            if not messages and data['sku'] in chunk_skus:
+                messages.append('sku: повторяется в фиде')
+            if messages:
+                self._error(line_number, row.get('sku'), messages)
+                continue
+            chunk_skus.add(data['sku'])
+            valid.append((line_number, data))
+        if not valid:
+            return
+        
+        existing = {
+            sku: (pk, slug)
+            for sku, pk, slug in Product.objects.filter(
+                sku__in=[data['sku'] for _, data in valid]
+            ).values_list('sku', 'pk', 'slug')
+        }
+        if not self.update_existing:
+            for line_number, data in valid:
+                if data['sku'] in existing:
+                    self._error(line_number, data['sku'], ['Товар с таким SKU уже существует'])
+            valid = [(line_number, data) for line_number, data in valid if data['sku'] not in existing]
+        
+        try:
+            with transaction.atomic():
+                created, updated = self._write(valid, existing)
+        except DatabaseError as e:
+            # Пачка откатилась целиком: строки помечаются ошибочными, импорт продолжается
+            logger.warning(f'Catalog import chunk failed: {e}')
+            for line_number, data in valid:
+                self._error(line_number, data['sku'], [f'Ошибка записи: {e}'])
+            return
+        
+        # SKU откатившейся пачки не считаются повтором в следующих строках фида
+        self.seen_skus.update(data['sku'] for _, data in valid)
+        self.stats['created'] += created
+        self.stats['updated'] += updated
+    
+    def _write(self, valid, existing):
+        """
+        Один upsert на пачку: INSERT ... ON CONFLICT (sku) DO UPDATE.
+        
+        Для существующих SKU id и slug уже известны, поэтому slug
+        генерируется только новым товарам.
+        """
+        products, new_products = [], []
+        for _, data in valid:
+            pk, slug = existing.get(data['sku'], (None, None))
+            product = Product(
+                pk=pk,
+                slug=slug,
+                sku=data['sku'],
+                **{field: data[field] for field in PRODUCT_FIELDS}
+            )
+            products.append((product, data))
+            if pk is None:
+                new_products.append(product)
+        
+        self._assign_slugs(new_products)
+        Product.objects.bulk_create(
+            [product for product, _ in products],
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=PRODUCT_FIELDS + ['updated_at']
+        )
+        
+        self._write_related(products, existing_ids=[pk for pk, _ in existing.values()])
+        # bulk-операции не шлют сигналы: поисковый индекс и карточки обновляем явно
+        get_search_index().index_products([product.pk for product, _ in products])
+        refresh_product_cards([product.pk for product, _ in products])
+        return len(new_products), len(products) - len(new_products)
+    
+    def _write_related(self, products, existing_ids):
+        """Изображения и характеристики из фида заменяют прежние (None — оставить как есть)."""
+        images, specifications = [], []
+        replace_images, replace_specifications = set(), set()
+        for product, data in products:
+            if data['images'] is not None:
+                replace_images.add(product.pk)
+                images.extend(
+                    ProductImage(product=product, image=path, is_main=index == 0, order=index)
+                    for index, path in enumerate(data['images'])
+                )
+            if data['specifications'] is not None:
+                replace_specifications.add(product.pk)
+                specifications.extend(
+                    ProductSpecification(product=product, spec_name=name, spec_value=value, order=index)
+                    for index, (name, value) in enumerate(data['specifications'])
+                )
+        
+        # Удалять есть что только у существовавших товаров. QuerySet.delete()
+        # грузит каждую строку ради сигналов (сброс кеша и пересборка карточки
+        # на каждое изображение), а карточки и кеш пачки и так обновляются явно:
+        # один DELETE по product_id на модель
+        connection = connections[Product.objects.db]
+        with connection.cursor() as cursor:
+            for model, product_ids in (
+                (ProductImage, replace_images),
+                (ProductSpecification, replace_specifications)
+            ):
+                stale = sorted(product_ids.intersection(existing_ids))
+                if not stale:
+                    continue
+                placeholders = ', '.join(['%s'] * len(stale))
+                cursor.execute(
+                    f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} '
+                    f'WHERE {connection.ops.quote_name(model._meta.get_field("product").column)} '
+                    f'IN ({placeholders})',
+                    stale
+                )
+        
+        ProductImage.objects.bulk_create(images)
+        ProductSpecification.objects.bulk_create(specifications)
+    
+    def _assign_slugs(self, products):
+        """slug из name и SKU, занятые варианты читаются одним запросом на пачку."""
+        slugs = allocate_unique_slugs(
+            Product, [f'{product.name} {product.sku}' for product in products]
+        )
+        for product, slug in zip(products, slugs):
+            product.slug = slug
+    
+    def _clean_row(self, row):
+        messages = []
+        data = {}
+        
+        sku = str(row.get('sku') or '').strip().upper()
+        if not sku:
+            messages.append('sku: обязательное поле')
+        elif len(sku) > 100 or not SKU_PATTERN.match(sku):
+            messages.append('sku: только заглавные буквы, цифры и дефис (до 100 символов)')
+        elif sku in self.seen_skus:
+            messages.append('sku: повторяется в фиде')
+        data['sku'] = sku
+        
+        name = str(row.get('name') or '').strip()
+        if not name or len(name) > 100:
+            messages.append('name: обязательное поле до 100 символов')
+        data['name'] = name
+        
+        description = str(row.get('description') or '').strip()
+        if len(description) > 2000:
+            messages.append('description: не длиннее 2000 символов')
+        data['description'] = description
+        
+        category_id = self.categories.get(str(row.get('category') or '').strip())
+        if category_id is None:
+            messages.append(f'category: неизвестный slug {row.get("category")!r}')
+        data['category_id'] = category_id
+        
+        brand_id = self.brands.get(str(row.get('brand') or '').strip())
+        if brand_id is None:
+            messages.append(f'brand: неизвестный slug {row.get("brand")!r}')
+        data['brand_id'] = brand_id
+        
+        data['price'] = parse_decimal(row.get('price'), 'price', messages, required=True)
+        data['discount_price'] = parse_decimal(row.get('discount_price'), 'discount_price', messages)
+        if data['price'] is not None and data['price'] <= 0:
+            messages.append('price: должна быть больше 0')
+        if data['price'] and data['discount_price'] and data['discount_price'] >= data['price']:
+            messages.append('discount_price: должна быть меньше цены')
+        
+        stock = row.get('stock_quantity')
+        try:
+            data['stock_quantity'] = int(stock) if stock not in (None, '') else 1
+            if data['stock_quantity'] < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            messages.append('stock_quantity: неотрицательное целое')
+        
+        available = row.get('is_available')
+        if available in (None, ''):
+            data['is_available'] = True
+        elif isinstance(available, bool):
+            data['is_available'] = available
+        elif str(available).strip().lower() in TRUE_VALUES | FALSE_VALUES:
+            data['is_available'] = str(available).strip().lower() in TRUE_VALUES
+        else:
+            messages.append('is_available: ожидается true/false')
+        
+        data['images'] = self._images(row.get('images'), messages)
+        data['specifications'] = self._specifications(row.get('specifications'), messages)
+        return data, messages
+    
+    @staticmethod
+    def _is_blank(value):
+        return value is None or value == [] or value == {} or (isinstance(value, str) and not value.strip())
+    
+    @staticmethod
+    def _images(value, messages):
+        """Список путей; None — не менять, [] — удалить все (CLEAR_MARKER)."""
+        if CatalogImporter._is_blank(value):
+            return None
+        if isinstance(value, str) and value.strip() == CLEAR_MARKER:
+            return []
+        if isinstance(value, str):
+            value = [path.strip() for path in value.split(';') if path.strip()]
+        if not isinstance(value, list) or not all(isinstance(path, str) for path in value):
+            messages.append('images: список путей')
+            return None
+        return value
+    
+    @staticmethod
+    def _specifications(value, messages):
+        """
+        Пары (имя, значение); проверки ProductSpecification.clean и unique_together без запросов.
+        
+        None — не менять, [] — удалить все (CLEAR_MARKER).
+        """
+        if CatalogImporter._is_blank(value):
+            return None
+        if isinstance(value, str) and value.strip() == CLEAR_MARKER:
+            return []
+        if isinstance(value, str):
+            pairs = [item.split(':', 1) for item in value.split(';') if item.strip()]
+        elif isinstance(value, dict):
+            pairs = list(value.items())
+        elif isinstance(value, list):
+            pairs = [
+                (item.get('spec_name'), item.get('spec_value')) if isinstance(item, dict) else item
+                for item in value
+            ]
+        else:
+            messages.append('specifications: ожидается объект или список')
+            return None
+        
+        result, names = [], set()
+        for pair in pairs:
+            if len(pair) != 2:
+                messages.append('specifications: ожидается "Имя:Значение"')
+                return None
+            name, value = (str(part or '').strip() for part in pair)
+            if not name or not value or len(name) > 50 or len(value) > 50:
+                messages.append('specifications: имя и значение от 1 до 50 символов')
+                return None
+            if name in names:
+                messages.append(f'specifications: повторяется характеристика {name!r}')
+                return None
+            names.add(name)
+            result.append((name, value))
+        return result
+
+
+def import_catalog(stream, file_format, **options) -> dict:
+    """Импортировать фид CSV/JSONL, вернуть отчет со статистикой и ошибками строк."""
+    options.setdefault('chunk_size', getattr(settings, 'CATALOG_IMPORT_CHUNK_SIZE', 1000))
+    return CatalogImporter(**options).run(read_rows(stream, file_format))
@@ -0,0 +1,106 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.benchmark import rollback_atomic, measure, format_table
+from apps.products.models import Category, Brand, Product
+from apps.products.services import CategoryService
+
+
+def legacy_ancestors(category):
+    """Старый обход: один запрос на каждого предка."""
+    ancestors = []
+    current = Category.objects.filter(pk=category.parent_id).first()
+    while current is not None:
+        ancestors.insert(0, current)
+        current = Category.objects.filter(pk=current.parent_id).first()
+    return ancestors
+
+
+def legacy_descendants(category):
+    """Старый обход: один запрос на каждый узел поддерева."""
+    descendants = []
+    for child in Category.objects.filter(parent=category):
+        descendants.append(child)
+        descendants.extend(legacy_descendants(child))
+    return descendants
+
+
+def legacy_products_count(category):
+    count = category.products.count()
+    for child in Category.objects.filter(parent=category):
+        count += legacy_products_count(child)
+    return count
+
+
+class Command(BaseCommand):
+    help = 'Сравнить число запросов для операций с деревом категорий (данные откатываются)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=10000)
+        parser.add_argument('--depth', type=int, default=5)
+        parser.add_argument('--products', type=int, default=5000)
+    
+    def handle(self, *args, **options):
+        with rollback_atomic():
+            levels = self._build_tree(options['categories'], options['depth'])
+            self._build_products(levels[-1], options['products'])
+            
+            root = Category.objects.get(pk=levels[0][0].pk)
+            leaf = Category.objects.get(pk=levels[-1][0].pk)
+            
+            operations = [
+                ('ancestors (leaf)', lambda: legacy_ancestors(leaf), lambda: list(leaf.get_ancestors())),
+                ('full path (leaf)', lambda: legacy_ancestors(leaf), leaf.get_full_path),
+                ('descendants (root)', lambda: legacy_descendants(root), lambda: list(root.get_descendants())),
+                ('products count (root)', lambda: legacy_products_count(root), root.get_products_count),
+            ]
+            rows = []
+            for name, legacy, indexed in operations:
+                _, legacy_queries, legacy_ms = measure(legacy)
+                _, queries, ms = measure(indexed)
+                rows.append([name, legacy_queries, f'{legacy_ms:.1f}', queries, f'{ms:.1f}'])
+        
+        self.stdout.write(
+            f'Категорий: {sum(len(level) for level in levels)}, уровней: {len(levels)}, '
+            f'товаров: {options["products"]}'
+        )
+        self.stdout.write(format_table(
+            ['operation', 'legacy queries', 'legacy ms', 'indexed queries', 'indexed ms'],
+            rows
+        ))
+    
+    def _build_tree(self, total, depth, ratio=4):
+        """Дерево из depth уровней, размер уровня растет геометрически."""
+        weights = [ratio ** level for level in range(depth)]
+        sizes = [max(1, round(total * weight / sum(weights))) for weight in weights]
+        
+        levels = []
+        parents = [None]
+        for level, size in enumerate(sizes):
+            categories = Category.objects.bulk_create([
+                Category(
+                    name=f'Bench L{level} #{i}',
+                    slug=f'bench-l{level}-{i}',
+                    parent=parents[i % len(parents)]
+                )
+                for i in range(size)
+            ], batch_size=1000)
+            levels.append(categories)
+            parents = categories
+        
+        CategoryService.rebuild_tree()
+        return levels
+    
+    def _build_products(self, categories, count):
+        brand = Brand.objects.create(name='Bench brand', slug='bench-brand')
+        Product.objects.bulk_create([
+            Product(
+                category=categories[i % len(categories)],
+                brand=brand,
+                name=f'Bench product {i}',
+                slug=f'bench-product-{i}',
+                description='',
+                price=100,
+                sku=f'BENCH-{i}'
+            )
+            for i in range(count)
+        ], batch_size=1000)
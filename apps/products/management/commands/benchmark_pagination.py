@@ -0,0 +1,95 @@
+import random
+from urllib.parse import parse_qs, urlparse
+from django.core.management.base import BaseCommand
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.core.benchmark import rollback_atomic, measure, format_table
+from apps.core.pagination import KeysetPagination
+from apps.products.models import Category, Brand, Product
+
+
+class Command(BaseCommand):
+    help = 'Сравнить OFFSET- и keyset-пагинацию товаров на первой и глубокой странице (данные откатываются)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--page', type=int, default=5000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+    
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        page = min(options['page'], options['products'] // page_size)
+        factory = APIRequestFactory()
+        
+        with rollback_atomic():
+            self._build_products(options['products'])
+            
+            rows = []
+            for ordering in ('-created_at', 'price', '-views_count'):
+                queryset = Product.objects.all()
+                
+                for number in (1, page):
+                    offset_paginator = PageNumberPagination()
+                    offset_paginator.page_size = page_size
+                    request = Request(factory.get('/', {'page': number}))
+                    _, offset_queries, offset_ms = measure(
+                        lambda: offset_paginator.paginate_queryset(
+                            queryset.order_by(ordering, 'pk'), request
+                        ),
+                        repeat=options['repeat']
+                    )
+                    
+                    params = {'ordering': ordering}
+                    if number > 1:
+                        params['cursor'] = self._cursor_at(queryset, ordering, (number - 1) * page_size)
+                    keyset_paginator = KeysetPagination()
+                    keyset_paginator.ordering = ordering
+                    keyset_paginator.page_size = page_size
+                    request = Request(factory.get('/', params))
+                    _, keyset_queries, keyset_ms = measure(
+                        lambda: keyset_paginator.paginate_queryset(queryset, request),
+                        repeat=options['repeat']
+                    )
+                    
+                    rows.append([
+                        ordering, number,
+                        offset_queries, f'{offset_ms:.2f}',
+                        keyset_queries, f'{keyset_ms:.2f}'
+                    ])
+        
+        self.stdout.write(f'Товаров: {options["products"]}, размер страницы: {page_size}')
+        self.stdout.write(format_table(
+            ['ordering', 'page', 'offset queries', 'offset ms', 'keyset queries', 'keyset ms'],
+            rows
+        ))
+    
+    def _cursor_at(self, queryset, ordering, offset):
+        """Курсор, указывающий на строку перед страницей (как его вернула бы предыдущая страница)."""
+        field = ordering.lstrip('-')
+        direction = '-' if ordering.startswith('-') else ''
+        row = queryset.order_by(ordering, f'{direction}pk')[offset - 1]
+        paginator = KeysetPagination()
+        paginator.base_url = '/'
+        link = paginator.encode_cursor(getattr(row, field), row.pk)
+        return parse_qs(urlparse(link).query)[paginator.cursor_query_param][0]
+    
+    def _build_products(self, count):
+        category = Category.objects.create(name='Bench pagination category')
+        brand = Brand.objects.create(name='Bench pagination brand')
+        random.seed(0)
+        Product.objects.bulk_create((
+            Product(
+                category=category,
+                brand=brand,
+                name=f'Bench product {i}',
+                slug=f'bench-pagination-{i}',
+                description='',
+                price=random.randint(100, 100000),
+                views_count=random.randint(0, 10000),
+                sku=f'BENCH-PAGE-{i}'
+            )
+            for i in range(count)
+        ), batch_size=2000)
@@ -0,0 +1,109 @@
+from django.core.management.base import BaseCommand
+
+from apps.core.benchmark import rollback_atomic, measure, format_table
+from apps.products.models import Category, Brand, Product, ProductImage, ProductSpecification
+from apps.products.services import ProductService
+
+
+def legacy_update_product(product, images=None, specifications=None, **kwargs):
+    """Старый алгоритм: save() всех полей, дочерние строки удаляются и создаются по одной."""
+    for field, value in kwargs.items():
+        setattr(product, field, value)
+    product.save()
+    
+    if images is not None:
+        product.product_images.all().delete()
+        for image_data in images:
+            ProductImage.objects.create(product=product, **image_data)
+    
+    if specifications is not None:
+        product.product_specifications.all().delete()
+        for spec_data in specifications:
+            ProductSpecification.objects.create(product=product, **spec_data)
+    return product
+
+
+class Command(BaseCommand):
+    help = 'Сравнить обновление товара с характеристиками и изображениями (данные откатываются)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--specs', type=int, default=50)
+        parser.add_argument('--images', type=int, default=20)
+    
+    def handle(self, *args, **options):
+        with rollback_atomic():
+            category = Category.objects.create(name='Bench update category')
+            brand = Brand.objects.create(name='Bench update brand')
+            product = Product.objects.create(
+                category=category, brand=brand, name='Bench update item',
+                description='', price=100, sku='BENCH-UPDATE'
+            )
+            
+            rows = []
+            for scenario, payload in self._scenarios():
+                for method, update, kwargs in (
+                    ('delete + recreate', legacy_update_product, {}),
+                    ('diff', ProductService.update_product, {}),
+                    ('diff (PATCH)', ProductService.update_product, {'partial': True}),
+                ):
+                    # Каждый прогон начинает с исходного набора строк
+                    loaded = self._reset(product, options['specs'], options['images'])
+                    _, queries, ms = measure(update, loaded, **payload(loaded), **kwargs)
+                    rows.append([scenario, method, queries, f'{ms:.1f}'])
+        
+        self.stdout.write(f'Товар: {options["specs"]} характеристик, {options["images"]} изображений')
+        self.stdout.write(format_table(['scenario', 'method', 'queries', 'ms'], rows))
+    
+    def _scenarios(self):
+        """(название, payload по загруженному товару) — как тело PUT/PATCH после валидации."""
+        def unchanged(product):
+            return {
+                'price': product.price,
+                'images': [
+                    {'id': image.pk, 'is_main': image.is_main, 'order': image.order, 'alt_text': image.alt_text}
+                    for image in product.product_images.all()
+                ],
+                'specifications': [
+                    {'spec_name': spec.spec_name, 'spec_value': spec.spec_value, 'order': spec.order}
+                    for spec in product.product_specifications.all()
+                ],
+            }
+        
+        def one_spec_changed(product):
+            payload = unchanged(product)
+            payload['specifications'][0]['spec_value'] = 'changed'
+            return payload
+        
+        def main_image_changed(product):
+            payload = unchanged(product)
+            for image in payload['images']:
+                image['is_main'] = image is payload['images'][-1]
+            return payload
+        
+        def one_spec_only(product):
+            spec = product.product_specifications.all()[0]
+            return {'specifications': [{'spec_name': spec.spec_name, 'spec_value': 'patched'}]}
+        
+        return [
+            ('unchanged payload', unchanged),
+            ('one spec changed', one_spec_changed),
+            ('main image changed', main_image_changed),
+            ('one spec in payload', one_spec_only),
+        ]
+    
+    @staticmethod
+    def _reset(product, specs, images):
+        """Пересоздать дочерние строки и загрузить товар, как это делает get_object()."""
+        ProductImage.objects.filter(product=product).delete()
+        ProductSpecification.objects.filter(product=product).delete()
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, is_main=i == 0, order=i, alt_text=f'image {i}')
+            for i in range(images)
+        ])
+        ProductSpecification.objects.bulk_create([
+            ProductSpecification(product=product, spec_name=f'spec-{i}', spec_value=f'value {i}', order=i)
+            for i in range(specs)
+        ])
+        return Product.objects.prefetch_related(
+            'product_images', 'product_specifications'
+        ).get(pk=product.pk)
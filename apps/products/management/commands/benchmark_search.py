@@ -0,0 +1,90 @@
+import random
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.core.benchmark import rollback_atomic, measure, format_table
+from apps.products.models import Category, Brand, Product
+from apps.products.search import get_search_index, search_product_ids
+
+
+WORDS = [
+    'смартфон', 'ноутбук', 'планшет', 'наушники', 'монитор', 'клавиатура',
+    'мышь', 'колонка', 'камера', 'роутер', 'зарядка', 'кабель', 'чехол',
+    'wireless', 'gaming', 'pro', 'ultra', 'mini', 'max', 'lite', 'black',
+    'white', 'silver', 'oled', 'usb', 'bluetooth', 'memory', 'display'
+]
+# Описания набираются из словаря побольше, чтобы частоты слов были разными
+VOCABULARY = WORDS + [f'term{i}' for i in range(5000)]
+
+
+def legacy_search(query, limit):
+    """Как SearchFilter: icontains по name/sku/description для каждого слова."""
+    queryset = Product.objects.all()
+    for term in query.split():
+        queryset = queryset.filter(
+            Q(name__icontains=term) | Q(sku__icontains=term) | Q(description__icontains=term)
+        )
+    return list(queryset.order_by('-created_at').values_list('pk', flat=True)[:limit])
+
+
+class Command(BaseCommand):
+    help = 'Сравнить LIKE-поиск и полнотекстовый индекс товаров (данные откатываются)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=500000)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3)
+    
+    def handle(self, *args, **options):
+        limit = options['limit']
+        
+        with rollback_atomic():
+            self._build_products(options['products'])
+            _, _, index_ms = measure(get_search_index().rebuild)
+            
+            sku = Product.objects.order_by('?').values_list('sku', flat=True).first()
+            queries = [
+                ('common word', 'смартфон'),
+                ('two words', 'gaming oled'),
+                ('prefix', 'blue'),
+                ('rare word', 'term4321'),
+                ('no match', 'холодильник'),
+                ('exact sku', sku),
+            ]
+            rows = []
+            for name, query in queries:
+                like_ids, _, like_ms = measure(legacy_search, query, limit, repeat=options['repeat'])
+                ids, _, search_ms = measure(search_product_ids, query, limit, repeat=options['repeat'])
+                rows.append([
+                    name, query,
+                    len(like_ids), f'{like_ms:.2f}',
+                    len(ids), f'{search_ms:.2f}'
+                ])
+        
+        self.stdout.write(
+            f'Товаров: {options["products"]}, построение индекса: {index_ms / 1000:.1f} с'
+        )
+        self.stdout.write(format_table(
+            ['query', 'text', 'LIKE hits', 'LIKE ms', 'index hits', 'index ms'],
+            rows
+        ))
+    
+    def _build_products(self, count):
+        category = Category.objects.create(name='Bench search category')
+        brand = Brand.objects.create(name='Bench search brand')
+        random.seed(0)
+        
+        def products():
+            for i in range(count):
+                name = ' '.join(random.sample(WORDS, 3))
+                yield Product(
+                    category=category,
+                    brand=brand,
+                    name=name,
+                    slug=f'bench-search-{i}',
+                    description=' '.join(random.choices(VOCABULARY, k=60)),
+                    price=random.randint(100, 100000),
+                    sku=f'BENCH-SEARCH-{i}'
+                )
+        
+        Product.objects.bulk_create(products(), batch_size=2000)
@@ -0,0 +1,116 @@
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.core.benchmark import rollback_atomic, format_table
+from apps.core.renderers import FastJSONRenderer
+from apps.users.models import User
+from apps.products.models import Category, Brand, Product, ProductImage, Review
+from apps.products.serializers import (
+    CategoryListSerializer, BrandListSerializer,
+    ProductListSerializerList, ReviewListSerializer
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить пропускную способность сериализации списков: ModelSerializer '
+        'против values() и JSONRenderer против FastJSONRenderer (данные откатываются)'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=10000, help='Объектов каждого типа')
+        parser.add_argument('--repeat', type=int, default=3)
+    
+    def handle(self, *args, **options):
+        size = options['objects']
+        request = Request(APIRequestFactory().get('/api/products/'))
+        context = {'request': request}
+        
+        rows = []
+        with rollback_atomic():
+            self._build_dataset(size)
+            cases = [
+                ('category', CategoryListSerializer, Category.objects.filter(name__startswith='Bench ser')),
+                ('brand', BrandListSerializer, Brand.objects.filter(name__startswith='Bench ser')),
+                (
+                    'product', ProductListSerializerList,
+                    Product.objects.filter(sku__startswith='BENCH-SER-')
+                    .select_related('category', 'brand')
+                    .prefetch_related(Product.prefetch_main_image())
+                ),
+                (
+                    'review', ReviewListSerializer,
+                    Review.objects.filter(product__sku__startswith='BENCH-SER-').select_related('product')
+                ),
+            ]
+            for name, serializer_class, queryset in cases:
+                model_data, model_seconds = self._time(
+                    lambda: serializer_class(list(queryset.all()), many=True, context=context).data,
+                    options['repeat']
+                )
+                serializer = serializer_class(context=context)
+                values_data, values_seconds = self._time(
+                    lambda: serializer.serialize_values(
+                        queryset.prefetch_related(None).values(*serializer.get_values_fields())
+                    ),
+                    options['repeat']
+                )
+                if [dict(item) for item in model_data] != values_data:
+                    self.stderr.write(self.style.WARNING(f'{name}: ответы ModelSerializer и values() различаются'))
+                
+                count = len(values_data)
+                rows.append([name, 'ModelSerializer', count, f'{count / model_seconds:,.0f}'])
+                rows.append([name, 'values()', count, f'{count / values_seconds:,.0f}'])
+                for renderer in (JSONRenderer(), FastJSONRenderer()):
+                    _, seconds = self._time(lambda: renderer.render(values_data), options['repeat'])
+                    rows.append([name, type(renderer).__name__, count, f'{count / seconds:,.0f}'])
+        
+        self.stdout.write(format_table(['payload', 'method', 'objects', 'objects/sec'], rows))
+    
+    @staticmethod
+    def _time(func, repeat):
+        """Результат последнего запуска и среднее время в секундах (с запросами к БД)."""
+        result = None
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return result, (time.perf_counter() - started) / repeat
+    
+    @staticmethod
+    def _build_dataset(size):
+        """size категорий, брендов, товаров (с главным изображением) и отзывов."""
+        categories = Category.objects.bulk_create([
+            Category(name=f'Bench ser category {i}', slug=f'bench-ser-category-{i}', path='')
+            for i in range(size)
+        ], batch_size=2000)
+        brands = Brand.objects.bulk_create([
+            Brand(name=f'Bench ser brand {i}', slug=f'bench-ser-brand-{i}')
+            for i in range(size)
+        ], batch_size=2000)
+        products = Product.objects.bulk_create([
+            Product(
+                category=categories[i % len(categories)], brand=brands[i % len(brands)],
+                name=f'Bench ser product {i}', slug=f'bench-ser-product-{i}', sku=f'BENCH-SER-{i}',
+                description='Benchmark product', price=1000 + i, discount_price=900 + i if i % 3 else None
+            )
+            for i in range(size)
+        ], batch_size=2000)
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f'products/bench-{product.pk}.jpg', is_main=True)
+            for product in products
+        ], batch_size=2000)
+        
+        # Один отзыв на пару (товар, пользователь)
+        users = User.objects.bulk_create([
+            User(email=f'bench-ser-{i}@example.com') for i in range(100)
+        ])
+        Review.objects.bulk_create([
+            Review(
+                product=products[i // len(users)], user=users[i % len(users)],
+                rating=i % 5 + 1, comment='Benchmark review'
+            )
+            for i in range(size)
+        ], batch_size=2000)
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand
+from django.utils.text import slugify
+
+from apps.core.benchmark import rollback_atomic, measure, format_table
+from apps.core.utils import generate_unique_slug, allocate_unique_slugs
+from apps.products.models import Category, Brand, Product
+
+
+def legacy_unique_slug(model_class, value, slug_field='slug'):
+    """Старый алгоритм: exists() на каждый вариант slug, slug-1, slug-2, ..."""
+    slug = slugify(value)
+    counter = 1
+    unique_slug = slug
+    while model_class.objects.filter(**{slug_field: unique_slug}).exists():
+        unique_slug = f'{slug}-{counter}'
+        counter += 1
+    return unique_slug
+
+
+class Command(BaseCommand):
+    help = 'Сравнить генерацию slug при массовых коллизиях (данные откатываются)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--colliding', type=int, default=500, help='Сколько товаров уже с тем же именем')
+        parser.add_argument('--products', type=int, default=50000, help='Прочие товары в таблице')
+        parser.add_argument('--batch', type=int, default=200, help='Размер пачки импорта с тем же именем')
+    
+    def handle(self, *args, **options):
+        name = 'iPhone 15 Case'
+        
+        with rollback_atomic():
+            category = Category.objects.create(name='Bench slug category')
+            brand = Brand.objects.create(name='Bench slug brand')
+            self._build_products(category, brand, name, options['colliding'], options['products'])
+            
+            rows = []
+            _, queries, ms = measure(legacy_unique_slug, Product, name)
+            rows.append(['next slug', 'exists() loop', queries, f'{ms:.1f}'])
+            _, queries, ms = measure(generate_unique_slug, Product, name)
+            rows.append(['next slug', 'prefix query', queries, f'{ms:.1f}'])
+            
+            batch = options['batch']
+            _, queries, ms = measure(self._legacy_batch, category, brand, name, batch)
+            rows.append([f'batch of {batch}', 'exists() loop + save', queries, f'{ms:.1f}'])
+            _, queries, ms = measure(self._bulk_batch, category, brand, name, batch)
+            rows.append([f'batch of {batch}', 'allocate + bulk_create', queries, f'{ms:.1f}'])
+        
+        self.stdout.write(
+            f'Товаров с именем "{name}": {options["colliding"]}, прочих: {options["products"]}'
+        )
+        self.stdout.write(format_table(['operation', 'method', 'queries', 'ms'], rows))
+    
+    def _legacy_batch(self, category, brand, name, size):
+        for i in range(size):
+            Product.objects.bulk_create([self._product(
+                category, brand, name, f'BENCH-SLUG-LEGACY-{i}',
+                legacy_unique_slug(Product, name)
+            )])
+    
+    def _bulk_batch(self, category, brand, name, size):
+        slugs = allocate_unique_slugs(Product, [name] * size)
+        Product.objects.bulk_create([
+            self._product(category, brand, name, f'BENCH-SLUG-BULK-{i}', slug)
+            for i, slug in enumerate(slugs)
+        ])
+    
+    def _build_products(self, category, brand, name, colliding, others):
+        base = slugify(name)
+        products = [
+            self._product(category, brand, name, f'BENCH-SLUG-{i}', f'{base}-{i}' if i else base)
+            for i in range(colliding)
+        ]
+        products.extend(
+            self._product(category, brand, f'Bench item {i}', f'BENCH-SLUG-OTHER-{i}', f'bench-item-{i}')
+            for i in range(others)
+        )
+        Product.objects.bulk_create(products, batch_size=2000)
+    
+    @staticmethod
+    def _product(category, brand, name, sku, slug):
+        return Product(
+            category=category, brand=brand, name=name, slug=slug,
+            description='', price=100, sku=sku
+        )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.exporters import RENDERERS, stream_catalog
+from apps.products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Выгрузить каталог в CSV/JSONL потоково (память не зависит от размера каталога)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=list(RENDERERS), help='По умолчанию — по расширению файла')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--base-url', default='', help='Префикс для URL изображений')
+    
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        base_url = options['base_url'].rstrip('/')
+        
+        lines = 0
+        try:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                for chunk in stream_catalog(
+                    Product.objects.all(), file_format,
+                    chunk_size=options['chunk_size'],
+                    image_url=lambda url: f'{base_url}{url}'
+                ):
+                    stream.write(chunk)
+                    lines += 1
+        except OSError as e:
+            raise CommandError(f'Не удалось записать файл: {e}')
+        
+        self.stdout.write(self.style.SUCCESS(f'Записано строк: {lines} ({path})'))
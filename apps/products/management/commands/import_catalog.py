@@ -0,0 +1,38 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.importers import import_catalog
+
+
+class Command(BaseCommand):
+    help = 'Импортировать каталог из CSV/JSONL пачками (создание и обновление по SKU)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='По умолчанию — по расширению файла')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--no-update', action='store_true', help='Не обновлять существующие SKU')
+        parser.add_argument('--errors', type=int, default=20, help='Сколько ошибок строк вывести')
+    
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as stream:
+                report = import_catalog(
+                    stream, file_format,
+                    chunk_size=options['chunk_size'],
+                    update_existing=not options['no_update']
+                )
+        except OSError as e:
+            raise CommandError(f'Не удалось прочитать файл: {e}')
+        
+        for error in report['errors'][:options['errors']]:
+            self.stderr.write(f'Строка {error["line"]} ({error["sku"]}): {"; ".join(error["errors"])}')
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк: {report["processed"]}, создано: {report["created"]}, '
+            f'обновлено: {report["updated"]}, ошибок: {report["failed"]}, '
+            f'{report["seconds"]} с ({report["rows_per_second"]} строк/с)'
+        ))
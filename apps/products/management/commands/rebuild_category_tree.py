@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.services import CategoryService
+
+
+class Command(BaseCommand):
+    help = 'Пересобрать материализованные пути дерева категорий'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        updated = CategoryService.rebuild_tree(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Обновлено категорий: {updated}'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.read_models import rebuild_product_cards
+
+
+class Command(BaseCommand):
+    help = 'Пересобрать карточки товаров для списка (read-модель ProductCard)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        rebuilt = rebuild_product_cards(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Карточек товаров: {rebuilt}'))
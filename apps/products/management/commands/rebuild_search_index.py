@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.search import get_search_index
+
+
+class Command(BaseCommand):
+    help = 'Пересобрать полнотекстовый индекс товаров'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+    
+    def handle(self, *args, **options):
+        indexed = get_search_index().rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано товаров: {indexed}'))
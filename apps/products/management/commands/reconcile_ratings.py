@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.services import ProductService
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать агрегаты рейтинга товаров из отзывов'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        updated = ProductService.reconcile_ratings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Исправлено товаров: {updated}'))
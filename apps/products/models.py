@@ -1,6 +1,8 @@
 from django.db import models
 from apps.core.utils import generate_unique_slug
-from django.db.models import F, Avg
+from django.db.models import F, Count, Value, Case, When, IntegerField, Prefetch
+from django.db.models.functions import Concat, Substr
+from apps.core.cache import invalidate
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.core.exceptions import ValidationError
 from apps.core.validators import (
@@ -21,11 +23,19 @@ class Category(models.Model):
         null=True
     )
     image = models.ImageField(upload_to='categories/', blank=True)
+    # Уменьшенные копии image (см. apps.core.images)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     
+    # Материализованный путь из id предков: '1/5/23/'
+    path = models.CharField(max_length=255, blank=True, db_index=True, editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    PATH_SEPARATOR = '/'
+    
     class Meta:
         db_table = 'category'
         verbose_name = 'Категория'
@@ -43,40 +53,68 @@ class Category(models.Model):
         """Все прямые дочерние категории."""
         return Category.objects.filter(parent=self)
     
+    def get_ancestor_ids(self):
+        """id предков от корня (без запросов, из материализованного пути)."""
+        return [int(pk) for pk in self.path.split(self.PATH_SEPARATOR)[:-2]]
+    
     def get_descendants(self):
-        """Все потомки категории."""
-        descendants = []
-        children = self.get_children()
-        for child in children:
-            descendants.append(child)
-            descendants.extend(child.get_descendants())
-        return descendants
+        """Все потомки категории (один запрос по префиксу пути)."""
+        if not self.path:
+            return Category.objects.none()
+        return Category.objects.filter(
+            path__startswith=self.path
+        ).exclude(pk=self.pk).order_by('depth', 'name')
     
     def get_ancestors(self):
-        """Все предки до корня"""
-        ancestors = []
-        current = self.parent
-        while current is not None:
-            ancestors.insert(0, current)
-            current = current.parent
-        return ancestors
+        """Все предки до корня (один запрос)."""
+        return Category.objects.filter(
+            pk__in=self.get_ancestor_ids()
+        ).order_by('depth')
     
     def get_products_count(self, include_children=True):
         """Количество товаров (включая дочерние категории)"""
+        if not include_children or not self.path:
+            return self.products.count()
         
-        count = self.products.count()
-        
-        if include_children:
-            for child in self.get_children():
-                count += child.get_products_count(include_children=True)
-                
-        return count
+        return Product.objects.filter(category__path__startswith=self.path).count()
+    
+    def build_path(self):
+        """Путь и глубина по родителю (родитель должен быть уже проиндексирован)."""
+        if self.parent_id is None:
+            return f'{self.pk}{self.PATH_SEPARATOR}', 0
+        return f'{self.parent.path}{self.pk}{self.PATH_SEPARATOR}', self.parent.depth + 1
+    
+    def clean(self):
+        if self.pk and self.parent_id:
+            if self.parent_id == self.pk or self.parent.path.startswith(self.path):
+                raise ValidationError(
+                    'Категорию нельзя переместить внутрь самой себя.'
+                )
     
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = generate_unique_slug(Category, self.name)
+        if self.path:
+            self.clean()
+        
+        old_path, old_depth = self.path, self.depth
         super().save(*args, **kwargs)
         
+        new_path, new_depth = self.build_path()
+        if new_path == old_path:
+            return
+        
+        Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+        if old_path:
+            # Перемещение: переписываем префикс пути у всего поддерева одним UPDATE
+            Category.objects.filter(
+                path__startswith=old_path
+            ).exclude(pk=self.pk).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (new_depth - old_depth)
+            )
+        self.path, self.depth = new_path, new_depth
+        
 
 class Brand(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -89,6 +127,7 @@ class Brand(models.Model):
             validate_image_extension
         ]
     )
+    logo_renditions = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     
@@ -127,6 +166,8 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     discount_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
     stock_quantity = models.PositiveIntegerField(default=1)
+    # Единицы, зарезервированные корзинами (см. StockReservationService)
+    reserved_quantity = models.PositiveIntegerField(default=0)
     sku = models.CharField(
         max_length=100,
         unique=True,
@@ -136,9 +177,25 @@ class Product(models.Model):
     views_count = models.IntegerField(default=0)
     average_rating = models.IntegerField(default=0)
     
+    # Агрегаты отзывов, обновляются дельтами (см. apply_rating_change)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    RATING_VALUES = (1, 2, 3, 4, 5)
+    RATING_FIELDS = [
+        'average_rating', 'rating_sum', 'rating_count',
+        'rating_1_count', 'rating_2_count', 'rating_3_count',
+        'rating_4_count', 'rating_5_count',
+    ]
+    
     class Meta:
         db_table = 'products'
         verbose_name = 'Продукт'
@@ -149,9 +206,12 @@ class Product(models.Model):
             models.Index(fields=['sku']),
             models.Index(fields=['category']),
             models.Index(fields=['brand']),
-            models.Index(fields=['price']),
-            models.Index(fields=['created_at']),
-            models.Index(fields=['-views_count'])
+            # Составные индексы под keyset-пагинацию (поле, id)
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['views_count', 'id']),
+            # Порядок подборки "популярные" без снимка в Redis
+            models.Index(fields=['views_count', 'created_at', 'id'])
         ]
     
     def save(self, *args, **kwargs):
@@ -169,6 +229,10 @@ class Product(models.Model):
             return 0
         return int(((self.price - self.discount_price) / self.price) * 100)
     
+    def get_available_quantity(self):
+        """Остаток за вычетом резервов корзин"""
+        return max(self.stock_quantity - self.reserved_quantity, 0)
+    
     def is_in_stock(self):
         """Есть ли в наличии"""
         return self.stock_quantity > 0 and self.is_available
@@ -180,15 +244,78 @@ class Product(models.Model):
         ).update(views_count=F('views_count') + 1)
     
     def update_average_rating(self):
-        """Пересчитать средний рейтинг из отзывов"""
-        avg = self.reviews.aggregate(Avg('rating'))['rating__avg']
-        self.average_rating = avg or 0
-        self.save(update_fields=['average_rating'])
+        """Пересчитать агрегаты рейтинга из отзывов с нуля"""
+        histogram = dict(
+            self.reviews.order_by().values_list('rating').annotate(n=Count('id'))
+        )
+        self.set_rating_histogram(histogram)
+        self.save(update_fields=self.RATING_FIELDS)
+    
+    def set_rating_histogram(self, histogram):
+        """Выставить все агрегаты рейтинга по гистограмме {оценка: количество}"""
+        for rating in self.RATING_VALUES:
+            setattr(self, f'rating_{rating}_count', histogram.get(rating, 0))
+        self.rating_count = sum(histogram.values())
+        self.rating_sum = sum(rating * n for rating, n in histogram.items())
+        self.average_rating = self.rating_sum // self.rating_count if self.rating_count else 0
+    
+    def get_rating_histogram(self):
+        return {
+            rating: getattr(self, f'rating_{rating}_count')
+            for rating in self.RATING_VALUES
+        }
+    
+    @classmethod
+    def apply_rating_change(cls, product_id, added=None, removed=None):
+        """
+        Обновить агрегаты рейтинга одним UPDATE с F()-дельтами.
+        
+        added/removed — оценка добавленного/удаленного отзыва
+        (изменение оценки = обе сразу). Средний рейтинг считается
+        в том же UPDATE из старых значений столбцов плюс дельта.
+        """
+        if added == removed:
+            return
+        
+        sum_delta = (added or 0) - (removed or 0)
+        count_delta = (added is not None) - (removed is not None)
+        
+        updates = {
+            'rating_sum': F('rating_sum') + sum_delta,
+            'rating_count': F('rating_count') + count_delta,
+            'average_rating': Case(
+                When(
+                    rating_count__gt=-count_delta,
+                    then=(F('rating_sum') + sum_delta) / (F('rating_count') + count_delta)
+                ),
+                default=Value(0),
+                output_field=IntegerField()
+            ),
+        }
+        for rating, delta in ((added, 1), (removed, -1)):
+            if rating in cls.RATING_VALUES:
+                field = f'rating_{rating}_count'
+                updates[field] = F(field) + delta
+        
+        cls.objects.filter(pk=product_id).update(**updates)
+        invalidate(cls._meta.label_lower)
     
     def get_main_image(self):
         """Получить главное изображения"""
+        if hasattr(self, 'main_images'):
+            # Уже загружено через prefetch_main_image — без запроса
+            return self.main_images[0] if self.main_images else None
         return self.product_images.filter(is_main=True).first()
     
+    @staticmethod
+    def prefetch_main_image(lookup='product_images'):
+        """Prefetch только главного изображения в атрибут main_images"""
+        return Prefetch(
+            lookup,
+            queryset=ProductImage.objects.filter(is_main=True),
+            to_attr='main_images'
+        )
+    
     @property
     def final_price(self):
         return self.get_final_price()
@@ -219,6 +346,7 @@ class ProductImage(models.Model):
             validate_image_extension
         ]
     )
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     is_main = models.BooleanField(default=False)
     order = models.IntegerField(default=0)
     alt_text = models.TextField(max_length=500, blank=True, null=True)
@@ -258,6 +386,49 @@ class ProductSpecification(models.Model):
         super().save(*args, **kwargs)
 
 
+class ProductCard(models.Model):
+    """
+    Карточка товара для списка: плоская копия полей без JOIN и вычислений.
+    
+    Поддерживается сигналами и массовыми операциями каталога
+    (см. apps.products.read_models), пересобирается командой rebuild_product_cards.
+    """
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='card'
+    )
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    final_price = models.DecimalField(max_digits=10, decimal_places=2)
+    discount_percent = models.PositiveSmallIntegerField(default=0)
+    brand_id = models.IntegerField()
+    brand_name = models.CharField(max_length=100)
+    brand_slug = models.SlugField(max_length=100)
+    category_id = models.IntegerField()
+    category_name = models.CharField(max_length=100)
+    category_path = models.CharField(max_length=255, db_index=True)
+    # Имя файла копии LIST_IMAGE_SIZE в WebP (пока копий нет — оригинала)
+    main_image = models.CharField(max_length=255, blank=True)
+    in_stock = models.BooleanField(default=True)
+    average_rating = models.IntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'products_cards'
+        verbose_name = 'Карточка товара'
+        verbose_name_plural = 'Карточки товаров'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'product']),
+            models.Index(fields=['final_price', 'product']),
+            models.Index(fields=['average_rating', 'product']),
+        ]
+
+
 class Review(models.Model):
     product = models.ForeignKey(
         Product,
@@ -287,6 +458,17 @@ class Review(models.Model):
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
         unique_together = [('product', 'user')] # Один пользователь - 1 отзыв
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Загруженные значения нужны сигналам для расчета дельты рейтинга
+        instance._loaded_rating = instance.__dict__.get('rating')
+        instance._loaded_product_id = instance.__dict__.get('product_id')
+        return instance
     
     def clean(self):
         if not self.is_verified_purchase:
@@ -0,0 +1,203 @@
+import heapq
+import logging
+import time
+from django.conf import settings
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.db.models.functions import Cast
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from .models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+
+class Collection:
+    """
+    Ранжированная подборка товаров ("популярные", "со скидкой").
+    
+    Снимок строится периодически (rebuild_collections) в Redis sorted set:
+    общий ключ и ключ на каждую категорию, куда входят товары всего
+    поддерева. Страница — ZREVRANGE по рангу и один запрос товаров по id.
+    """
+    
+    KEY = 'product-collection:{}:{}'
+    
+    def __init__(self, name, fallback_ordering):
+        self.name = name
+        # Порядок для запроса к БД, пока снимка нет или Redis недоступен
+        self.fallback_ordering = fallback_ordering
+    
+    def get_rows(self):
+        """
+        Итератор (id, счет, путь категории) по товарам подборки.
+        
+        Счет — любое сравнимое значение (число или кортеж): в снимок
+        попадает только порядок, при равенстве выше больший id.
+        """
+        raise NotImplementedError
+    
+    def get_fallback_queryset(self, queryset):
+        return queryset.order_by(*self.fallback_ordering)
+    
+    def key(self, category_id=None):
+        return self.KEY.format(self.name, category_id or 'all')
+
+
+class PopularCollection(Collection):
+
+    def get_rows(self):
+        # Товары без просмотров тоже в подборке: при равных просмотрах выше новые
+        rows = Product.objects.filter(is_available=True).order_by().values_list(
+            'pk', 'views_count', 'created_at', 'category__path'
+        )
+        for pk, views_count, created_at, path in rows.iterator(chunk_size=5000):
+            yield pk, (views_count, created_at), path
+    
+    def get_fallback_queryset(self, queryset):
+        return super().get_fallback_queryset(queryset.filter(is_available=True))
+
+
+# Доля скидки от цены: счет снимка "со скидкой" и порядок запроса к БД без снимка.
+# Деление в float: SQLite хранит целые цены как INTEGER и делил бы нацело
+DISCOUNT_SHARE = ExpressionWrapper(
+    (F('price') - F('discount_price')) / Cast('price', FloatField()),
+    output_field=FloatField()
+)
+
+
+class OnSaleCollection(Collection):
+
+    def get_rows(self):
+        rows = Product.objects.filter(
+            is_available=True, discount_price__isnull=False, discount_price__lt=F('price')
+        ).order_by().values_list('pk', 'price', 'discount_price', 'category__path')
+        # Счет — доля скидки от цены
+        for pk, price, discount_price, path in rows.iterator(chunk_size=5000):
+            yield pk, float((price - discount_price) / price), path
+    
+    def get_fallback_queryset(self, queryset):
+        return super().get_fallback_queryset(
+            queryset.filter(
+                is_available=True, discount_price__isnull=False, discount_price__lt=F('price')
+            )
+        )
+
+
+COLLECTIONS = {
+    'popular': PopularCollection('popular', ['-views_count', '-created_at', '-pk']),
+    'on_sale': OnSaleCollection('on_sale', [DISCOUNT_SHARE.desc(), '-pk']),
+}
+
+
+def get_collection_size():
+    return getattr(settings, 'PRODUCT_COLLECTION_SIZE', 1000)
+
+
+def rebuild_collection(collection, size=None, redis=None) -> int:
+    """
+    Пересобрать снимок подборки: один проход по товарам, top-N на ключ.
+    
+    Каждый ключ пишется во временный и подменяется RENAME, поэтому
+    читатели видят либо старый, либо новый снимок. В sorted set пишется
+    ранг (size лучших уже отсортированы), а не сам счет: счет может быть
+    кортежем. Ключи категорий, в которых не осталось товаров, удаляются.
+    Возвращает число ключей.
+    """
+    size = size or get_collection_size()
+    redis = redis or get_redis_connection('default')
+    
+    # На ключ — min-heap из size лучших: память O(ключи * size), без полной сортировки
+    buckets = {}
+    for pk, score, path in collection.get_rows():
+        entry = (score, pk)
+        keys = [None] + [int(part) for part in path.split(Category.PATH_SEPARATOR) if part]
+        for category_id in keys:
+            heap = buckets.setdefault(category_id, [])
+            if len(heap) < size:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+    
+    index_key = collection.key('index')
+    previous = {key.decode() for key in redis.smembers(index_key)}
+    current = set()
+    
+    pipe = redis.pipeline(transaction=False)
+    for category_id, entries in buckets.items():
+        key = collection.key(category_id)
+        tmp = f'{key}:tmp'
+        pipe.delete(tmp)
+        entries.sort(reverse=True)
+        pipe.zadd(tmp, {pk: len(entries) - rank for rank, (_, pk) in enumerate(entries)})
+        pipe.rename(tmp, key)
+        current.add(key)
+    
+    stale = previous - current
+    if stale:
+        pipe.delete(*stale)
+    pipe.delete(index_key)
+    if current:
+        pipe.sadd(index_key, *current)
+    # Метка "снимок построен": пустая подборка не уходит в запрос к БД
+    pipe.set(collection.key('built'), int(time.time()))
+    pipe.execute()
+    return len(current)
+
+
+def rebuild_collections(size=None) -> dict:
+    """Пересобрать все подборки. Возвращает {имя: число ключей}."""
+    redis = get_redis_connection('default')
+    return {
+        name: rebuild_collection(collection, size=size, redis=redis)
+        for name, collection in COLLECTIONS.items()
+    }
+
+
+class RankedProducts:
+    """
+    Ленивая последовательность товаров подборки для Paginator.
+    
+    len() — ZCARD, срез — ZREVRANGE и один запрос по id в порядке ранга.
+    Если снимка нет или Redis недоступен, срезы читаются из БД
+    (collection.get_fallback_queryset), ограниченно размером подборки.
+    """
+    
+    def __init__(self, collection, queryset, category=None):
+        self.collection = collection
+        self.queryset = queryset
+        self.key = collection.key(category.pk if category else None)
+        self.fallback = None
+        try:
+            self.redis = get_redis_connection('default')
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zcard(self.key)
+            pipe.exists(collection.key('built'))
+            self.total, built = pipe.execute()
+            if not built:
+                raise LookupError(f'Collection {collection.name} is not built yet')
+        except (RedisError, NotImplementedError, LookupError) as e:
+            logger.warning(f'Ranked collection unavailable, reading from DB: {e}')
+            if category is not None:
+                queryset = queryset.filter(category__path__startswith=category.path)
+            self.fallback = collection.get_fallback_queryset(queryset)[:get_collection_size()]
+            self.total = None
+    
+    def __len__(self):
+        if self.total is None:
+            self.total = self.fallback.count()
+        return self.total
+    
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('RankedProducts supports slicing only')
+        if self.fallback is not None:
+            return list(self.fallback[index])
+    
+        start, stop = index.start or 0, index.stop if index.stop is not None else len(self)
+        if stop <= start:
+            return []
+        ids = [int(pk) for pk in self.redis.zrevrange(self.key, start, stop - 1)]
+        products = self.queryset.in_bulk(ids)
+        # Удаленные после снимка товары просто выпадают из страницы
+        return [products[pk] for pk in ids if pk in products]
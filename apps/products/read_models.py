@@ -0,0 +1,136 @@
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from apps.core.cache import invalidate
+from apps.core.images import rendition_name
+from .models import Category, Brand, Product, ProductCard
+
+logger = logging.getLogger(__name__)
+
+
+CARD_FIELDS = [
+    'name', 'slug', 'price', 'final_price', 'discount_percent',
+    'brand_id', 'brand_name', 'brand_slug',
+    'category_id', 'category_name', 'category_path',
+    'main_image', 'in_stock', 'average_rating', 'rating_count', 'created_at',
+]
+# Поля карточки, которые меняются вместе с агрегатами рейтинга
+RATING_CARD_FIELDS = ['average_rating', 'rating_count']
+
+
+def build_card(product: Product) -> ProductCard:
+    """Карточка из товара с загруженными category, brand и main_images."""
+    image = product.get_main_image()
+    size = getattr(settings, 'LIST_IMAGE_SIZE', 'small')
+    return ProductCard(
+        product_id=product.pk,
+        name=product.name,
+        slug=product.slug,
+        price=product.price,
+        final_price=product.get_final_price(),
+        discount_percent=product.get_discount_percent(),
+        brand_id=product.brand_id,
+        brand_name=product.brand.name,
+        brand_slug=product.brand.slug,
+        category_id=product.category_id,
+        category_name=product.category.name,
+        category_path=product.category.path,
+        main_image=(rendition_name(image.image, image.renditions, size) or '') if image else '',
+        in_stock=product.is_in_stock(),
+        average_rating=product.average_rating,
+        rating_count=product.rating_count,
+        created_at=product.created_at,
+    )
+
+
+def refresh_product_cards(product_ids, batch_size=1000) -> int:
+    """
+    Пересобрать карточки товаров.
+    
+    На пачку — один SELECT товаров с категорией и брендом, один запрос
+    главных изображений и один upsert карточек. Карточки удаленных
+    товаров удаляются каскадом вместе с товаром. Возвращает число карточек.
+    """
+    product_ids = sorted(set(product_ids))
+    refreshed = 0
+    for start in range(0, len(product_ids), batch_size):
+        products = Product.objects.filter(
+            pk__in=product_ids[start:start + batch_size]
+        ).select_related('category', 'brand').prefetch_related(Product.prefetch_main_image())
+        cards = [build_card(product) for product in products]
+        ProductCard.objects.bulk_create(
+            cards,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=CARD_FIELDS
+        )
+        refreshed += len(cards)
+    if refreshed:
+        invalidate(ProductCard._meta.label_lower)
+    return refreshed
+
+
+def schedule_card_refresh(product_ids, using='default'):
+    """Пересобрать карточки после коммита текущей транзакции."""
+    product_ids = list(product_ids)
+    transaction.on_commit(lambda: refresh_product_cards(product_ids), using=using)
+
+
+def sync_card_columns(product_ids, fields):
+    """
+    Скопировать столбцы товара в карточки одним UPDATE с подзапросом.
+    
+    Для записей, которые меняют товар через QuerySet.update() без сигналов
+    (агрегаты рейтинга): пересборка всей карточки не нужна.
+    """
+    source = Product.objects.filter(pk=OuterRef('product_id'))
+    updated = ProductCard.objects.filter(product_id__in=list(product_ids)).update(**{
+        field: Subquery(source.values(field)[:1]) for field in fields
+    })
+    if updated:
+        invalidate(ProductCard._meta.label_lower)
+
+
+def sync_brand_cards(brand: Brand):
+    """Название и slug бренда во всех его карточках одним UPDATE."""
+    updated = ProductCard.objects.filter(brand_id=brand.pk).exclude(
+        brand_name=brand.name, brand_slug=brand.slug
+    ).update(brand_name=brand.name, brand_slug=brand.slug)
+    if updated:
+        invalidate(ProductCard._meta.label_lower)
+
+
+def sync_category_cards(category: Category):
+    """
+    Название и путь категорий поддерева в карточках одним UPDATE.
+    
+    Перемещение категории переписывает пути всего поддерева без сигналов,
+    поэтому значения берутся подзапросом из category.
+    """
+    subtree = Category.objects.filter(path__startswith=category.path).values('pk')
+    source = Category.objects.filter(pk=OuterRef('category_id'))
+    updated = ProductCard.objects.filter(category_id__in=subtree).update(
+        category_name=Subquery(source.values('name')[:1]),
+        category_path=Subquery(source.values('path')[:1])
+    )
+    if updated:
+        invalidate(ProductCard._meta.label_lower)
+
+
+def rebuild_product_cards(batch_size=1000) -> int:
+    """Пересобрать все карточки пачками по id. Возвращает число карточек."""
+    total = 0
+    last_pk = 0
+    while True:
+        ids = list(
+            Product.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        total += refresh_product_cards(ids, batch_size=batch_size)
+        last_pk = ids[-1]
+    logger.info(f'Product cards rebuilt: {total}')
+    return total
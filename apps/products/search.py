@@ -0,0 +1,251 @@
+import re
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import Product
+
+
+SKU_PATTERN = re.compile(r'^[A-Z0-9\-]+$')
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchIndex:
+    """
+    Полнотекстовый индекс товаров (name, sku, description).
+    
+    Хранится в отдельной таблице, которую поддерживают сигналы Product
+    (index_products/remove_products) и команда rebuild_search_index.
+    Таблицу создает ensure_table из обработчика post_migrate.
+    """
+    
+    table = 'products_product_search'
+    insert_batch_size = 200
+    
+    def __init__(self, using='default'):
+        self.using = using
+        self.connection = connections[using]
+    
+    def ensure_table(self):
+        raise NotImplementedError
+    
+    def search(self, query: str, limit: int) -> list:
+        """Список (product_id, rank) по убыванию релевантности."""
+        raise NotImplementedError
+    
+    def match_sql(self, query: str):
+        """(SQL, параметры) подзапроса id всех совпавших товаров или None для пустого запроса."""
+        raise NotImplementedError
+    
+    def _replace(self, rows):
+        raise NotImplementedError
+    
+    def _insert(self, columns, placeholder, rows):
+        """Многострочный INSERT пачками (число параметров запроса ограничено)."""
+        for start in range(0, len(rows), self.insert_batch_size):
+            batch = rows[start:start + self.insert_batch_size]
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {self.table} {columns} VALUES '
+                    + ', '.join([placeholder] * len(batch)),
+                    [value for row in batch for value in row]
+                )
+    
+    def remove_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE {self.id_column} IN ({placeholders})',
+                product_ids
+            )
+    
+    def index_products(self, product_ids):
+        """Переиндексировать товары (удаленные из БД — убрать из индекса)."""
+        product_ids = list(product_ids)
+        rows = list(
+            Product.objects.using(self.using)
+            .filter(pk__in=product_ids)
+            .values_list('pk', 'name', 'sku', 'description')
+        )
+        self.remove_products(product_ids)
+        if rows:
+            self._replace(rows)
+    
+    def rebuild(self, batch_size=2000) -> int:
+        """Построить индекс заново по всем товарам. Возвращает число товаров."""
+        total = 0
+        with transaction.atomic(using=self.using):
+            self.ensure_table()
+            with self.connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {self.table}')
+            
+            last_pk = 0
+            while True:
+                rows = list(
+                    Product.objects.using(self.using)
+                    .filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .values_list('pk', 'name', 'sku', 'description')[:batch_size]
+                )
+                if not rows:
+                    break
+                self._replace(rows)
+                total += len(rows)
+                last_pk = rows[-1][0]
+        return total
+    
+    @staticmethod
+    def tokenize(query: str) -> list:
+        return TOKEN_PATTERN.findall(query.lower())
+
+
+class SQLiteSearchIndex(SearchIndex):
+    """FTS5, ранжирование bm25 (name и sku весят больше описания)."""
+    
+    id_column = 'rowid'
+    
+    def ensure_table(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5('
+                "name, sku, description, tokenize='unicode61 remove_diacritics 2')"
+            )
+            # Веса bm25 для встроенного столбца rank: name и sku важнее описания
+            cursor.execute(
+                f"INSERT INTO {self.table} ({self.table}, rank) VALUES ('rank', 'bm25(10.0, 10.0, 1.0)')"
+            )
+    
+    def _replace(self, rows):
+        self._insert('(rowid, name, sku, description)', '(%s, %s, %s, %s)', rows)
+    
+    @staticmethod
+    def _match(tokens):
+        # Каждое слово — префиксный поиск, слова объединяются через AND
+        return ' '.join(f'"{token}"*' for token in tokens)
+    
+    def match_sql(self, query):
+        tokens = self.tokenize(query)
+        if not tokens:
+            return None
+        return f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [self._match(tokens)]
+    
+    def search(self, query, limit):
+        tokens = self.tokenize(query)
+        if not tokens:
+            return []
+        match = self._match(tokens)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, -rank FROM {self.table} WHERE {self.table} MATCH %s '
+                'ORDER BY rank LIMIT %s',
+                [match, limit]
+            )
+            return cursor.fetchall()
+
+
+class PostgresSearchIndex(SearchIndex):
+    """tsvector + GIN, ранжирование ts_rank_cd (веса A для name/sku, C для описания)."""
+    
+    id_column = 'product_id'
+    
+    @property
+    def config(self):
+        return getattr(settings, 'PRODUCT_SEARCH_CONFIG', 'simple')
+    
+    def ensure_table(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                'product_id bigint PRIMARY KEY, document tsvector NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {self.table}_document_gin '
+                f'ON {self.table} USING GIN (document)'
+            )
+    
+    def _replace(self, rows):
+        self._insert(
+            '(product_id, document)',
+            "(%s, setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+            "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+            "setweight(to_tsvector(%s::regconfig, %s), 'C'))",
+            [
+                (pk, self.config, name, self.config, sku, self.config, description)
+                for pk, name, sku, description in rows
+            ]
+        )
+    
+    @staticmethod
+    def _tsquery(tokens):
+        return ' & '.join(f'{token}:*' for token in tokens)
+    
+    def match_sql(self, query):
+        tokens = self.tokenize(query)
+        if not tokens:
+            return None
+        return (
+            f'SELECT product_id FROM {self.table} '
+            'WHERE document @@ to_tsquery(%s::regconfig, %s)',
+            [self.config, self._tsquery(tokens)]
+        )
+    
+    def search(self, query, limit):
+        tokens = self.tokenize(query)
+        if not tokens:
+            return []
+        tsquery = self._tsquery(tokens)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT product_id, ts_rank_cd(document, query) AS rank '
+                f'FROM {self.table}, to_tsquery(%s::regconfig, %s) query '
+                'WHERE document @@ query ORDER BY rank DESC LIMIT %s',
+                [self.config, tsquery, limit]
+            )
+            return cursor.fetchall()
+
+
+def get_search_index(using='default') -> SearchIndex:
+    if connections[using].vendor == 'postgresql':
+        return PostgresSearchIndex(using)
+    return SQLiteSearchIndex(using)
+
+
+def find_by_sku(query: str):
+    """Быстрый путь: запрос похож на SKU — один lookup по уникальному индексу."""
+    candidate = query.strip().upper()
+    if not candidate or not SKU_PATTERN.match(candidate):
+        return None
+    return Product.objects.filter(sku=candidate).values_list('pk', flat=True).first()
+
+
+def search_product_ids(query: str, limit: int = None) -> list:
+    """
+    id товаров по запросу, в порядке релевантности.
+    
+    Точное совпадение SKU возвращается сразу, без обращения к индексу.
+    """
+    if limit is None:
+        limit = getattr(settings, 'PRODUCT_SEARCH_MAX_RESULTS', 1000)
+    product_id = find_by_sku(query)
+    if product_id is not None:
+        return [product_id]
+    return [pk for pk, _ in get_search_index().search(query, limit)]
+
+
+def filter_by_query(queryset, query: str):
+    """
+    Ограничить queryset товаров (или карточек) совпадениями запроса.
+    
+    Подзапрос к индексу без ранжирования и LIMIT: остальные фильтры,
+    сортировка и пагинация применяются ко всем найденным товарам.
+    """
+    product_id = find_by_sku(query)
+    if product_id is not None:
+        return queryset.filter(pk=product_id)
+    match = get_search_index(queryset.db).match_sql(query)
+    if match is None:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(*match))
@@ -1,21 +1,34 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from apps.core.images import get_rendition_sizes, rendition_url, rendition_urls
+from apps.core.serializers import ValuesSerializerMixin, file_from_values
 from .services import ProductService, ReviewService
 from .models import (
     Category, Brand, Product,
     ProductImage, ProductSpecification,
-    Review
+    ProductCard, Review
 )
 
 
-class CategoryListSerializer(serializers.ModelSerializer):
+class CategoryListSerializer(ValuesSerializerMixin, serializers.ModelSerializer):
+    image_renditions = serializers.SerializerMethodField()
+    values_extra_lookups = ('image_renditions',)
     
     class Meta:
         model = Category
         fields = [
             'id', 'name', 'slug', 'description',
-            'image', 'is_active', 'parent',
+            'image', 'image_renditions', 'is_active', 'parent',
             'created_at', 'updated_at'
         ]
+    
+    def get_image_renditions(self, obj):
+        return rendition_urls(obj.image, obj.image_renditions)
+    
+    def values_image_renditions(self, row):
+        return rendition_urls(file_from_values(Category, 'image', row['image']), row['image_renditions'])
         
 
 class CategoryCreateSerializer(serializers.ModelSerializer):
@@ -27,15 +40,23 @@ class CategoryCreateSerializer(serializers.ModelSerializer):
         ]
 
 
-class BrandListSerializer(serializers.ModelSerializer):
+class BrandListSerializer(ValuesSerializerMixin, serializers.ModelSerializer):
+    logo_renditions = serializers.SerializerMethodField()
+    values_extra_lookups = ('logo_renditions',)
 
     class Meta:
         model = Brand
         fields = [
             'id', 'name', 'slug', 'description',
-            'logo', 'created_at', 'updated_at' 
+            'logo', 'logo_renditions', 'created_at', 'updated_at' 
         ]
     
+    def get_logo_renditions(self, obj):
+        return rendition_urls(obj.logo, obj.logo_renditions)
+    
+    def values_logo_renditions(self, row):
+        return rendition_urls(file_from_values(Brand, 'logo', row['logo']), row['logo_renditions'])
+    
 
 class BrandCreateSerializer(serializers.ModelSerializer):
     
@@ -47,11 +68,12 @@ class BrandCreateSerializer(serializers.ModelSerializer):
 
 class ProductImageSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductImage
         fields = [
-            'id', 'image', 'is_main',
+            'id', 'image', 'renditions', 'is_main',
             'order', 'alt_text'
         ]
 
@@ -59,6 +81,10 @@ class ProductImageSerializer(serializers.ModelSerializer):
         if obj.image:
             return obj.image.url
         return None 
+    
+    def get_renditions(self, obj):
+        """URL уменьшенных копий: {размер: {webp, jpeg}}"""
+        return rendition_urls(obj.image, obj.renditions)
 
 
 class ProductSpecificationSerializer(serializers.ModelSerializer):
@@ -70,7 +96,25 @@ class ProductSpecificationSerializer(serializers.ModelSerializer):
         ]
               
 
-class ProductListSerializerList(serializers.ModelSerializer):
+class ProductImageWriteSerializer(serializers.ModelSerializer):
+    """Изображение в запросе изменения товара: id указывает существующую строку"""
+    id = serializers.IntegerField(required=False)
+    
+    class Meta:
+        model = ProductImage
+        fields = ['id', 'is_main', 'order', 'alt_text']
+
+
+class ProductSpecificationWriteSerializer(serializers.ModelSerializer):
+    """Характеристика в запросе изменения товара: сопоставляется по id или spec_name"""
+    id = serializers.IntegerField(required=False)
+    
+    class Meta:
+        model = ProductSpecification
+        fields = ['id', 'spec_name', 'spec_value', 'order']
+
+
+class ProductListSerializerList(ValuesSerializerMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     brand_name = serializers.CharField(source='brand.name', read_only=True)
     main_image = serializers.SerializerMethodField()
@@ -88,13 +132,59 @@ class ProductListSerializerList(serializers.ModelSerializer):
         ]
         
     def get_main_image(self, obj):
-        img = obj.product_images.filter(is_main=True).first()
+        """Копия размера ?image_size= (по умолчанию LIST_IMAGE_SIZE) в WebP"""
+        img = obj.get_main_image()
         if img and img.image:
-            return img.image.url
+            return rendition_url(img.image, img.renditions, self.image_size)
+        return None
+    
+    def prepare_values(self, rows):
+        """Главные изображения страницы одним запросом"""
+        self._main_images = {
+            row['product_id']: row
+            for row in ProductImage.objects.filter(
+                product_id__in=[row['id'] for row in rows], is_main=True
+            ).values('product_id', 'image', 'renditions')
+        }
+    
+    def values_main_image(self, row):
+        image = self._main_images.get(row['id'])
+        if image and image['image']:
+            field_file = file_from_values(ProductImage, 'image', image['image'])
+            return rendition_url(field_file, image['renditions'], self.image_size)
         return None
+    
+    @property
+    def image_size(self):
+        request = self.context.get('request')
+        size = request.query_params.get('image_size') if request else None
+        if size not in get_rendition_sizes():
+            size = getattr(settings, 'LIST_IMAGE_SIZE', 'small')
+        return size
 
         
 
+class ProductCardSerializer(serializers.ModelSerializer):
+    """Карточка списка из read-модели: поля отдаются как есть, без вычислений"""
+    id = serializers.IntegerField(source='product_id', read_only=True)
+    main_image = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ProductCard
+        fields = [
+            'id', 'name', 'slug',
+            'price', 'final_price', 'discount_percent',
+            'brand_name', 'brand_slug',
+            'category_name', 'category_path',
+            'main_image', 'in_stock',
+            'average_rating', 'rating_count',
+            'created_at',
+        ]
+    
+    def get_main_image(self, obj):
+        return default_storage.url(obj.main_image) if obj.main_image else None
+
+
 class ProductDetailSerializer(serializers.ModelSerializer):
     category = CategoryListSerializer(read_only=True)
     brand = BrandListSerializer(read_only=True)
@@ -117,8 +207,8 @@ class ProductDetailSerializer(serializers.ModelSerializer):
 
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
-    images = ProductImageSerializer(many=True, required=False)
-    specifications = ProductSpecificationSerializer(many=True, required=False)
+    images = ProductImageWriteSerializer(many=True, required=False)
+    specifications = ProductSpecificationWriteSerializer(many=True, required=False)
     
     class Meta:
         model = Product
@@ -150,14 +240,29 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
                 )
         return attrs
     
+    def validate_specifications(self, value):
+        names = [row['spec_name'] for row in value if row.get('spec_name')]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise serializers.ValidationError(
+                f'Характеристики повторяются: {", ".join(duplicates)}'
+            )
+        return value
+    
     def create(self, validated_data):
+        for row in validated_data.get('images', []) + validated_data.get('specifications', []):
+            row.pop('id', None)
         return ProductService.create_product(**validated_data)
     
     def update(self, instance, validated_data):
-        return ProductService.update_product(instance, **validated_data)
+        # PATCH: непереданные изображения и характеристики не удаляются
+        try:
+            return ProductService.update_product(instance, partial=self.partial, **validated_data)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(serializers.as_serializer_error(e))
 
 
-class ReviewListSerializer(serializers.ModelSerializer):
+class ReviewListSerializer(ValuesSerializerMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     
     class Meta:
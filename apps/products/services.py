@@ -1,10 +1,17 @@
 import logging
+from collections import defaultdict
+from django.conf import settings
 from django.db import transaction
 from django.core.exceptions import ValidationError
-from django.db.models import F, Avg
+from django.db.models import F, Q, Count, Min, Max, Case, When, Value, IntegerField
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import LockError, RedisError, ResponseError
 
+from apps.core.cache import invalidate
+from apps.core.utils import parse_decimal
 from apps.users.models import User
-from apps.orders.models import Order, OrderItem
+from .read_models import RATING_CARD_FIELDS, schedule_card_refresh, sync_card_columns
 from .models import (
     Product, Review, Category,
     Brand, ProductImage, ProductSpecification
@@ -15,19 +22,133 @@ logger = logging.getLogger(__name__)
 
 class ProductService:
     
+    VIEWS_PENDING_KEY = 'product-views:pending'
+    VIEWS_PROCESSING_KEY = 'product-views:processing'
+    VIEWS_FLUSH_LOCK = 'product-views:flush-lock'
+    
+    # Поля, которые меняет bulk_update_prices
+    PRICE_FIELDS = ['price', 'discount_price', 'stock_quantity']
+    
     @staticmethod
-    def increment_views(product: Product):
-        """Атомарное увеличение просмотров"""
-        Product.objects.filter(pk=product.pk).update(
-            views_count=F('views_count') + 1
-        )
+    def increment_views(product_id: int):
+        """
+        Учесть просмотр товара.
+        
+        Инкремент идет в Redis-хеш (HINCRBY), без UPDATE и блокировки строки
+        на горячем пути; в БД просмотры переносит flush_views.
+        Если Redis недоступен — пишем напрямую, просмотр не теряется.
+        """
+        try:
+            get_redis_connection('default').hincrby(
+                ProductService.VIEWS_PENDING_KEY, product_id, 1
+            )
+        except (RedisError, NotImplementedError) as e:
+            logger.warning(f'Views buffer unavailable, writing directly: {e}')
+            Product.objects.filter(pk=product_id).update(
+                views_count=F('views_count') + 1
+            )
+    
+    @staticmethod
+    def flush_views(chunk_size=500) -> int:
+        """
+        Перенести накопленные просмотры в products.views_count.
+        
+        Буфер атомарно переименовывается (RENAME), поэтому новые просмотры
+        копятся в свежем хеше. Пачка читается из processing-хеша (HMGET),
+        записывается в БД, и только после коммита ее поля удаляются (HDEL
+        в on_commit): упавший воркер или неудачная запись ничего не теряют,
+        следующий запуск дочитает processing-хеш. Повторное применение
+        пачки параллельным сбросом исключает блокировка, которая продлевается
+        на каждую пачку. Гарантия — «хотя бы один раз»: если процесс умрет
+        между коммитом и HDEL, одна пачка будет учтена повторно.
+        Возвращает число записанных просмотров.
+        """
+        redis = get_redis_connection('default')
+        lock = redis.lock(ProductService.VIEWS_FLUSH_LOCK, timeout=300, blocking=False)
+        if not lock.acquire():
+            return 0
+        
+        flushed = 0
+        try:
+            if not redis.exists(ProductService.VIEWS_PROCESSING_KEY):
+                try:
+                    redis.rename(
+                        ProductService.VIEWS_PENDING_KEY,
+                        ProductService.VIEWS_PROCESSING_KEY
+                    )
+                except ResponseError:
+                    # Буфер пуст
+                    return 0
+            
+            product_ids = [int(pk) for pk in redis.hkeys(ProductService.VIEWS_PROCESSING_KEY)]
+            for start in range(0, len(product_ids), chunk_size):
+                # Долгий сброс не должен пересечься со следующим запуском по расписанию
+                lock.reacquire()
+                ids = product_ids[start:start + chunk_size]
+                counts = redis.hmget(ProductService.VIEWS_PROCESSING_KEY, ids)
+                chunk = [(pk, int(count)) for pk, count in zip(ids, counts) if count is not None]
+                if not chunk:
+                    continue
+                
+                with transaction.atomic():
+                    Product.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+                        views_count=F('views_count') + Case(
+                            *[When(pk=pk, then=Value(count)) for pk, count in chunk],
+                            default=Value(0),
+                            output_field=IntegerField()
+                        )
+                    )
+                    transaction.on_commit(
+                        lambda ids=[pk for pk, _ in chunk]: redis.hdel(
+                            ProductService.VIEWS_PROCESSING_KEY, *ids
+                        )
+                    )
+                flushed += sum(count for _, count in chunk)
+            
+            return flushed
+        except LockError as e:
+            # Блокировка истекла: оставшиеся поля дочитает следующий запуск
+            logger.warning(f'Views flush lock lost after {flushed} views: {e}')
+            return flushed
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                pass
         
     @staticmethod
     def update_rating(product: Product):
-        """Пересчет среднего рейтинга"""
-        avg = product.reviews.aggregate(Avg('rating'))['rating__avg']
-        product.average_rating = avg or 0
-        product.save(update_fields=['average_rating'])
+        """Пересчет рейтинга товара с нуля"""
+        product.update_average_rating()
+    
+    @staticmethod
+    def reconcile_ratings(batch_size=1000) -> int:
+        """
+        Пересчитать агрегаты рейтинга всех товаров с нуля.
+        
+        Один GROUP BY по отзывам (product_id, rating), сравнение в памяти,
+        запись только расходящихся товаров через bulk_update.
+        Возвращает количество исправленных товаров.
+        """
+        histograms = defaultdict(dict)
+        for product_id, rating, n in Review.objects.order_by().values(
+            'product_id', 'rating'
+        ).annotate(n=Count('id')).values_list('product_id', 'rating', 'n'):
+            histograms[product_id][rating] = n
+        
+        changed = []
+        products = Product.objects.order_by().only('id', *Product.RATING_FIELDS)
+        for product in products.iterator(chunk_size=batch_size):
+            current = [getattr(product, field) for field in Product.RATING_FIELDS]
+            product.set_rating_histogram(histograms.get(product.pk, {}))
+            if current != [getattr(product, field) for field in Product.RATING_FIELDS]:
+                changed.append(product)
+        
+        Product.objects.bulk_update(changed, Product.RATING_FIELDS, batch_size=batch_size)
+        if changed:
+            invalidate(Product._meta.label_lower)
+            sync_card_columns([product.pk for product in changed], RATING_CARD_FIELDS)
+        return len(changed)
         
     @staticmethod
     @transaction.atomic
@@ -73,24 +194,349 @@ class ProductService:
         product: Product,
         images: list = None,
         specifications: list = None,
+        partial: bool = False,
         **kwargs
     ) -> Product:
+        """
+        Обновить товар и его изображения/характеристики по разнице.
         
-        for field, value in kwargs.items():
-            setattr(product, field, value)
-        product.save()
+        Записываются только изменившиеся поля товара. Дочерние строки
+        сопоставляются с существующими (изображения по id, характеристики
+        по id или spec_name) и пишутся не более чем тремя запросами на вид:
+        DELETE, bulk_update, bulk_create. При partial=True (PATCH) строки,
+        которых нет в переданном списке, не удаляются.
+        """
+        changed_fields = []
+        for name, value in kwargs.items():
+            field = Product._meta.get_field(name)
+            # FK сравниваем по id, не загружая связанный объект
+            current = getattr(product, field.attname)
+            new = value.pk if field.is_relation and value is not None else value
+            if current != new:
+                setattr(product, name, value)
+                changed_fields.append(name)
+        if changed_fields:
+            product.save(update_fields=[*changed_fields, 'updated_at'])
         
         if images is not None:
-            product.product_images.all().delete()
-            for image_data in images:
-                ProductImage.objects.create(product=product, **image_data)
-        
+            ProductService._sync_images(product, images, partial)
         if specifications is not None:
-            product.product_specifications.all().delete()
-            for spec_data in specifications:
-                ProductSpecification.objects.create(product=product, **spec_data)
+            ProductService._sync_specifications(product, specifications, partial)
     
         return product
+    
+    @staticmethod
+    def _diff_children(existing, rows, fields, partial, match_key=None):
+        """
+        Сопоставить строки запроса с существующими дочерними объектами.
+        
+        existing — {id: объект}. Строка с id изменяет объект с этим id,
+        без id — объект с тем же match_key, иначе создается новый.
+        Возвращает (строки на создание, {id: измененные поля}, id на удаление).
+        """
+        by_key = {getattr(obj, match_key): obj for obj in existing.values()} if match_key else {}
+        to_create, to_update, seen = [], {}, set()
+        
+        for row in rows:
+            row = dict(row)
+            pk = row.pop('id', None)
+            obj = existing.get(pk) if pk is not None else by_key.get(row.get(match_key))
+            if obj is None or obj.pk in seen:
+                to_create.append(row)
+                continue
+            seen.add(obj.pk)
+            changed = [field for field in fields if field in row and getattr(obj, field) != row[field]]
+            for field in changed:
+                setattr(obj, field, row[field])
+            if changed:
+                to_update[obj.pk] = changed
+        
+        to_delete = [] if partial else [pk for pk in existing if pk not in seen]
+        return to_create, to_update, to_delete
+    
+    @staticmethod
+    def _apply_children(model, existing, to_create, to_update, to_delete):
+        """DELETE, bulk_update и bulk_create; версия кеша меняется один раз."""
+        if to_delete:
+            model.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            fields = sorted({field for changed in to_update.values() for field in changed})
+            model.objects.bulk_update([existing[pk] for pk in to_update], fields)
+        created = model.objects.bulk_create(to_create) if to_create else []
+        if to_delete or to_update or created:
+            invalidate(model._meta.label_lower)
+        return created
+    
+    @staticmethod
+    def _sync_images(product: Product, images: list, partial: bool):
+        existing = {image.pk: image for image in product.product_images.all()}
+        rows, to_update, to_delete = ProductService._diff_children(
+            existing, images, ['image', 'is_main', 'order', 'alt_text'], partial
+        )
+        to_create = [ProductImage(product=product, **row) for row in rows]
+        
+        # bulk-операции не вызывают handle_main_image: главным остается
+        # последнее отмеченное в запросе изображение, у остальных флаг снимаем
+        marked = [existing[pk] for pk, changed in to_update.items() if 'is_main' in changed]
+        marked = [obj for obj in marked + to_create if obj.is_main]
+        if marked:
+            main = marked[-1]
+            for obj in to_create:
+                obj.is_main = obj is main
+            for pk, obj in existing.items():
+                if obj.is_main and obj is not main and pk not in to_delete:
+                    obj.is_main = False
+                    changed = to_update.setdefault(pk, [])
+                    if 'is_main' not in changed:
+                        changed.append('is_main')
+        
+        # bulk_update не вызывает pre_save: новый файл сохраняем в хранилище сами
+        image_field = ProductImage._meta.get_field('image')
+        replaced = [existing[pk] for pk, changed in to_update.items() if 'image' in changed]
+        for obj in replaced:
+            image_field.pre_save(obj, add=False)
+        
+        created = ProductService._apply_children(
+            ProductImage, existing, to_create, to_update, to_delete
+        )
+        if created or to_update or to_delete:
+            # Главное изображение могло смениться, а bulk-операции не шлют сигналы
+            schedule_card_refresh([product.pk])
+        ProductService._schedule_renditions(
+            [obj.pk for obj in created + replaced if obj.image]
+        )
+    
+    @staticmethod
+    def _sync_specifications(product: Product, specifications: list, partial: bool):
+        existing = {spec.pk: spec for spec in product.product_specifications.all()}
+        original_names = {pk: spec.spec_name for pk, spec in existing.items()}
+        rows, to_update, to_delete = ProductService._diff_children(
+            existing, specifications, ['spec_name', 'spec_value', 'order'], partial,
+            match_key='spec_name'
+        )
+        to_create = [ProductSpecification(product=product, **row) for row in rows]
+        # bulk-операции обходят ProductSpecification.save() с full_clean
+        for spec in to_create + [existing[pk] for pk in to_update]:
+            spec.clean()
+        
+        # Итоговый набор имен проверяется до записи: иначе unique_together
+        # (product, spec_name) упадет IntegrityError посреди запроса
+        kept = [spec for pk, spec in existing.items() if pk not in to_delete]
+        names = [spec.spec_name for spec in kept + to_create]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValidationError({
+                'specifications': f'Характеристики повторяются: {", ".join(duplicates)}'
+            })
+        
+        # Обмен именами (A ↔ B) нарушил бы уникальность на промежуточной строке
+        # UPDATE: переименованные строки сначала получают временные имена
+        renamed = [pk for pk, changed in to_update.items() if 'spec_name' in changed]
+        taken = {original_names[pk] for pk in existing if pk not in to_delete}
+        if any(existing[pk].spec_name in taken for pk in renamed):
+            ProductSpecification.objects.bulk_update(
+                [ProductSpecification(pk=pk, spec_name=f'~{pk}') for pk in renamed],
+                ['spec_name']
+            )
+        
+        ProductService._apply_children(
+            ProductSpecification, existing, to_create, to_update, to_delete
+        )
+    
+    @staticmethod
+    def _schedule_renditions(image_ids):
+        """Поставить генерацию копий для изображений, записанных без post_save."""
+        if not image_ids:
+            return
+        from apps.core.tasks import generate_image_renditions
+        label = ProductImage._meta.label
+        transaction.on_commit(lambda: [
+            generate_image_renditions.delay(label, pk, 'image', 'renditions')
+            for pk in image_ids
+        ])
+    
+    @staticmethod
+    def bulk_update_prices(rows, chunk_size=None) -> dict:
+        """
+        Массово обновить цены и остатки по SKU.
+        
+        rows — dict с sku и любыми из price, discount_price, stock_quantity
+        (отсутствующий ключ — поле не меняется, discount_price=None снимает скидку).
+        Пачка: один SELECT ... FOR UPDATE текущих значений, проверки
+        discount_price < price и stock_quantity >= reserved_quantity в памяти
+        с учетом непереданных полей, один UPDATE ... CASE через
+        bulk_update только по изменившимся товарам и одна смена версии кеша.
+        Ошибочные строки попадают в отчет и не останавливают остальные.
+        """
+        if chunk_size is None:
+            chunk_size = getattr(settings, 'BULK_PRICE_UPDATE_CHUNK_SIZE', 1000)
+        report = {'processed': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'errors': []}
+        seen = set()
+        
+        rows = list(rows)
+        for start in range(0, len(rows), chunk_size):
+            chunk = list(enumerate(rows[start:start + chunk_size], start=start))
+            report['processed'] += len(chunk)
+            
+            valid = []
+            for index, row in chunk:
+                data, messages = ProductService._clean_price_row(row)
+                if not messages and data['sku'] in seen:
+                    messages.append('sku: повторяется в запросе')
+                if messages:
+                    report['failed'] += 1
+                    report['errors'].append({'index': index, 'sku': data['sku'], 'errors': messages})
+                    continue
+                seen.add(data['sku'])
+                valid.append((index, data))
+            
+            changed, fields = [], set()
+            with transaction.atomic():
+                # Строки заблокированы: резерв корзины не изменит reserved_quantity
+                # между проверкой остатка и записью
+                products = Product.objects.select_for_update().only(
+                    'id', 'sku', 'reserved_quantity', *ProductService.PRICE_FIELDS
+                ).in_bulk([data['sku'] for _, data in valid], field_name='sku')
+                
+                for index, data in valid:
+                    product = products.get(data['sku'])
+                    if product is None:
+                        report['failed'] += 1
+                        report['errors'].append({'index': index, 'sku': data['sku'], 'errors': ['Товар не найден']})
+                        continue
+                    
+                    updates = {
+                        field: data[field] for field in ProductService.PRICE_FIELDS
+                        if field in data and getattr(product, field) != data[field]
+                    }
+                    messages = []
+                    price = updates.get('price', product.price)
+                    discount_price = updates.get('discount_price', product.discount_price)
+                    if discount_price is not None and discount_price >= price:
+                        messages.append('discount_price: должна быть меньше цены')
+                    if updates.get('stock_quantity', product.stock_quantity) < product.reserved_quantity:
+                        messages.append(
+                            f'stock_quantity: меньше зарезервированного в корзинах ({product.reserved_quantity})'
+                        )
+                    if messages:
+                        report['failed'] += 1
+                        report['errors'].append({'index': index, 'sku': data['sku'], 'errors': messages})
+                        continue
+                    
+                    if not updates:
+                        report['unchanged'] += 1
+                        continue
+                    for field, value in updates.items():
+                        setattr(product, field, value)
+                    changed.append(product)
+                    fields.update(updates)
+                
+                if changed:
+                    now = timezone.now()
+                    for product in changed:
+                        product.updated_at = now
+                    Product.objects.bulk_update(changed, [*sorted(fields), 'updated_at'])
+                    invalidate(Product._meta.label_lower)
+                    schedule_card_refresh([product.pk for product in changed])
+            report['updated'] += len(changed)
+        
+        logger.info(
+            f'Bulk price update: {report["processed"]} rows, {report["updated"]} updated, '
+            f'{report["unchanged"]} unchanged, {report["failed"]} failed'
+        )
+        return report
+    
+    @staticmethod
+    def _clean_price_row(row):
+        """Проверки строки без запросов: (данные, ошибки)."""
+        if not isinstance(row, dict):
+            return {'sku': None}, ['Строка должна быть объектом']
+        
+        messages = []
+        data = {'sku': str(row.get('sku') or '').strip().upper()}
+        if not data['sku']:
+            messages.append('sku: обязательное поле')
+        
+        if 'price' in row:
+            data['price'] = parse_decimal(row['price'], 'price', messages, required=True)
+            if data['price'] is not None and data['price'] <= 0:
+                messages.append('price: должна быть больше 0')
+        if 'discount_price' in row:
+            data['discount_price'] = parse_decimal(row['discount_price'], 'discount_price', messages)
+            if data['discount_price'] is not None and data['discount_price'] <= 0:
+                messages.append('discount_price: должна быть больше 0')
+        if 'stock_quantity' in row:
+            stock = row['stock_quantity']
+            if isinstance(stock, bool) or not isinstance(stock, (int, str)) or not str(stock).strip().isdigit():
+                messages.append('stock_quantity: неотрицательное целое')
+            else:
+                data['stock_quantity'] = int(stock)
+        
+        if len(data) == 1 and not messages:
+            messages.append('Нужно хотя бы одно из полей: price, discount_price, stock_quantity')
+        return data, messages
+    
+    @staticmethod
+    def get_facets(queryset) -> dict:
+        """
+        Счетчики фасетов для уже отфильтрованного queryset.
+        
+        Три запроса при любом числе брендов и категорий: GROUP BY по бренду,
+        GROUP BY по категории и один агрегат с условными COUNT для ценовых
+        диапазонов, наличия, скидки и рейтинга.
+        """
+        queryset = queryset.order_by()
+        
+        brands = [
+            {'slug': row['brand__slug'], 'name': row['brand__name'], 'count': row['count']}
+            for row in queryset.values('brand__slug', 'brand__name')
+            .annotate(count=Count('pk')).order_by('-count', 'brand__name')
+        ]
+        categories = [
+            {'slug': row['category__slug'], 'name': row['category__name'], 'count': row['count']}
+            for row in queryset.values('category__slug', 'category__name')
+            .annotate(count=Count('pk')).order_by('-count', 'category__name')
+        ]
+        
+        bounds = list(getattr(settings, 'PRODUCT_FACET_PRICE_BUCKETS', (1000, 5000, 10000, 50000)))
+        price_ranges = list(zip([None] + bounds, bounds + [None]))
+        aggregates = {
+            'total': Count('pk'),
+            'min_price': Min('price'),
+            'max_price': Max('price'),
+            'in_stock': Count('pk', filter=Q(stock_quantity__gt=0, is_available=True)),
+            'has_discount': Count('pk', filter=Q(discount_price__isnull=False)),
+        }
+        for index, (low, high) in enumerate(price_ranges):
+            condition = Q()
+            if low is not None:
+                condition &= Q(price__gte=low)
+            if high is not None:
+                condition &= Q(price__lt=high)
+            aggregates[f'price_{index}'] = Count('pk', filter=condition)
+        for rating in Product.RATING_VALUES:
+            aggregates[f'rating_{rating}'] = Count('pk', filter=Q(average_rating__gte=rating))
+        totals = queryset.aggregate(**aggregates)
+        
+        return {
+            'total': totals['total'],
+            'brands': brands,
+            'categories': categories,
+            'price': {
+                'min': totals['min_price'],
+                'max': totals['max_price'],
+                'ranges': [
+                    {'min_price': low, 'max_price': high, 'count': totals[f'price_{index}']}
+                    for index, (low, high) in enumerate(price_ranges)
+                ],
+            },
+            'in_stock': totals['in_stock'],
+            'has_discount': totals['has_discount'],
+            'min_rating': [
+                {'value': rating, 'count': totals[f'rating_{rating}']}
+                for rating in reversed(Product.RATING_VALUES)
+            ],
+        }
         
 
 class ReviewService:
@@ -98,6 +544,8 @@ class ReviewService:
     @staticmethod
     def check_verified_purchase(user: User, product: Product):
         """Проверка: покупал ли пользователь товар"""
+        from apps.orders.models import OrderItem
+        
         return OrderItem.objects.filter(
             order__user=user,
             order__status='delivered',
@@ -133,3 +581,36 @@ class CategoryService:
             parent__isnull=True,
             is_active=True
         ).prefetch_related('children')
+    
+    @staticmethod
+    @transaction.atomic
+    def rebuild_tree(batch_size=1000) -> int:
+        """
+        Пересобрать материализованные пути всего дерева категорий.
+        
+        Один SELECT по (id, parent_id), пути считаются в памяти,
+        записываются только изменившиеся строки через bulk_update.
+        Возвращает количество обновленных категорий.
+        """
+        children = defaultdict(list)
+        current = {}
+        for pk, parent_id, path, depth in Category.objects.order_by().values_list(
+            'id', 'parent_id', 'path', 'depth'
+        ):
+            children[parent_id].append(pk)
+            current[pk] = (path, depth)
+        
+        changed = []
+        stack = [(pk, '', 0) for pk in children[None]]
+        while stack:
+            pk, prefix, depth = stack.pop()
+            path = f'{prefix}{pk}{Category.PATH_SEPARATOR}'
+            if current.pop(pk) != (path, depth):
+                changed.append(Category(pk=pk, path=path, depth=depth))
+            stack.extend((child, path, depth + 1) for child in children[pk])
+        
+        if current:
+            logger.warning(f'Categories unreachable from root (cycle?): {sorted(current)}')
+        
+        Category.objects.bulk_update(changed, ['path', 'depth'], batch_size=batch_size)
+        return len(changed)
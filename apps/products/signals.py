@@ -1,7 +1,19 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 
-from .models import ProductImage, Review
+from apps.core.cache import invalidate
+from apps.core.images import register_renditions, renditions_ready
+from .models import (
+    Category, Brand, Product,
+    ProductImage, ProductSpecification, Review
+)
+from .read_models import (
+    RATING_CARD_FIELDS, schedule_card_refresh, sync_card_columns,
+    sync_brand_cards, sync_category_cards
+)
+from .search import get_search_index
+
 
 @receiver(post_save, sender=ProductImage)
 def handle_main_image(sender, instance, **kwargs):
@@ -12,12 +24,111 @@ def handle_main_image(sender, instance, **kwargs):
             is_main=True
         ).exclude(pk=instance.pk).update(is_main=False)
 
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+    """Прежняя оценка для отзыва, который не загружался из БД."""
+    if instance.pk and getattr(instance, '_loaded_rating', None) is None:
+        previous = Review.objects.filter(pk=instance.pk).values('rating', 'product_id').first()
+        if previous:
+            instance._loaded_rating = previous['rating']
+            instance._loaded_product_id = previous['product_id']
+
 @receiver(post_save, sender=Review)
-def update_product_rating_on_save(sender, instance, **kwargs):
-    """Пересчитать рейтинг товара при создании/изменении отзыва."""
-    instance.product.update_average_rating()
+def update_product_rating_on_save(sender, instance, created, **kwargs):
+    """Обновить агрегаты рейтинга товара дельтой при создании/изменении отзыва."""
+    previous_rating = getattr(instance, '_loaded_rating', None)
+    previous_product_id = getattr(instance, '_loaded_product_id', None)
+    
+    if created or previous_rating is None:
+        Product.apply_rating_change(instance.product_id, added=instance.rating)
+    elif previous_product_id != instance.product_id:
+        Product.apply_rating_change(previous_product_id, removed=previous_rating)
+        Product.apply_rating_change(instance.product_id, added=instance.rating)
+    else:
+        Product.apply_rating_change(
+            instance.product_id, added=instance.rating, removed=previous_rating
+        )
+    
+    instance._loaded_rating = instance.rating
+    instance._loaded_product_id = instance.product_id
+    sync_card_columns({previous_product_id, instance.product_id} - {None}, RATING_CARD_FIELDS)
 
 @receiver(post_delete, sender=Review)
 def update_product_rating_on_delete(sender, instance, **kwargs):
-    """Пересчитать рейтинг товара при удалении отзыва"""
-    instance.product.update_average_rating()
+    """Вычесть оценку удаленного отзыва из агрегатов товара"""
+    rating = getattr(instance, '_loaded_rating', None) or instance.rating
+    product_id = getattr(instance, '_loaded_product_id', None) or instance.product_id
+    Product.apply_rating_change(product_id, removed=rating)
+    sync_card_columns([product_id], RATING_CARD_FIELDS)
+
+
+@receiver(post_save, sender=Product)
+def update_search_index(sender, instance, using, **kwargs):
+    """Переиндексировать товар после коммита"""
+    transaction.on_commit(
+        lambda: get_search_index(using).index_products([instance.pk]),
+        using=using
+    )
+
+@receiver(post_delete, sender=Product)
+def remove_from_search_index(sender, instance, using, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(
+        lambda: get_search_index(using).remove_products([product_id]),
+        using=using
+    )
+
+@receiver(post_save, sender=Product)
+def refresh_card_on_product_save(sender, instance, using, **kwargs):
+    schedule_card_refresh([instance.pk], using=using)
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def refresh_card_on_image_change(sender, instance, using, **kwargs):
+    """Главное изображение могло смениться"""
+    schedule_card_refresh([instance.product_id], using=using)
+
+@receiver(renditions_ready, sender=ProductImage)
+def refresh_card_on_renditions(sender, pk, **kwargs):
+    """Копии готовы: карточка переходит с оригинала на уменьшенную копию"""
+    product_id = ProductImage.objects.filter(pk=pk, is_main=True).values_list('product_id', flat=True).first()
+    if product_id:
+        schedule_card_refresh([product_id])
+
+@receiver(post_save, sender=Brand)
+def sync_cards_on_brand_save(sender, instance, created, **kwargs):
+    if not created:
+        sync_brand_cards(instance)
+
+@receiver(post_save, sender=Category)
+def sync_cards_on_category_save(sender, instance, created, using, **kwargs):
+    """После коммита: Category.save переписывает пути поддерева уже после post_save"""
+    if not created:
+        transaction.on_commit(lambda: sync_category_cards(instance), using=using)
+
+def create_search_index(sender, using='default', **kwargs):
+    """Создать таблицу поискового индекса после migrate"""
+    get_search_index(using).ensure_table()
+
+
+def invalidate_catalog_cache(sender, **kwargs):
+    """Сменить версию кеша ответов каталога для изменившейся модели."""
+    invalidate(sender._meta.label_lower)
+
+
+for model in (Product, ProductImage, ProductSpecification, Category, Brand):
+    post_save.connect(
+        invalidate_catalog_cache,
+        sender=model,
+        dispatch_uid=f'invalidate_cache_save_{model._meta.label_lower}'
+    )
+    post_delete.connect(
+        invalidate_catalog_cache,
+        sender=model,
+        dispatch_uid=f'invalidate_cache_delete_{model._meta.label_lower}'
+    )
+
+
+register_renditions(ProductImage, 'image', 'renditions')
+register_renditions(Category, 'image', 'image_renditions')
+register_renditions(Brand, 'logo', 'logo_renditions')
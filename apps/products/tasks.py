@@ -0,0 +1,16 @@
+from celery import shared_task
+
+from .services import ProductService
+from .rankings import rebuild_collections
+
+
+@shared_task(acks_late=True)
+def flush_product_views():
+    """Перенести накопленные в Redis просмотры товаров в БД"""
+    return ProductService.flush_views()
+
+
+@shared_task(acks_late=True)
+def rebuild_product_collections():
+    """Пересобрать снимки подборок популярных товаров и товаров со скидкой"""
+    return rebuild_collections()
@@ -0,0 +1,44 @@
+import json
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.products.tests.test_list_queries import create_catalog
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False, FAST_SERIALIZATION_ENABLED=True)
+class ValuesSerializationTest(TestCase):
+    """Списки в режиме values(): меньше запросов и тот же JSON, что у ModelSerializer."""
+    
+    N = 5
+    # URL: запросов на страницу в режиме values()
+    BUDGETS = {
+        '/api/products/category/': 1,
+        '/api/products/brand/': 2,
+        '/api/products/product/': 2,
+        '/api/products/reviews/': 1,
+    }
+    
+    def setUp(self):
+        self.client = APIClient()
+    
+    def get_page(self, url):
+        response = self.client.get(url, {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+    
+    def test_constant_queries(self):
+        create_catalog(0, self.N)
+        for size in (self.N, 10 * self.N):
+            if size > self.N:
+                create_catalog(self.N, size - self.N)
+            for url, queries in self.BUDGETS.items():
+                with self.subTest(url=url, size=size), self.assertNumQueries(queries):
+                    self.get_page(url)
+    
+    def test_same_json_as_model_serializer(self):
+        create_catalog(0, self.N)
+        for url in self.BUDGETS:
+            with self.subTest(url=url):
+                fast = self.get_page(url)
+                with override_settings(FAST_SERIALIZATION_ENABLED=False):
+                    self.assertEqual(fast, self.get_page(url))
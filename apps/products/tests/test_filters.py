@@ -0,0 +1,65 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.products.models import Category, Brand, Product
+from apps.products.read_models import rebuild_product_cards
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class CategoryBrandFilterTest(TestCase):
+    """?category= и ?brand= принимают id или slug, категория — со всем поддеревом."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Category.objects.create(name='Electronics')
+        cls.child = Category.objects.create(name='Laptops', parent=cls.root)
+        cls.other = Category.objects.create(name='Furniture')
+        cls.brand = Brand.objects.create(name='Filter brand')
+        cls.other_brand = Brand.objects.create(name='Other brand')
+        for sku, category, brand in (
+            ('ROOT-1', cls.root, cls.brand),
+            ('CHILD-1', cls.child, cls.other_brand),
+            ('OTHER-1', cls.other, cls.brand),
+        ):
+            Product.objects.create(
+                category=category, brand=brand, name=f'Filter product {sku}',
+                description='', price=100, stock_quantity=5, sku=sku
+            )
+        rebuild_product_cards()
+    
+    def setUp(self):
+        self.client = APIClient()
+    
+    def get_skus(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        ids = [item['id'] for item in response.data['results']]
+        return sorted(Product.objects.filter(pk__in=ids).values_list('sku', flat=True))
+    
+    def assert_filters(self, url):
+        for value in (self.root.slug, str(self.root.pk)):
+            with self.subTest(category=value):
+                self.assertEqual(self.get_skus(url, category=value), ['CHILD-1', 'ROOT-1'])
+        for value in (self.brand.slug, str(self.brand.pk)):
+            with self.subTest(brand=value):
+                self.assertEqual(self.get_skus(url, brand=value), ['OTHER-1', 'ROOT-1'])
+        self.assertEqual(
+            self.get_skus(url, category=str(self.child.pk), brand=self.other_brand.slug),
+            ['CHILD-1']
+        )
+        self.assertEqual(self.get_skus(url, category='missing'), [])
+        self.assertEqual(self.get_skus(url, brand='999999'), [])
+    
+    def test_product_list(self):
+        self.assert_filters('/api/products/product/')
+    
+    def test_product_cards(self):
+        self.assert_filters('/api/products/product-cards/')
+    
+    def test_numeric_slug_wins_over_id(self):
+        numeric = Category.objects.create(name=str(self.other.pk), slug=str(self.other.pk))
+        Product.objects.create(
+            category=numeric, brand=self.brand, name='Numeric slug product',
+            description='', price=100, stock_quantity=5, sku='NUMERIC-1'
+        )
+        self.assertEqual(self.get_skus('/api/products/product/', category=numeric.slug), ['NUMERIC-1'])
@@ -0,0 +1,125 @@
+import io
+import json
+from unittest import mock
+from django.db import DatabaseError
+from django.test import TestCase
+
+from apps.products.importers import CatalogImporter, import_catalog
+from apps.products.models import Category, Brand, Product, ProductCard
+from apps.products.search import search_product_ids
+
+
+CSV_HEADER = 'sku,name,category,brand,price,discount_price,stock_quantity,images,specifications\n'
+
+
+class CatalogImportTest(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Import category')
+        cls.brand = Brand.objects.create(name='Import brand')
+    
+    def csv_row(self, sku, images='', specifications='', price='100'):
+        return (
+            f'{sku},Import product {sku},{self.category.slug},{self.brand.slug},'
+            f'{price},,5,{images},{specifications}\n'
+        )
+    
+    def import_csv(self, *rows, **options):
+        return import_catalog(io.StringIO(CSV_HEADER + ''.join(rows)), 'csv', **options)
+    
+    def import_jsonl(self, *rows, **options):
+        base = {
+            'name': 'Import product', 'category': self.category.slug,
+            'brand': self.brand.slug, 'price': '100'
+        }
+        lines = '\n'.join(json.dumps({**base, **row}) for row in rows)
+        return import_catalog(io.StringIO(lines), 'jsonl', **options)
+    
+    def images(self, sku):
+        return list(
+            Product.objects.get(sku=sku).product_images.order_by('order').values_list('image', 'is_main')
+        )
+    
+    def specifications(self, sku):
+        return dict(Product.objects.get(sku=sku).product_specifications.values_list('spec_name', 'spec_value'))
+    
+    def test_create_and_update(self):
+        report = self.import_csv(
+            self.csv_row('IMPORT-1', 'products/a.jpg;products/b.jpg', 'Цвет:Черный;Вес:1 кг'),
+            self.csv_row('IMPORT-2'),
+        )
+        self.assertEqual((report['created'], report['updated'], report['failed']), (2, 0, 0))
+        self.assertEqual(self.images('IMPORT-1'), [('products/a.jpg', True), ('products/b.jpg', False)])
+        self.assertEqual(self.specifications('IMPORT-1'), {'Цвет': 'Черный', 'Вес': '1 кг'})
+        # bulk-запись без сигналов: индекс и карточки обновлены явно
+        product = Product.objects.get(sku='IMPORT-1')
+        self.assertEqual(
+            set(search_product_ids('import product', 10)),
+            set(Product.objects.values_list('pk', flat=True))
+        )
+        self.assertTrue(ProductCard.objects.filter(pk=product.pk, main_image='products/a.jpg').exists())
+        
+        report = self.import_csv(self.csv_row('IMPORT-1', 'products/c.jpg', price='150'))
+        self.assertEqual((report['created'], report['updated']), (0, 1))
+        self.assertEqual(Product.objects.get(sku='IMPORT-1').price, 150)
+        self.assertEqual(self.images('IMPORT-1'), [('products/c.jpg', True)])
+        self.assertEqual(self.specifications('IMPORT-1'), {'Цвет': 'Черный', 'Вес': '1 кг'})
+    
+    def test_blank_cell_keeps_images_and_marker_clears_them(self):
+        self.import_csv(self.csv_row('IMPORT-1', 'products/a.jpg', 'Цвет:Черный'))
+        
+        self.import_csv(self.csv_row('IMPORT-1', '', ''))
+        self.assertEqual(self.images('IMPORT-1'), [('products/a.jpg', True)])
+        self.assertEqual(self.specifications('IMPORT-1'), {'Цвет': 'Черный'})
+        
+        self.import_csv(self.csv_row('IMPORT-1', '-', '-'))
+        self.assertEqual(self.images('IMPORT-1'), [])
+        self.assertEqual(self.specifications('IMPORT-1'), {})
+    
+    def test_jsonl_blank_values_keep_images(self):
+        self.import_jsonl({'sku': 'IMPORT-1', 'images': ['products/a.jpg'], 'specifications': {'Цвет': 'Черный'}})
+        for row in ({}, {'images': None}, {'images': [], 'specifications': {}}):
+            with self.subTest(row=row):
+                self.import_jsonl({'sku': 'IMPORT-1', **row})
+                self.assertEqual(self.images('IMPORT-1'), [('products/a.jpg', True)])
+                self.assertEqual(self.specifications('IMPORT-1'), {'Цвет': 'Черный'})
+        
+        self.import_jsonl({'sku': 'IMPORT-1', 'images': '-'})
+        self.assertEqual(self.images('IMPORT-1'), [])
+        self.assertEqual(self.specifications('IMPORT-1'), {'Цвет': 'Черный'})
+    
+    def test_invalid_and_duplicate_rows_are_reported(self):
+        report = self.import_csv(
+            self.csv_row('IMPORT-1'),
+            self.csv_row('IMPORT-1'),
+            self.csv_row('import bad'),
+            self.csv_row('IMPORT-3', price='free'),
+            self.csv_row('IMPORT-4'),
+            chunk_size=2
+        )
+        self.assertEqual((report['created'], report['failed']), (2, 3))
+        self.assertEqual([error['line'] for error in report['errors']], [3, 4, 5])
+        self.assertIn('sku: повторяется в фиде', report['errors'][0]['errors'])
+        self.assertEqual(sorted(Product.objects.values_list('sku', flat=True)), ['IMPORT-1', 'IMPORT-4'])
+    
+    def test_failed_chunk_does_not_block_its_skus(self):
+        write = CatalogImporter._write
+        calls = []
+        
+        def fail_first(importer, valid, existing):
+            calls.append([data['sku'] for _, data in valid])
+            if len(calls) == 1:
+                raise DatabaseError('deadlock detected')
+            return write(importer, valid, existing)
+        
+        with mock.patch.object(CatalogImporter, '_write', autospec=True, side_effect=fail_first):
+            report = self.import_csv(
+                self.csv_row('IMPORT-1'),
+                self.csv_row('IMPORT-2'),
+                self.csv_row('IMPORT-1'),
+                chunk_size=2
+            )
+        # Пачка откатилась: повтор SKU в следующей пачке импортируется
+        self.assertEqual((report['created'], report['failed']), (1, 2))
+        self.assertEqual(list(Product.objects.values_list('sku', flat=True)), ['IMPORT-1'])
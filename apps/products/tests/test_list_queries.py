@@ -0,0 +1,80 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.products.models import Category, Brand, Product, ProductImage, Review
+from apps.products.read_models import rebuild_product_cards
+
+
+def create_catalog(start, size):
+    """size товаров (с главным изображением и отзывом), категорий и брендов с номерами от start."""
+    for i in range(start, start + size):
+        category = Category.objects.create(name=f'Query category {i}')
+        brand = Brand.objects.create(name=f'Query brand {i}')
+        product = Product.objects.create(
+            category=category, brand=brand, name=f'Query product {i}',
+            description='', price=1000 + i, discount_price=900 + i if i % 2 else None,
+            stock_quantity=10, sku=f'QUERY-{i}'
+        )
+        ProductImage.objects.create(product=product, image=f'products/query-{i}.jpg', is_main=True)
+        ProductImage.objects.create(product=product, image=f'products/query-{i}-2.jpg', order=1)
+        user = User.objects.create_user(f'query-{i}@example.com', 'password')
+        Review.objects.create(
+            product=product, user=user, rating=i % 5 + 1,
+            comment='Query review', is_verified_purchase=True
+        )
+    # Карточки обновляются on_commit, а тест идет внутри транзакции
+    rebuild_product_cards()
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ListQueryCountTest(TestCase):
+    """Страница списка стоит одинаковое число запросов при N и 10N строках."""
+    
+    N = 5
+    # URL: запросов на страницу через ModelSerializer
+    BUDGETS = {
+        '/api/products/category/': 2,
+        '/api/products/brand/': 2,
+        '/api/products/product/': 2,
+        '/api/products/reviews/': 1,
+    }
+    
+    def setUp(self):
+        self.client = APIClient()
+    
+    def get_page(self, url):
+        response = self.client.get(url, {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+    
+    def assert_budgets(self, budgets):
+        create_catalog(0, self.N)
+        for size in (self.N, 10 * self.N):
+            if size > self.N:
+                create_catalog(self.N, size - self.N)
+            for url, queries in budgets.items():
+                with self.subTest(url=url, size=size), self.assertNumQueries(queries):
+                    self.get_page(url)
+    
+    @override_settings(FAST_SERIALIZATION_ENABLED=False)
+    def test_model_serialization(self):
+        self.assert_budgets(self.BUDGETS)
+    
+    def test_page_grows_with_data(self):
+        create_catalog(0, self.N)
+        self.assertEqual(len(self.get_page('/api/products/product/')), self.N)
+        create_catalog(self.N, 9 * self.N)
+        self.assertEqual(len(self.get_page('/api/products/product/')), 10 * self.N)
+    
+    @override_settings(FAST_SERIALIZATION_ENABLED=False)
+    def test_main_image_from_prefetch(self):
+        """Главное изображение строки списка берется из общего prefetch, без запроса на товар."""
+        create_catalog(0, 10 * self.N)
+        with CaptureQueriesContext(connection) as queries:
+            results = self.get_page('/api/products/product/')
+        image_queries = [query for query in queries.captured_queries if 'products_images' in query['sql']]
+        self.assertEqual(len(image_queries), 1)
+        self.assertTrue(all(row['main_image'] for row in results))
@@ -0,0 +1,92 @@
+from decimal import Decimal
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.products.models import Category, Brand, Product, ProductCard, Review
+from apps.products.read_models import rebuild_product_cards
+from apps.products.tests.test_list_queries import create_catalog
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ProductCardTest(TestCase):
+    """Список /product-cards/ читает одну таблицу, карточки следуют за каталогом."""
+    
+    url = '/api/products/product-cards/'
+    N = 5
+    
+    def setUp(self):
+        self.client = APIClient()
+    
+    def get_cards(self, **params):
+        response = self.client.get(self.url, {'page_size': 100, **params})
+        self.assertEqual(response.status_code, 200)
+        return {card['id']: card for card in response.data['results']}
+    
+    def get_skus(self, **params):
+        return sorted(Product.objects.filter(pk__in=self.get_cards(**params)).values_list('sku', flat=True))
+    
+    def test_page_is_one_query(self):
+        create_catalog(0, self.N)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.get_cards()), self.N)
+        create_catalog(self.N, 9 * self.N)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.get_cards()), 10 * self.N)
+    
+    def test_card_copies_product(self):
+        create_catalog(0, 2)
+        product = Product.objects.select_related('category', 'brand').get(sku='QUERY-1')
+        card = self.get_cards()[product.pk]
+        self.assertEqual(card['name'], product.name)
+        self.assertEqual(Decimal(card['price']), product.price)
+        self.assertEqual(Decimal(card['final_price']), product.discount_price)
+        self.assertEqual(card['discount_percent'], product.get_discount_percent())
+        self.assertEqual(card['brand_slug'], product.brand.slug)
+        self.assertEqual(card['category_path'], product.category.path)
+        self.assertEqual(card['main_image'], '/media/products/query-1.jpg')
+        self.assertEqual((card['average_rating'], card['rating_count']), (product.average_rating, 1))
+    
+    def test_cards_follow_catalog_changes(self):
+        create_catalog(0, 1)
+        product = Product.objects.select_related('brand', 'category').get(sku='QUERY-0')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            product.discount_price = Decimal('500.00')
+            product.save()
+        card = ProductCard.objects.get(pk=product.pk)
+        self.assertEqual((card.final_price, card.discount_percent), (Decimal('500.00'), 50))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            product.brand.name = 'Renamed brand'
+            product.brand.save()
+            product.category.name = 'Renamed category'
+            product.category.save()
+        card.refresh_from_db()
+        self.assertEqual((card.brand_name, card.category_name), ('Renamed brand', 'Renamed category'))
+        
+        user = User.objects.create_user('card-review@example.com', 'password')
+        Review.objects.create(product=product, user=user, rating=5, is_verified_purchase=True)
+        card.refresh_from_db()
+        self.assertEqual(card.rating_count, 2)
+        
+        product.delete()
+        self.assertFalse(ProductCard.objects.filter(pk=product.pk).exists())
+    
+    def test_filters_use_card_columns(self):
+        create_catalog(0, 4)
+        root = Category.objects.create(name='Card root')
+        Category.objects.filter(name__in=['Query category 1', 'Query category 2']).update(parent=root)
+        for category in Category.objects.filter(parent=root):
+            category.save()
+        rebuild_product_cards()
+        
+        self.assertEqual(self.get_skus(category=root.slug), ['QUERY-1', 'QUERY-2'])
+        # Цена фильтруется по final_price: у нечетных товаров скидка
+        self.assertEqual(self.get_skus(min_price=1000), ['QUERY-0', 'QUERY-2'])
+        self.assertEqual(self.get_skus(brand=Brand.objects.get(name='Query brand 3').slug), ['QUERY-3'])
+    
+    def test_list_only(self):
+        create_catalog(0, 1)
+        response = self.client.get(f'{self.url}{Product.objects.get().pk}/')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,81 @@
+from datetime import timedelta
+from unittest import mock
+
+import fakeredis
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.products.models import Category, Brand, Product
+from apps.products.rankings import COLLECTIONS, rebuild_collection
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class PopularCollectionTest(TestCase):
+    """Популярные: по просмотрам, при равных просмотрах — новые выше; товары без просмотров тоже."""
+    
+    url = '/api/products/product/popular/'
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.root = Category.objects.create(name='Popular root')
+        cls.child = Category.objects.create(name='Popular child', parent=cls.root)
+        other = Category.objects.create(name='Popular other')
+        brand = Brand.objects.create(name='Popular brand')
+        now = timezone.now()
+        # sku: (категория, просмотры, дней назад)
+        rows = {
+            'OLD-ZERO': (cls.child, 0, 3),
+            'NEW-ZERO': (cls.root, 0, 1),
+            'OLD-FIVE': (other, 5, 4),
+            'NEW-FIVE': (cls.child, 5, 2),
+            'TOP': (cls.root, 9, 5),
+        }
+        for sku, (category, views, days) in rows.items():
+            product = Product.objects.create(
+                category=category, brand=brand, name=f'Popular {sku}',
+                description='', price=100, stock_quantity=5, sku=sku
+            )
+            Product.objects.filter(pk=product.pk).update(
+                views_count=views, created_at=now - timedelta(days=days)
+            )
+        Product.objects.create(
+            category=cls.root, brand=brand, name='Popular hidden', description='',
+            price=100, stock_quantity=5, sku='HIDDEN', is_available=False
+        )
+    
+    def setUp(self):
+        self.client = APIClient()
+    
+    def get_skus(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [item['sku'] for item in response.data['results']]
+    
+    def test_fallback_order(self):
+        """Без Redis (кеш тестов — locmem) страница читается из БД."""
+        self.assertEqual(self.get_skus(), ['TOP', 'NEW-FIVE', 'OLD-FIVE', 'NEW-ZERO', 'OLD-ZERO'])
+        self.assertEqual(self.get_skus(category=self.root.slug), ['TOP', 'NEW-FIVE', 'NEW-ZERO', 'OLD-ZERO'])
+    
+    def test_snapshot_matches_fallback(self):
+        redis = fakeredis.FakeRedis()
+        with mock.patch('apps.products.rankings.get_redis_connection', return_value=redis):
+            fallback = {None: self.get_skus(), self.root.slug: self.get_skus(category=self.root.slug)}
+            rebuild_collection(COLLECTIONS['popular'], redis=redis)
+            self.assertEqual(self.get_skus(), fallback[None])
+            self.assertEqual(self.get_skus(category=self.root.slug), fallback[self.root.slug])
+            self.assertEqual(self.get_skus(category=self.child.slug), ['NEW-FIVE', 'OLD-ZERO'])
+    
+    def test_snapshot_keeps_top_size(self):
+        redis = fakeredis.FakeRedis()
+        collection = COLLECTIONS['popular']
+        rebuild_collection(collection, size=2, redis=redis)
+        pks = dict(Product.objects.values_list('sku', 'pk'))
+        for category_id, expected in (
+            (None, ['TOP', 'NEW-FIVE']),
+            (self.root.pk, ['TOP', 'NEW-FIVE']),
+            (self.child.pk, ['NEW-FIVE', 'OLD-ZERO']),
+        ):
+            with self.subTest(category=category_id):
+                ids = [int(pk) for pk in redis.zrevrange(collection.key(category_id), 0, -1)]
+                self.assertEqual(ids, [pks[sku] for sku in expected])
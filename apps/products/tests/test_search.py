@@ -0,0 +1,70 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.products.models import Category, Brand, Product
+from apps.products.search import get_search_index
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ProductSearchTest(TestCase):
+    """Таблица индекса создается post_migrate (тесты идут с --nomigrations)."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Search category')
+        brand = Brand.objects.create(name='Search brand')
+        for i in range(6):
+            Product.objects.create(
+                category=category, brand=brand, name=f'Laptop model {i}',
+                description='Ноутбук для работы', price=1000 + i * 100,
+                stock_quantity=5, sku=f'LAPTOP-{i}'
+            )
+        Product.objects.create(
+            category=category, brand=brand, name='Office chair',
+            description='', price=500, stock_quantity=5, sku='CHAIR-1'
+        )
+        get_search_index().rebuild()
+    
+    def setUp(self):
+        self.client = APIClient()
+    
+    def list_skus(self, **params):
+        response = self.client.get('/api/products/product/', {'page_size': 100, **params})
+        self.assertEqual(response.status_code, 200)
+        return {item['sku'] for item in response.data['results']}
+    
+    @override_settings(PRODUCT_SEARCH_MAX_RESULTS=2)
+    def test_filter_is_not_limited_by_max_results(self):
+        """Остальные фильтры применяются ко всем совпадениям, а не к первым N."""
+        self.assertEqual(len(self.list_skus(search='laptop')), 6)
+        self.assertEqual(
+            self.list_skus(search='laptop', min_price=1300),
+            {'LAPTOP-3', 'LAPTOP-4', 'LAPTOP-5'}
+        )
+    
+    def test_prefix_and_description_match(self):
+        self.assertEqual(self.list_skus(search='ноутбук лапт'), set())
+        self.assertEqual(len(self.list_skus(search='ноутб')), 6)
+        self.assertEqual(self.list_skus(search='chai'), {'CHAIR-1'})
+    
+    def test_sku_fast_path(self):
+        self.assertEqual(self.list_skus(search='laptop-2'), {'LAPTOP-2'})
+    
+    def test_index_follows_product_changes(self):
+        product = Product.objects.get(sku='CHAIR-1')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = 'Gaming laptop stand'
+            product.save()
+        self.assertIn('CHAIR-1', self.list_skus(search='laptop'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(self.list_skus(search='stand'), set())
+    
+    def test_search_action_limit(self):
+        response = self.client.get('/api/products/product/search/', {'q': 'laptop', 'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        
+        response = self.client.get('/api/products/product/search/')
+        self.assertEqual(response.status_code, 400)
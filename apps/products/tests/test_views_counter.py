@@ -0,0 +1,87 @@
+from unittest import mock
+
+import fakeredis
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import TestCase
+
+from apps.products.models import Category, Brand, Product
+from apps.products.services import ProductService
+
+
+class ViewsCounterTest(TestCase):
+    """Буфер просмотров в fakeredis и сброс в products.views_count."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Views category')
+        brand = Brand.objects.create(name='Views brand')
+        cls.products = [
+            Product.objects.create(
+                category=category, brand=brand, name=f'Views product {i}',
+                description='', price=100, stock_quantity=5, sku=f'VIEWS-{i}'
+            )
+            for i in range(3)
+        ]
+    
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch('apps.products.services.get_redis_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def record_views(self):
+        for i, product in enumerate(self.products, start=1):
+            for _ in range(i):
+                ProductService.increment_views(product.pk)
+    
+    def views(self):
+        return list(
+            Product.objects.filter(pk__in=[product.pk for product in self.products])
+            .order_by('pk').values_list('views_count', flat=True)
+        )
+    
+    def test_flush_moves_views_to_database(self):
+        self.record_views()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ProductService.flush_views(chunk_size=2), 6)
+        self.assertEqual(self.views(), [1, 2, 3])
+        self.assertFalse(self.redis.exists(ProductService.VIEWS_PROCESSING_KEY))
+        
+        # Новые просмотры копятся в свежем буфере
+        ProductService.increment_views(self.products[0].pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ProductService.flush_views(), 1)
+        self.assertEqual(self.views(), [2, 2, 3])
+    
+    def test_failed_write_keeps_views_in_buffer(self):
+        self.record_views()
+        with mock.patch.object(QuerySet, 'update', side_effect=DatabaseError('database is locked')):
+            with self.assertRaises(DatabaseError):
+                ProductService.flush_views()
+        self.assertEqual(self.views(), [0, 0, 0])
+        self.assertEqual(self.redis.hlen(ProductService.VIEWS_PROCESSING_KEY), 3)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ProductService.flush_views(), 6)
+        self.assertEqual(self.views(), [1, 2, 3])
+    
+    def test_fields_are_deleted_only_after_commit(self):
+        self.record_views()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            ProductService.flush_views(chunk_size=2)
+        # До коммита буфер не тронут: потерять просмотры при падении нельзя
+        self.assertEqual(self.redis.hlen(ProductService.VIEWS_PROCESSING_KEY), 3)
+        self.assertEqual(len(callbacks), 2)
+        
+        for callback in callbacks:
+            callback()
+        self.assertFalse(self.redis.exists(ProductService.VIEWS_PROCESSING_KEY))
+    
+    def test_concurrent_flush_is_skipped(self):
+        self.record_views()
+        lock = self.redis.lock(ProductService.VIEWS_FLUSH_LOCK, timeout=60)
+        lock.acquire()
+        self.assertEqual(ProductService.flush_views(), 0)
+        self.assertEqual(self.views(), [0, 0, 0])
+        lock.release()
@@ -3,6 +3,7 @@ from .views import (
     CategoryViewSet,
     BrandViewSet,
     ProductViewSet,
+    ProductCardViewSet,
     ReviewViewSet
 )
 
@@ -13,6 +14,7 @@ router = DefaultRouter()
 router.register('category', CategoryViewSet, basename='category')
 router.register('brand', BrandViewSet, basename='brand')
 router.register('product', ProductViewSet, basename='product')
+router.register('product-cards', ProductCardViewSet, basename='product-card')
 router.register('reviews', ReviewViewSet, basename='reviews')
 
 urlpatterns = router.urls
@@ -1,16 +1,28 @@
-from rest_framework import viewsets, filters
+from rest_framework import mixins, viewsets, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from .services import CategoryService, ProductService
+from .filters import ProductCardFilter, ProductFilter, ProductSearchFilter
+from .search import search_product_ids
+from .rankings import COLLECTIONS, RankedProducts
+from .importers import import_catalog
+from .exporters import CONTENT_TYPES, stream_catalog
+from apps.core.cache import get_stats
+from apps.core.mixins import CachedListMixin, CachedResponseMixin, ValuesListMixin
+from apps.core.pagination import KeysetPagination, StandardPagination
 from apps.core.permissions import (
     IsAdminOrReadOnly,
+    IsAdminUser,
     IsAuthenticatedOrReadOnly,
     IsOwner
 )
 from .models import (
     Category, Brand, Product,
-    Review
+    ProductCard, Review
 )
 from .serializers import (
     CategoryListSerializer,
@@ -20,18 +32,23 @@ from .serializers import (
     ProductListSerializerList,
     ProductDetailSerializer,
     ProductCreateUpdateSerializer,
+    ProductCardSerializer,
     ReviewListSerializer,
     ReviewCreateSerializer
 )
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CachedResponseMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategoryListSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_namespace = 'categories'
+    cache_dependencies = ('products.category',)
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
+    ordering = ['name']
     
     def get_queryset(self):
         return CategoryService.get_category_tree()
@@ -42,10 +59,12 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return CategoryListSerializer
             
 
-class BrandViewSet(viewsets.ModelViewSet):
+class BrandViewSet(CachedResponseMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Brand.objects.all()
     serializer_class = BrandListSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_namespace = 'brands'
+    cache_dependencies = ('products.brand',)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name']
@@ -56,49 +75,178 @@ class BrandViewSet(viewsets.ModelViewSet):
         return BrandListSerializer
     
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.select_related(
-        'category', 'brand'
-    ).prefetch_related(
-        'product_images', 'product_specifications'
-    )
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+class ProductViewSet(CachedResponseMixin, ValuesListMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.select_related('category', 'brand')
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, filters.OrderingFilter]
     permission_classes = [IsAdminOrReadOnly]
-    filterset_fields = ['category', 'brand', 'is_available']
+    pagination_class = KeysetPagination
+    filterset_class = ProductFilter
     search_fields = ['name', 'sku', 'description']
-    ordering_fields = ['name', 'created_at', 'sku']
+    ordering_fields = ['name', 'created_at', 'sku', 'price', 'views_count']
+    ordering = ['-created_at']
+    cache_namespace = 'products'
+    # Действия, отдающие карточки списка
+    list_actions = ('list', 'search', 'popular', 'on_sale')
+    cache_actions = ('list', 'retrieve', 'facets')
+    cache_dependencies = (
+        'products.product', 'products.productimage',
+        'products.productspecification', 'products.category',
+        'products.brand'
+    )
     
     @action(detail=False, methods=['get'])
     def popular(self, request):
-        products = self.queryset.order_by('-views_count')[:10]
-        serializer = self.get_serializer(products, many=True)
-        return Response(serializer.data)
+        """Популярные товары из снимка подборки: ?category=<slug>, ?page=, ?page_size="""
+        return self._collection(request, COLLECTIONS['popular'])
     
     @action(detail=False, methods=['get'])
     def on_sale(self, request):
-        products = self.queryset.filter(discount_price__isnull=False)
+        """Товары со скидкой (по размеру скидки): ?category=<slug>, ?page=, ?page_size="""
+        return self._collection(request, COLLECTIONS['on_sale'])
+    
+    def _collection(self, request, collection):
+        category = None
+        slug = request.query_params.get('category')
+        if slug:
+            category = Category.objects.filter(slug=slug).only('pk', 'path').first()
+            if category is None:
+                raise NotFound('Категория не найдена')
+        
+        products = RankedProducts(collection, self.get_queryset(), category)
+        paginator = StandardPagination()
+        page = paginator.paginate_queryset(products, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Полнотекстовый поиск: ?q=, результаты по релевантности (?limit=, до 100)"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'Укажите поисковый запрос'})
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            raise ValidationError({'limit': 'Должно быть целым числом'})
+        
+        product_ids = search_product_ids(query, limit)
+        products = self.get_queryset().filter(pk__in=product_ids)
+        positions = {pk: position for position, pk in enumerate(product_ids)}
+        products = sorted(products, key=lambda product: positions[product.pk])
         serializer = self.get_serializer(products, many=True)
-        return Response(serializer.data)
+        return Response({
+            'query': query,
+            'count': len(products),
+            'results': serializer.data
+        })
+    
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Счетчики фасетов сайдбара для текущих фильтров (те же параметры, что у списка)"""
+        return self.get_cached_response(self._facets, request)
+    
+    def _facets(self, request):
+        queryset = self.filter_queryset(Product.objects.all())
+        return Response(ProductService.get_facets(queryset))
+    
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        permission_classes=[IsAdminUser],
+        parser_classes=[MultiPartParser]
+    )
+    def import_catalog(self, request):
+        """Импорт фида CSV/JSONL (поле file, формат — по расширению или полю format)"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'Загрузите файл CSV или JSONL'})
+        file_format = request.data.get('format') or (
+            'csv' if upload.name.lower().endswith('.csv') else 'jsonl'
+        )
+        if file_format not in ('csv', 'jsonl'):
+            raise ValidationError({'format': 'Допустимо: csv, jsonl'})
+        
+        report = import_catalog(
+            upload.file, file_format,
+            update_existing=request.data.get('update_existing', 'true').lower() != 'false'
+        )
+        return Response(report)
+    
+    @action(detail=False, methods=['post'], url_path='bulk-update', permission_classes=[IsAdminUser])
+    def bulk_update_prices(self, request):
+        """Цены и остатки по SKU: список {sku, price, discount_price, stock_quantity} или {"rows": [...]}"""
+        rows = request.data.get('rows') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list):
+            raise ValidationError({'rows': 'Ожидается список строк'})
+        return Response(ProductService.bulk_update_prices(rows))
+    
+    @action(detail=False, methods=['get'], url_path='export', permission_classes=[IsAdminUser])
+    def export_catalog(self, request):
+        """Потоковая выгрузка каталога: ?export_format=csv|jsonl, фильтры как у списка"""
+        file_format = request.query_params.get('export_format', 'csv')
+        if file_format not in CONTENT_TYPES:
+            raise ValidationError({'export_format': 'Допустимо: csv, jsonl'})
         
+        chunks = stream_catalog(
+            self.filter_queryset(Product.objects.all()),
+            file_format,
+            image_url=request.build_absolute_uri
+        )
+        response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = f'attachment; filename="catalog.{file_format}"'
+        return response
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        """Попадания/промахи кеша ответов каталога"""
+        return Response(get_stats('products', 'product-cards', 'categories', 'brands'))
     
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        ProductService.increment_views(instance)
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        # Ответ может прийти из кеша, поэтому просмотр считаем по id из payload
+        response = super().retrieve(request, *args, **kwargs)
+        ProductService.increment_views(response.data['id'])
+        return response
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.list_actions:
+            # Списку нужно только главное изображение, характеристики не нужны
+            return queryset.prefetch_related(Product.prefetch_main_image())
+        return queryset.prefetch_related('product_images', 'product_specifications')
         
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in self.list_actions:
             return ProductListSerializerList
         if self.action in ['create', 'update', 'partial_update']:
             return ProductCreateUpdateSerializer
         return ProductDetailSerializer
     
     
-class ReviewViewSet(viewsets.ModelViewSet):
+class ProductCardViewSet(CachedListMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Список товаров из read-модели ProductCard.
+    
+    Один индексированный запрос к одной таблице на страницу: без JOIN
+    категорий и брендов, prefetch изображений и расчета цен в Python.
+    """
+    queryset = ProductCard.objects.all()
+    serializer_class = ProductCardSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = ProductCardFilter
+    permission_classes = [IsAdminOrReadOnly]
+    pagination_class = KeysetPagination
+    ordering_fields = ['created_at', 'final_price', 'average_rating']
+    ordering = ['-created_at']
+    cache_namespace = 'product-cards'
+    cache_dependencies = ('products.productcard',)
+
+
+class ReviewViewSet(ValuesListMixin, viewsets.ModelViewSet):
     queryset = Review.objects.select_related('product').all()
     filter_backends = [DjangoFilterBackend]
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwner]
+    pagination_class = KeysetPagination
     filterset_fields = ['product', 'rating']
         
     def get_serializer_class(self):
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
 from .models import User, UserProfile, EmailVerification, PasswordReset
+from .services import UserService
 
 
 @admin.register(User)
@@ -10,6 +11,7 @@ class UserAdmin(BaseUserAdmin):
     list_filter = ['is_active', 'is_verified', 'is_staff', 'created_at']
     search_fields = ['email', 'first_name', 'last_name']
     ordering = ['-created_at']
+    actions = ['resend_verification_emails']
 
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
@@ -25,6 +27,11 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+    @admin.action(description='Повторно отправить письма подтверждения')
+    def resend_verification_emails(self, request, queryset):
+        sent = UserService.resend_verification_emails(queryset.filter(is_verified=False))
+        self.message_user(request, f'Писем поставлено в очередь: {sent}')
+
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
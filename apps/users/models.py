@@ -81,6 +81,7 @@ class UserProfile(models.Model):
         null=True,
         blank=True
     )
+    avatar_renditions = models.JSONField(default=dict, blank=True, editable=False)
     address = models.CharField(max_length=255, null=True, blank=True)
     city = models.CharField(max_length=100, null=True, blank=True)
     country = models.CharField(max_length=100, null=True, blank=True)
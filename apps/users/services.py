@@ -1,10 +1,10 @@
 import logging
 from django.db import transaction
 from django.conf import settings
-from django.core.mail import send_mail
 
 from .models import User, EmailVerification, PasswordReset
-from .validators import send_verification_email, send_password_reset_email
+from .tasks import queue_email, queue_email_batch
+from .validators import send_verification_email, verification_email
 
 logger = logging.getLogger(__name__)
 
@@ -16,9 +16,10 @@ class UserService:
     def _create_and_send_verification(user: User) -> EmailVerification:
         token = EmailVerification.objects.create(user=user)
         
+        # Письмо уходит в очередь после коммита: SMTP не держит транзакцию
         send_verification_email(user, token)
         
-        logger.info(f'Email verification sent to {user.email}')
+        logger.info(f'Email verification queued for {user.email}')
         
         return token
     
@@ -102,6 +103,34 @@ class UserService:
         UserService._create_and_send_verification(user)
         
         logger.info(f'Resent email verification to {user.email}')
+    
+    @staticmethod
+    @transaction.atomic
+    def resend_verification_emails(users) -> int:
+        """
+        Массовая повторная отправка писем подтверждения (действие админки).
+        
+        Старые токены гасятся одним UPDATE, письма уходят после коммита
+        пачками через одно SMTP-соединение на пачку (queue_email_batch).
+        Возвращает число писем.
+        """
+        users = [user for user in users if not user.is_verified]
+        if not users:
+            return 0
+        
+        EmailVerification.objects.filter(
+            user__in=users,
+            is_used=False
+        ).update(is_used=True)
+        
+        # create(), а не bulk_create: срок действия токена задает save()
+        tokens = [EmailVerification.objects.create(user=user) for user in users]
+        queue_email_batch(
+            verification_email(user, token) for user, token in zip(users, tokens)
+        )
+        
+        logger.info(f'Resent email verification to {len(users)} users')
+        return len(users)
         
     @staticmethod
     def request_password_reset(email: str) -> bool:
@@ -113,19 +142,17 @@ class UserService:
 
             reset_url = f"{settings.FRONTEND_URL}/reset-password?token={token.token}"
 
-            send_mail(
+            queue_email(
                 subject='Сброс пароля',
                 message=f'Для сброса пароля перейдите по ссылке: {reset_url}',
-                from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[user.email],
-                fail_silently=False,
             )
 
-            logger.info(f'Password reset email sent to {email}')
+            logger.info(f'Password reset email queued for {email}')
             return True
         except User.DoesNotExist:
             logger.warning(f'Password reset requested for non-existent email: {email}')
             return False
         except Exception as e:
-            logger.error(f'Error sending password reset email to {email}: {e}')
+            logger.error(f'Error queueing password reset email to {email}: {e}')
             return False
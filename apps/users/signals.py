@@ -1,6 +1,7 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from apps.core.images import register_renditions
 from .models import User, UserProfile
 
 
@@ -8,3 +9,6 @@ from .models import User, UserProfile
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
+
+
+register_renditions(UserProfile, 'avatar', 'avatar_renditions')
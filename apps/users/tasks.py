@@ -0,0 +1,108 @@
+import logging
+from smtplib import SMTPException
+from celery import shared_task
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.db import transaction
+from kombu.exceptions import OperationalError
+
+logger = logging.getLogger(__name__)
+
+
+# Сетевые ошибки SMTP временные: повторяем с экспоненциальной задержкой
+RETRY_OPTIONS = {
+    'autoretry_for': (SMTPException, OSError),
+    'retry_backoff': 10,
+    'retry_backoff_max': 600,
+    'retry_jitter': True,
+    'max_retries': 5,
+}
+
+
+@shared_task(acks_late=True, **RETRY_OPTIONS)
+def send_email(subject, message, recipient_list, from_email=None):
+    """Отправить одно письмо"""
+    send_mail(
+        subject=subject,
+        message=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipient_list=recipient_list,
+        fail_silently=False,
+    )
+    logger.info(f'Email "{subject}" sent to {", ".join(recipient_list)}')
+
+
+@shared_task(bind=True, acks_late=True, max_retries=5)
+def send_email_batch(self, messages):
+    """
+    Отправить пачку писем через одно SMTP-соединение.
+    
+    messages — список dict(subject, message, recipient_list[, from_email]).
+    При ошибке повторно ставятся только неотправленные письма, если не
+    удалось открыть соединение — вся пачка.
+    """
+    failed = []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for data in messages:
+            email = EmailMessage(
+                subject=data['subject'],
+                body=data['message'],
+                from_email=data.get('from_email') or settings.DEFAULT_FROM_EMAIL,
+                to=data['recipient_list'],
+                connection=connection,
+            )
+            try:
+                email.send()
+            except (SMTPException, OSError) as e:
+                logger.warning(f'Email to {", ".join(data["recipient_list"])} failed: {e}')
+                failed.append(data)
+    except (SMTPException, OSError) as e:
+        # Соединение не открылось: на повтор уходит вся пачка
+        logger.warning(f'SMTP connection failed, {len(messages)} emails postponed: {e}')
+        failed = list(messages)
+    finally:
+        try:
+            connection.close()
+        except (SMTPException, OSError) as e:
+            # Письма уже отправлены, повтор дал бы дубликаты
+            logger.warning(f'SMTP connection close failed: {e}')
+    
+    if failed:
+        countdown = min(10 * 2 ** self.request.retries, 600)
+        raise self.retry(args=[failed], countdown=countdown)
+    return len(messages)
+
+
+def _dispatch(task, recipients, *args):
+    """
+    Отправить задачу брокеру из on_commit.
+    
+    Транзакция уже закоммичена: недоступный брокер не должен ронять запрос,
+    ошибка логируется с получателями (тексты писем содержат токены и в лог не идут).
+    """
+    try:
+        task.delay(*args)
+    except OperationalError as e:
+        logger.error(f'Email task {task.name} was not queued for {", ".join(recipients)}: {e}')
+
+
+def queue_email(subject, message, recipient_list, from_email=None):
+    """Поставить письмо в очередь после коммита текущей транзакции."""
+    recipient_list = list(recipient_list)
+    transaction.on_commit(
+        lambda: _dispatch(send_email, recipient_list, subject, message, recipient_list, from_email)
+    )
+
+
+def queue_email_batch(messages, batch_size=None):
+    """Разбить рассылку на пачки по batch_size и отправить после коммита."""
+    batch_size = batch_size or getattr(settings, 'EMAIL_BATCH_SIZE', 100)
+    messages = list(messages)
+    for start in range(0, len(messages), batch_size):
+        batch = messages[start:start + batch_size]
+        recipients = [recipient for data in batch for recipient in data['recipient_list']]
+        transaction.on_commit(
+            lambda batch=batch, recipients=recipients: _dispatch(send_email_batch, recipients, batch)
+        )
@@ -0,0 +1,79 @@
+from unittest import mock
+from django.core import mail
+from django.test import TestCase, override_settings
+from kombu.exceptions import OperationalError
+
+from apps.users import tasks
+from apps.users.models import User, EmailVerification
+from apps.users.services import UserService
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    CELERY_TASK_ALWAYS_EAGER=True
+)
+class EmailQueueTest(TestCase):
+    """Офлайн-режим из settings: locmem-бэкенд и задачи Celery в процессе."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user('email-queue@example.com', 'password')
+    
+    def test_email_is_sent_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(UserService.request_password_reset(self.user.email))
+            self.assertEqual(mail.outbox, [])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Сброс пароля')
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+    
+    def test_rolled_back_transaction_sends_nothing(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            UserService.resend_verification_email(self.user)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(mail.outbox, [])
+    
+    @override_settings(EMAIL_BATCH_SIZE=2)
+    def test_bulk_resend_uses_one_connection_per_batch(self):
+        users = [self.user] + [
+            User.objects.create_user(f'email-queue-{i}@example.com', 'password')
+            for i in range(2)
+        ]
+        verified = User.objects.create_user('email-verified@example.com', 'password', is_verified=True)
+        old_token = EmailVerification.objects.create(user=self.user)
+        
+        with mock.patch.object(tasks, 'get_connection', wraps=tasks.get_connection) as get_connection:
+            with self.captureOnCommitCallbacks(execute=True):
+                sent = UserService.resend_verification_emails(
+                    User.objects.filter(pk__in=[user.pk for user in users + [verified]])
+                )
+        
+        self.assertEqual(sent, 3)
+        self.assertEqual(get_connection.call_count, 2)
+        self.assertEqual(sorted(email.to[0] for email in mail.outbox), sorted(user.email for user in users))
+        old_token.refresh_from_db()
+        self.assertTrue(old_token.is_used)
+        self.assertEqual(EmailVerification.objects.filter(is_used=False).count(), 3)
+    
+    def test_admin_action_queues_batch(self):
+        admin = User.objects.create_superuser('email-admin@example.com', 'password')
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/users/user/', {
+                'action': 'resend_verification_emails',
+                '_selected_action': [self.user.pk, admin.pk],
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual([email.to for email in mail.outbox], [[self.user.email]])
+    
+    def test_broker_error_is_logged_not_raised(self):
+        error = OperationalError('Connection refused')
+        with mock.patch.object(tasks.send_email, 'delay', side_effect=error), \
+                mock.patch.object(tasks.send_email_batch, 'delay', side_effect=error):
+            with self.assertLogs('apps.users.tasks', 'ERROR') as logs:
+                with self.captureOnCommitCallbacks(execute=True):
+                    tasks.queue_email('Subject', 'Body', [self.user.email])
+                    tasks.queue_email_batch([
+                        {'subject': 'Subject', 'message': 'Body', 'recipient_list': [self.user.email]}
+                    ])
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(mail.outbox, [])
@@ -3,17 +3,18 @@ import re
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
-from django.core.mail import send_mail
+
+from .tasks import queue_email
 
 
 logger = logging.getLogger(__name__)
 
 
-def send_verification_email(user, token):
+def verification_email(user, token):
     """
-    Отправляет письмо с ссылкой для верификации email.
+    Письмо со ссылкой для верификации email: dict(subject, message, recipient_list).
     
-    Пример: send_verification_email(user, verification_token)
+    Формат сообщения send_email_batch.
     """
     subject = 'Подтвердите ваш email'
     
@@ -34,18 +35,19 @@ def send_verification_email(user, token):
     Команда сайта.
     """
     
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
-        logger.info(f'Письмо верификации отправлено на: {user.email}')
-    except Exception as e:
-        logger.error(f'Ошибка отправки письма верификации на {user.email}: {e}')
-        raise
+    return {'subject': subject, 'message': message, 'recipient_list': [user.email]}
+
+
+def send_verification_email(user, token):
+    """
+    Отправляет письмо с ссылкой для верификации email.
+    
+    Письмо уходит через Celery после коммита транзакции.
+    
+    Пример: send_verification_email(user, verification_token)
+    """
+    queue_email(**verification_email(user, token))
+    logger.info(f'Письмо верификации поставлено в очередь: {user.email}')
     
 
 def send_password_reset_email(user, token):
@@ -75,18 +77,8 @@ def send_password_reset_email(user, token):
     Команда сайта
     """
     
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
-        logger.info(f'Письмо сброса пароля отправлено на: {user.email}')
-    except Exception as e:
-        logger.error(f'Ошибка отправки письма сброса пароля на {user.email}: {e}')
-        raise
+    queue_email(subject, message, [user.email])
+    logger.info(f'Письмо сброса пароля поставлено в очередь: {user.email}')
     
 def send_welcome_email(user):
     """
@@ -108,18 +100,8 @@ def send_welcome_email(user):
     Команда сайта
     """
     
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
-        logger.info(f'Приветственное письмо отправлено на: {user.email}')
-    except Exception as e:
-        logger.error(f'Ошибка отправки приветственного письма на {user.email}: {e}')
-        pass
+    queue_email(subject, message, [user.email])
+    logger.info(f'Приветственное письмо поставлено в очередь: {user.email}')
     
 
 def validate_phone_number(value):
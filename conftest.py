@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def test_settings(settings):
+    """Кеш в памяти процесса (тестам не нужен Redis), быстрый хешер паролей, без debug toolbar."""
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    }
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+    # Тестовый прогон идет с DEBUG=False: маршрутов toolbar нет, а middleware остается
+    settings.MIDDLEWARE = [
+        middleware for middleware in settings.MIDDLEWARE
+        if not middleware.startswith('debug_toolbar')
+    ]
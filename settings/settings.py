@@ -34,8 +34,10 @@ INSTALLED_APPS = [
     'django_filters',
     'drf_spectacular',
     'debug_toolbar',
+    'django_celery_beat',
 
     # Local apps
+    'apps.core',
     'apps.users',
     'apps.products',
     'apps.cart',
@@ -46,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.PerformanceMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -151,8 +154,9 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
+        'apps.core.renderers.FastJSONRenderer',
+        # Browsable API только для разработки: рендер HTML дорогой
+        *(['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -219,6 +223,84 @@ CACHES = {
     }
 }
 
+# Списки каталога сериализуются из QuerySet.values() (ValuesListMixin)
+FAST_SERIALIZATION_ENABLED = config('FAST_SERIALIZATION_ENABLED', default=True, cast=bool)
+
+# Кеш ответов каталога (версионируется сигналами моделей)
+RESPONSE_CACHE_ENABLED = config('RESPONSE_CACHE_ENABLED', default=True, cast=bool)
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Метрики запросов (Server-Timing и /api/metrics/)
+PERFORMANCE_METRICS_ENABLED = config('PERFORMANCE_METRICS_ENABLED', default=True, cast=bool)
+PERFORMANCE_SERVER_TIMING = config('PERFORMANCE_SERVER_TIMING', default=True, cast=bool)
+
+# Полнотекстовый поиск товаров (FTS5 на SQLite, tsvector на PostgreSQL)
+PRODUCT_SEARCH_MAX_RESULTS = config('PRODUCT_SEARCH_MAX_RESULTS', default=1000, cast=int)
+PRODUCT_SEARCH_CONFIG = config('PRODUCT_SEARCH_CONFIG', default='simple')
+
+# Границы ценовых диапазонов фасетов
+PRODUCT_FACET_PRICE_BUCKETS = (1000, 5000, 10000, 50000)
+
+# Размер пачки импорта каталога
+CATALOG_IMPORT_CHUNK_SIZE = config('CATALOG_IMPORT_CHUNK_SIZE', default=1000, cast=int)
+
+# Размер пачки массового обновления цен и остатков
+BULK_PRICE_UPDATE_CHUNK_SIZE = config('BULK_PRICE_UPDATE_CHUNK_SIZE', default=1000, cast=int)
+
+# Уменьшенные копии изображений (WebP и JPEG), генерируются в Celery
+IMAGE_RENDITION_SIZES = {
+    'thumb': (150, 150),
+    'small': (300, 300),
+    'medium': (600, 600),
+    'large': (1200, 1200),
+}
+LIST_IMAGE_SIZE = config('LIST_IMAGE_SIZE', default='small')
+
+# Хранилище корзин: 'database' (по умолчанию) или 'redis' (горячие корзины
+# в Redis с отложенной записью в БД). Анонимные корзины истекают через TTL
+CART_STORE = config('CART_STORE', default='database')
+CART_ANONYMOUS_TTL = config('CART_ANONYMOUS_TTL', default=60 * 60 * 24 * 7, cast=int)
+CART_USER_TTL = config('CART_USER_TTL', default=60 * 60 * 24 * 30, cast=int)
+CART_PERSIST_INTERVAL = config('CART_PERSIST_INTERVAL', default=60, cast=int)
+
+# Резерв товара под корзину живет N секунд с последнего изменения корзины
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=30 * 60, cast=int)
+
+# Celery
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://127.0.0.1:6379/0')
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+
+# Просмотры товаров копятся в Redis и сбрасываются в БД раз в N секунд
+PRODUCT_VIEWS_FLUSH_INTERVAL = config('PRODUCT_VIEWS_FLUSH_INTERVAL', default=60, cast=int)
+
+# Подборки "популярные"/"со скидкой": N лучших товаров на ключ, пересборка раз в N секунд
+PRODUCT_COLLECTION_SIZE = config('PRODUCT_COLLECTION_SIZE', default=1000, cast=int)
+PRODUCT_COLLECTIONS_REFRESH_INTERVAL = config('PRODUCT_COLLECTIONS_REFRESH_INTERVAL', default=5 * 60, cast=int)
+
+CELERY_BEAT_SCHEDULE = {
+    'flush-product-views': {
+        'task': 'apps.products.tasks.flush_product_views',
+        'schedule': PRODUCT_VIEWS_FLUSH_INTERVAL,
+    },
+    'rebuild-product-collections': {
+        'task': 'apps.products.tasks.rebuild_product_collections',
+        'schedule': PRODUCT_COLLECTIONS_REFRESH_INTERVAL,
+    },
+    'persist-carts': {
+        'task': 'apps.cart.tasks.persist_carts',
+        'schedule': CART_PERSIST_INTERVAL,
+    },
+    'release-expired-reservations': {
+        'task': 'apps.cart.tasks.release_expired_reservations',
+        'schedule': 60,
+    },
+    'delete-abandoned-carts': {
+        'task': 'apps.cart.tasks.delete_abandoned_carts',
+        'schedule': 60 * 60,
+    },
+}
+
 # Django Debug Toolbar
 INTERNAL_IPS = [
     '127.0.0.1',
@@ -243,3 +325,7 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@techshop.com')
+# Письма отправляет Celery (apps.users.tasks). Офлайн: EMAIL_BACKEND=
+# django.core.mail.backends.locmem.EmailBackend и CELERY_TASK_ALWAYS_EAGER=True
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)
+EMAIL_BATCH_SIZE = config('EMAIL_BATCH_SIZE', default=100, cast=int)
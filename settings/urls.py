@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
+from apps.core.views import metrics_view
 
 urlpatterns = [
     
@@ -8,6 +9,7 @@ urlpatterns = [
     path('api/users/', include('apps.users.urls', namespace='users')),
     path('api/products/', include('apps.products.urls', namespace='products')),
     path('api/cart/', include('apps.cart.urls', namespace='cart')),
+    path('api/metrics/', metrics_view, name='metrics'),
     
 ]
 